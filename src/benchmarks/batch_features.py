@@ -0,0 +1,91 @@
+"""
+Offline batch features against the live `FeatureCalculator`: parity on a sample of
+snapshots replayed through the live handlers, and throughput at 1..N numba threads.
+
+Run from `src`:
+    python -m benchmarks.batch_features
+"""
+import time
+
+import numba
+import numpy as np
+
+from exchanges.binance.ws.handlers.orderbook import Orderbook
+from exchanges.binance.ws.handlers.trades import BinanceTradesHandler, Trade
+from exchanges.rfx.handlers.public import DexMarketData
+from features.batch import batch_features, BATCH_FEATURES
+from features.features import FeatureCalculator
+from features.multi_horizon import TradeHorizons
+
+
+def generate_history(num_snapshots: int, num_levels: int = 100, trades_per_snapshot: int = 5, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    timestamps = 1.7e12 + np.arange(num_snapshots) * 100.0
+    mids = 50_000.0 + np.cumsum(rng.normal(0.0, 2.0, num_snapshots))
+    offsets = np.cumsum(rng.uniform(0.5, 2.0, (num_snapshots, num_levels)), axis=1)
+    bids = np.stack([mids[:, None] - offsets, rng.lognormal(-1.0, 1.0, (num_snapshots, num_levels))], axis=2)
+    asks = np.stack([mids[:, None] + offsets, rng.lognormal(-1.0, 1.0, (num_snapshots, num_levels))], axis=2)
+
+    num_trades = num_snapshots * trades_per_snapshot
+    trade_times = np.sort(rng.uniform(timestamps[0] - 1000.0, timestamps[-1], num_trades))
+    trades = np.column_stack([
+        trade_times,
+        np.where(rng.random(num_trades) < 0.5, 1.0, -1.0),
+        np.repeat(mids, trades_per_snapshot) + rng.normal(0.0, 1.0, num_trades),
+        rng.lognormal(-4.0, 1.5, num_trades),
+    ])
+    oracle_prices = mids * (1.0 + rng.normal(0.0, 1e-4, num_snapshots))
+    funding_rates = rng.normal(0.0, 0.1, num_snapshots)
+    return timestamps, bids, asks, trades, oracle_prices, funding_rates
+
+
+def check_parity(history, calculator: FeatureCalculator, num_checks: int = 200) -> None:
+    timestamps, bids, asks, trades, oracle_prices, funding_rates = history
+    columns = batch_features(timestamps, bids, asks, trades, oracle_prices, funding_rates, calculator=calculator)
+
+    book = Orderbook(size=bids.shape[1])
+    handler = BinanceTradesHandler(length=1000)
+    clock = [0.0]
+    live = FeatureCalculator(compute_interval=0.0, clock=lambda: clock[0], trade_horizons=calculator.trade_horizons)
+    next_trade = 0
+    for i in range(num_checks):
+        while next_trade < trades.shape[0] and trades[next_trade, 0] <= timestamps[i]:
+            handler.add_single(Trade.from_array(trades[next_trade]))
+            next_trade += 1
+        if next_trade < 2:
+            continue
+        book.refresh(asks[i], bids[i], i + 1)
+        clock[0] = timestamps[i] / 1000.0
+        features = live.compute_features(book, handler, DexMarketData("", oracle_prices[i], funding_rates[i], clock[0]))
+
+        for name in BATCH_FEATURES:
+            assert np.isclose(getattr(features, name), columns[name][i], rtol=1e-9, atol=1e-9), \
+                f"{name} diverged at snapshot {i}: {getattr(features, name)} != {columns[name][i]}"
+        assert np.allclose(features.book_depth, columns['book_depth'][i]), f"book_depth diverged at snapshot {i}"
+        assert np.allclose(features.trade_horizons, columns['trade_horizons'][i], equal_nan=True), \
+            f"trade_horizons diverged at snapshot {i}"
+
+
+def main(num_snapshots: int = 200_000) -> None:
+    calculator = FeatureCalculator(trade_horizons=TradeHorizons(trades=[100], seconds=[1, 5]))
+    history = generate_history(num_snapshots)
+    check_parity(history, calculator)
+
+    max_threads = numba.config.NUMBA_NUM_THREADS
+    batch_features(*(array[:1000] for array in history), calculator=calculator)
+
+    print(f"{num_snapshots} snapshots, {history[3].shape[0]} trades, {history[1].shape[1]} levels per side")
+    single_thread = None
+    for threads in sorted({min(2 ** k, max_threads) for k in range(max_threads.bit_length() + 1)}):
+        numba.set_num_threads(threads)
+        start = time.perf_counter()
+        batch_features(*history, calculator=calculator)
+        elapsed = time.perf_counter() - start
+        single_thread = single_thread or elapsed
+        print(f"  {threads:3d} threads: {elapsed:.3f}s ({num_snapshots / elapsed:,.0f} snapshots/s, "
+              f"{single_thread / elapsed:.2f}x)")
+    numba.set_num_threads(max_threads)
+
+
+if __name__ == "__main__":
+    main()
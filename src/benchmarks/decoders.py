@@ -0,0 +1,109 @@
+"""
+Decode cost per Binance stream message type: the typed decoders against the
+previous orjson -> dict -> float()/np.array path.
+
+Timings are the best of `repeats` interleaved runs, since single runs on a shared
+or single-core machine vary by more than the differences measured.
+
+Run from `src`:
+    python -m benchmarks.decoders
+"""
+import time
+import tracemalloc
+
+import numpy as np
+import orjson
+
+from exchanges.binance.ws.decoders import BinanceStreamDecoder
+from exchanges.binance.ws.handlers.kline import OHLCV
+from exchanges.binance.ws.handlers.trades import Trade, Side
+
+
+def sample_frames(num_levels: int = 20):
+    bids = [[f"{50_000 - i * 0.01:.2f}", f"{0.1 + i:.8f}"] for i in range(num_levels)]
+    asks = [[f"{50_000 + i * 0.01:.2f}", f"{0.1 + i:.8f}"] for i in range(num_levels)]
+    depth = {"e": "depthUpdate", "E": 1700000000000, "s": "BTCUSDT", "U": 100, "u": 120, "b": bids, "a": asks}
+    trade = {"e": "trade", "E": 1700000000000, "s": "BTCUSDT", "t": 12345, "p": "50000.01000000",
+             "q": "0.01200000", "T": 1700000000000, "m": True, "M": True}
+    kline = {"e": "kline", "E": 1700000000000, "s": "BTCUSDT", "k": {
+        "t": 1700000000000, "T": 1700000059999, "s": "BTCUSDT", "i": "1m", "f": 100, "L": 200,
+        "o": "50000.00", "c": "50010.00", "h": "50020.00", "l": "49990.00", "v": "12.5", "n": 100,
+        "x": False, "q": "625000.0", "V": "6.0", "Q": "300000.0", "B": "0"}}
+    book_ticker = {"u": 400900217, "s": "BTCUSDT", "b": "50000.00", "B": "31.21", "a": "50000.01", "A": "40.66"}
+
+    def envelope(stream, data):
+        return orjson.dumps({"stream": stream, "data": data}).decode()
+
+    return {
+        "depthUpdate": envelope("btcusdt@depth@100ms", depth),
+        "trade": envelope("btcusdt@trade", trade),
+        "kline": envelope("btcusdt@kline_1m", kline),
+        "bookTicker": envelope("btcusdt@bookTicker", book_ticker),
+    }
+
+
+def legacy_decode(raw: str):
+    """The previous path: re-encode, full parse, then per-field conversion in the handler."""
+    recv = orjson.loads(raw.encode("utf-8"))["data"]
+    event = recv.get("e", "bookTicker")
+    if event == "depthUpdate":
+        return int(recv.get("u")), np.array(recv["b"], dtype=np.float64), np.array(recv["a"], dtype=np.float64)
+    if event == "trade":
+        return Trade(
+            timestamp=float(recv.get("T")),
+            side=Side.SELL if recv.get("m") else Side.BUY,
+            price=float(recv.get("p")),
+            size=float(recv.get("q"))
+        )
+    if event == "kline":
+        candle = recv["k"]
+        return OHLCV(
+            timestamp=float(candle.get("t")),
+            open=float(candle.get("o")),
+            high=float(candle.get("h")),
+            low=float(candle.get("l")),
+            close=float(candle.get("c")),
+            volume=float(candle.get("v"))
+        )
+    return float(recv.get("b")), float(recv.get("B")), float(recv.get("a")), float(recv.get("A"))
+
+
+def time_per_message(decode, raw, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(raw)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bytes_per_message(decode, raw, iterations: int) -> float:
+    """Average transient heap usage (peak above baseline) of a single decode."""
+    total = 0
+    tracemalloc.start()
+    for _ in range(iterations):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        decode(raw)
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - baseline
+    tracemalloc.stop()
+    return total / iterations
+
+
+def main(iterations: int = 20_000, repeats: int = 7) -> None:
+    decoder = BinanceStreamDecoder()
+    frames = sample_frames()
+
+    print(f"{'message':<12} | {'legacy us':>10} | {'typed us':>10} | {'speedup':>8} | {'legacy B':>10} | {'typed B':>10}")
+    for name, raw in frames.items():
+        legacy_us = typed_us = float("inf")
+        for _ in range(repeats):
+            legacy_us = min(legacy_us, time_per_message(legacy_decode, raw, iterations))
+            typed_us = min(typed_us, time_per_message(decoder.decode, raw, iterations))
+        legacy_bytes = bytes_per_message(legacy_decode, raw, 1_000)
+        typed_bytes = bytes_per_message(decoder.decode, raw, 1_000)
+        print(f"{name:<12} | {legacy_us:>10.2f} | {typed_us:>10.2f} | {legacy_us / typed_us:>7.2f}x | "
+              f"{legacy_bytes:>10.0f} | {typed_bytes:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Indexed quote-to-order matching against the order-by-quote scans it replaces: parity
+of the diff with a brute-force one-to-one match, and the cost of diffing a new ladder
+against hundreds of live orders.
+
+Run from `src`:
+    python -m benchmarks.oms_diff
+"""
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from oms.diff import OrderIndex
+from oms.quote import Quote, SIDES
+
+
+class LiveOrder(NamedTuple):
+    """The `ActiveOrder` fields the matching reads"""
+    price: float
+    size_usd: float
+    side: str
+
+
+def legacy_diff(active_orders: Dict[int, LiveOrder], quotes: List[Quote]) -> Tuple[List[int], List[Quote]]:
+    """`_cancel_mismatched_orders` and `_quote_matches_existing` as they were"""
+    cancels = []
+    for position, order in active_orders.items():
+        matching_quote = next(
+            (q for q in quotes if (
+                q.side == order.side and
+                abs(q.price - order.price) / order.price < 0.001 and
+                abs(q.size_usd - order.size_usd) / order.size_usd < 0.001
+            )),
+            None
+        )
+        if not matching_quote:
+            cancels.append(position)
+
+    places = []
+    for quote in quotes:
+        if not any(
+            order.side == quote.side and
+            abs(order.price - quote.price) / order.price < 0.001 and
+            abs(order.size_usd - quote.size_usd) / order.size_usd < 0.001
+            for order in active_orders.values()
+        ):
+            places.append(quote)
+    return cancels, places
+
+
+def reference_diff(active_orders: Dict[int, LiveOrder], quotes: List[Quote],
+                   tolerance: float = 0.001) -> Tuple[List[int], List[Quote], List[Tuple[int, Quote]]]:
+    """Each quote in turn against every live order, claiming the closest-priced match"""
+    claimed = set()
+    places, keeps = [], []
+    for quote in quotes:
+        candidates = [
+            (abs(order.price - quote.price), position)
+            for position, order in active_orders.items()
+            if position not in claimed and order.side == quote.side and
+            abs(order.price - quote.price) / order.price < tolerance and
+            abs(order.size_usd - quote.size_usd) / order.size_usd < tolerance
+        ]
+        if candidates:
+            position = min(candidates)[1]
+            claimed.add(position)
+            keeps.append((position, quote))
+        else:
+            places.append(quote)
+    cancels = [position for position in active_orders if position not in claimed]
+    return cancels, places, keeps
+
+
+def generate_ladder(rng, num_quotes: int, mid: float = 50_000.0) -> List[Quote]:
+    """`num_quotes` quotes over the four sides, levels 0.3% apart"""
+    quotes = []
+    per_side = num_quotes // len(SIDES)
+    for side in SIDES:
+        direction = -1.0 if side in ('increase_long', 'decrease_short') else 1.0
+        for level in range(per_side):
+            price = round(mid * (1.0 + direction * 0.003 * (level + 1)), 2)
+            quotes.append(Quote(price, 0.0, round(float(rng.uniform(10.0, 1000.0)), 2), side, f'{side}_{level:02d}'))
+    return quotes
+
+
+def requote(rng, quotes: List[Quote], moved: float) -> List[Quote]:
+    """The next ladder: a `moved` fraction of the quotes shifted by 1%, the rest within 0.05%"""
+    out = []
+    for quote in quotes:
+        shift = 0.01 if rng.random() < moved else float(rng.uniform(-0.0005, 0.0005))
+        out.append(Quote(round(quote.price * (1.0 + shift), 2), quote.size, quote.size_usd, quote.side, quote.order_id))
+    return out
+
+
+def live_orders(quotes: List[Quote]) -> Dict[int, LiveOrder]:
+    return {
+        position: LiveOrder(quote.price, quote.size_usd, quote.side)
+        for position, quote in enumerate(quotes)
+    }
+
+
+def check_parity(rng, num_orders: int = 400, trials: int = 50) -> None:
+    for _ in range(trials):
+        current = generate_ladder(rng, num_orders)
+        orders = live_orders(current)
+        index = OrderIndex()
+        for position, order in orders.items():
+            index.add(position, order.side, order.price, order.size_usd)
+
+        quotes = requote(rng, current, moved=float(rng.uniform(0.0, 1.0)))
+        diff = index.diff(quotes)
+        cancels, places, keeps = reference_diff(orders, quotes)
+        assert sorted(diff.cancels) == sorted(cancels), "Cancels diverged"
+        assert [q.order_id for q in diff.places] == [q.order_id for q in places], "Placements diverged"
+        assert [(p, q.order_id) for p, q in diff.keeps] == [(p, q.order_id) for p, q in keeps], "Keeps diverged"
+        # The legacy scans let one live order back several quotes; the diff never does
+        assert len({position for position, _ in diff.keeps}) == len(diff.keeps)
+
+
+def main(iterations: int = 200) -> None:
+    rng = np.random.default_rng(42)
+    check_parity(rng)
+
+    for num_orders in (100, 400, 1000):
+        current = generate_ladder(rng, num_orders)
+        orders = live_orders(current)
+        index = OrderIndex()
+        for position, order in orders.items():
+            index.add(position, order.side, order.price, order.size_usd)
+        quotes = requote(rng, current, moved=0.2)
+
+        start = time.perf_counter()
+        for _ in range(max(iterations // (num_orders // 100), 5)):
+            legacy_diff(orders, quotes)
+        legacy_time = (time.perf_counter() - start) / max(iterations // (num_orders // 100), 5)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            diff = index.diff(quotes)
+        index_time = (time.perf_counter() - start) / iterations
+
+        print(f"{len(orders)} live orders, {len(quotes)} quotes: {diff}")
+        print(f"  legacy scans : {legacy_time * 1e3:9.3f} ms")
+        print(f"  OrderIndex   : {index_time * 1e3:9.3f} ms ({legacy_time / index_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
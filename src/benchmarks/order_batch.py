@@ -0,0 +1,219 @@
+"""
+Requoting through one `MulticallBatch` transaction against a transaction per order, as
+`OrderClient` sends them otherwise: wall time until every cancel and placement is
+mined, gas, and the per-leg results decoded from the batch receipt.
+
+Runs against `LocalChain`, an in-process stand-in for the EVM node. It mines pending
+transactions every `block_ms`, answers each RPC after `rpc_ms`, and charges gas as
+21000 per transaction, 16 per calldata byte, and a fixed cost per exchange router
+call. The router call costs are rough figures for the RFX (GMX v2) handlers, not
+measurements, so the gas numbers compare transaction shapes rather than predict fees.
+
+Run from `src`:
+    python -m benchmarks.order_batch
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from types import SimpleNamespace
+
+from exchanges.rfx.orders.batch import BatchSender, MulticallBatch
+from exchanges.rfx.orders.executor import NonceManagedOrder, NonceManager, OrderExecutor
+
+
+# Router call -> (calldata bytes, execution gas), illustrative round figures rather than measured costs
+CALLS = {
+    "sendWnt": (68, 30_000),
+    "sendTokens": (100, 55_000),
+    "createOrder": (900, 260_000),
+    "cancelOrder": (36, 110_000),
+}
+
+
+def keccak(text: str) -> bytes:
+    return hashlib.sha3_256(text.encode()).digest()
+
+
+def encode(call: str, key: bytes = b"") -> bytes:
+    """Calldata for a router call: its name, a key, and padding to its size"""
+    size = CALLS[call][0]
+    return (call.encode() + b":" + key).ljust(size, b"\x01")
+
+
+def call_name(arg: bytes) -> str:
+    return arg.split(b":", 1)[0].decode()
+
+
+class LocalChain:
+    """The `web3.eth` an order client uses, backed by an in-process ledger"""
+
+    def __init__(self, block_s: float, rpc_s: float):
+        self.block_s = block_s
+        self.rpc_s = rpc_s
+        self.start = time.perf_counter()
+        self.receipts = {}
+        self.gas_used = 0
+        self.transactions = 0
+        self.open_orders = set()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.account = SimpleNamespace(sign_transaction=lambda tx, key: SimpleNamespace(raw_transaction=tx))
+
+    def gas(self, args) -> int:
+        return 21_000 + sum(16 * len(arg) + CALLS[call_name(arg)][1] for arg in args)
+
+    def get_transaction_count(self, address, block_identifier="latest"):
+        time.sleep(self.rpc_s)
+        return self.transactions
+
+    def estimate_gas(self, args) -> int:
+        time.sleep(self.rpc_s)
+        return self.gas(args)
+
+    def send_raw_transaction(self, raw_tx):
+        time.sleep(self.rpc_s)
+        with self._lock:
+            self.transactions += 1
+            tx_hash = hashlib.sha256(b"tx%d" % raw_tx["nonce"]).digest()
+            logs = []
+            for arg in raw_tx["data"]:
+                call = call_name(arg)
+                if call == "createOrder":
+                    key = hashlib.sha256(b"order%d" % self._next_key).digest()
+                    self._next_key += 1
+                    self.open_orders.add(key)
+                    logs.append({"topics": [b"EventLog2", keccak("OrderCreated"), key]})
+                elif call == "cancelOrder":
+                    key = arg.split(b":", 1)[1][:32]
+                    self.open_orders.discard(key)
+                    logs.append({"topics": [b"EventLog2", keccak("OrderCancelled"), key]})
+            gas_used = self.gas(raw_tx["data"])
+            self.gas_used += gas_used
+            # Mined at the first block boundary after it arrives
+            sent = time.perf_counter() - self.start
+            mined = (int(sent / self.block_s) + 1) * self.block_s
+            self.receipts[tx_hash] = (mined, {"status": 1, "gasUsed": gas_used, "logs": logs})
+        return tx_hash
+
+    def wait_for_transaction_receipt(self, tx_hash, timeout=120.0):
+        mined, receipt = self.receipts[tx_hash]
+        time.sleep(max(mined - (time.perf_counter() - self.start), 0.0) + self.rpc_s)
+        return receipt
+
+
+class Router:
+    """`ExchangeRouter.functions.multicall` over `LocalChain`"""
+
+    def __init__(self, chain: LocalChain):
+        self.functions = SimpleNamespace(multicall=lambda args: SimpleNamespace(
+            estimate_gas=lambda params: chain.estimate_gas(args),
+            build_transaction=lambda params: dict(params, data=list(args)),
+        ))
+
+
+def make_config(chain: LocalChain):
+    return SimpleNamespace(
+        connection=SimpleNamespace(eth=chain, keccak=lambda text: keccak(text)),
+        user_wallet_address="0x0", chain_id=1, private_key=None,
+    )
+
+
+class SingleOrder(NonceManagedOrder):
+    """One order or cancel in its own multicall transaction, as pyrfx sends it"""
+
+    def __init__(self, config, router, args):
+        self.config = config
+        self.args = args
+        self.debug_mode = False
+        self.max_fee_per_gas = 1
+        self._gas_limits_order_type_contract_function = None
+        self._exchange_router_contract = router
+
+    def create_and_execute(self):
+        return self._multicall_transaction(0, self.args)
+
+
+def create_args(i: int):
+    return [encode("sendWnt"), encode("sendTokens"), encode("createOrder", b"%d" % i)]
+
+
+async def requote_individually(chain: LocalChain, keys, num_orders: int, max_in_flight: int):
+    config = make_config(chain)
+    router = Router(chain)
+    executor = OrderExecutor(max_in_flight=max_in_flight)
+    nonce_manager = NonceManager(config)
+
+    def execute(args):
+        order = SingleOrder(config, router, args)
+        order.nonce_manager = nonce_manager
+        return order.create_and_execute()
+
+    async def send(args):
+        # Sent in a slot, then mined outside it, as `OrderClient.order_key` waits
+        tx_hash = await executor.run(execute, args)
+        return await executor.wait(chain.wait_for_transaction_receipt, tx_hash)
+
+    legs = [[encode("cancelOrder", key)] for key in keys] + [create_args(i) for i in range(num_orders)]
+    await asyncio.gather(*(send(args) for args in legs))
+    executor.shutdown()
+
+
+async def requote_batched(chain: LocalChain, keys, num_orders: int):
+    config = make_config(chain)
+    executor = OrderExecutor(max_in_flight=1)
+    sender = BatchSender(config, Router(chain), NonceManager(config))
+
+    batch = MulticallBatch()
+    for key in keys:
+        batch.add_cancel(encode("cancelOrder", key), key)
+    for i in range(num_orders):
+        batch.add_create(create_args(i), 0, request=i)
+
+    result = await executor.run(sender.submit, batch, 1)
+    result = await executor.wait(sender.wait, result)
+    executor.shutdown()
+
+    assert result.status == 1 and all(leg.ok for leg in result.legs), f"Legs failed: {result.legs}"
+    assert [leg.request for leg in result.batch.creates] == list(range(num_orders))
+    assert all(bytes(leg.order_key) in chain.open_orders for leg in result.batch.creates), "Created keys not decoded"
+    assert not any(key in chain.open_orders for key in keys), "Cancelled orders still open"
+    return result
+
+
+def seeded_chain(num_orders: int, block_s: float, rpc_s: float):
+    """A chain already holding `num_orders` open orders to cancel"""
+    chain = LocalChain(block_s, rpc_s)
+    keys = [hashlib.sha256(b"live%d" % i).digest() for i in range(num_orders)]
+    chain.open_orders.update(keys)
+    return chain, keys
+
+
+async def run(ladder_sizes=(5, 10, 20), block_ms: float = 250.0, rpc_ms: float = 20.0, max_in_flight: int = 4):
+    block_s, rpc_s = block_ms / 1e3, rpc_ms / 1e3
+    print(f"Full requote (cancel N, place N), {block_ms:.0f}ms blocks, {rpc_ms:.0f}ms RPCs, modelled gas")
+    for num_orders in ladder_sizes:
+        chain, keys = seeded_chain(num_orders, block_s, rpc_s)
+        start = time.perf_counter()
+        await requote_individually(chain, keys, num_orders, max_in_flight)
+        individual_time = time.perf_counter() - start
+        individual_gas, individual_txs = chain.gas_used, chain.transactions
+
+        chain, keys = seeded_chain(num_orders, block_s, rpc_s)
+        start = time.perf_counter()
+        result = await requote_batched(chain, keys, num_orders)
+        batched_time = time.perf_counter() - start
+
+        print(f"  N={num_orders:2d} per order ({individual_txs:2d} txs): {individual_time * 1e3:7.0f} ms, "
+              f"{individual_gas:10,d} gas")
+        print(f"  N={num_orders:2d} batched  ( 1 tx ) : {batched_time * 1e3:7.0f} ms, {result.gas_used:10,d} gas "
+              f"({individual_time / batched_time:.1f}x faster, "
+              f"{100 * (1 - result.gas_used / individual_gas):.0f}% less gas)")
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
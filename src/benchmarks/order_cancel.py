@@ -0,0 +1,96 @@
+"""
+Key-targeted cancellation against cancelling the first N orders listed for the account,
+as `OrderClient.cancel_orders(num_orders)` does: which orders actually get cancelled,
+the transactions and RPC round-trips spent, and the wall time for a requote that
+cancels a few specific levels out of a full ladder.
+
+Runs against the `LocalChain` stand-in from `benchmarks.order_batch`.
+
+Run from `src`:
+    python -m benchmarks.order_cancel
+"""
+import asyncio
+import hashlib
+import time
+
+import numpy as np
+
+from benchmarks.order_batch import LocalChain, Router, encode, make_config
+from exchanges.rfx.orders.batch import BatchSender, MulticallBatch
+from exchanges.rfx.orders.executor import NonceManager, OrderExecutor
+
+
+class ListingChain(LocalChain):
+    """`LocalChain` with the account order list pyrfx reads, and a count of RPCs"""
+
+    def __init__(self, block_s: float, rpc_s: float, keys):
+        super().__init__(block_s, rpc_s)
+        self.listed = list(keys)
+        self.open_orders.update(keys)
+        self.listings = 0
+
+    def list_keys(self):
+        time.sleep(self.rpc_s)
+        self.listings += 1
+        return [key for key in self.listed if key in self.open_orders]
+
+
+async def cancel(chain: ListingChain, keys, by_key: bool):
+    config = make_config(chain)
+    executor = OrderExecutor(max_in_flight=1)
+    sender = BatchSender(config, Router(chain), NonceManager(config))
+
+    def execute():
+        targets = keys if by_key else chain.list_keys()[:len(keys)]
+        batch = MulticallBatch()
+        for key in targets:
+            batch.add_cancel(encode("cancelOrder", key), key)
+        return sender.submit(batch, 1)
+
+    result = await executor.run(execute)
+    result = await executor.wait(sender.wait, result)
+    executor.shutdown()
+    return result
+
+
+async def run(num_orders: int = 20, num_stale: int = 5, trials: int = 20,
+              block_ms: float = 250.0, rpc_ms: float = 20.0) -> None:
+    block_s, rpc_s = block_ms / 1e3, rpc_ms / 1e3
+    rng = np.random.default_rng(42)
+    totals = {True: [0, 0, 0, 0.0], False: [0, 0, 0, 0.0]}  # wrong, stale left, listings, seconds
+
+    for _ in range(trials):
+        keys = [hashlib.sha256(b"live%d" % i).digest() for i in range(num_orders)]
+        stale = [keys[i] for i in sorted(rng.choice(num_orders, num_stale, replace=False))]
+        for by_key in (True, False):
+            chain = ListingChain(block_s, rpc_s, keys)
+            start = time.perf_counter()
+            result = await cancel(chain, stale, by_key)
+            elapsed = time.perf_counter() - start
+
+            cancelled = {bytes(leg.order_key) for leg in result.batch.cancels if leg.ok}
+            wrong = len(cancelled - set(stale))
+            left = sum(key in chain.open_orders for key in stale)
+            if by_key:
+                assert cancelled == set(stale) and not left, "Key-targeted cancel missed its orders"
+            total = totals[by_key]
+            total[0] += wrong
+            total[1] += left
+            total[2] += chain.listings
+            total[3] += elapsed
+
+    print(f"Cancelling {num_stale} stale levels out of {num_orders} live orders, {trials} requotes")
+    for by_key, label in ((False, "first N listed"), (True, "by order key  ")):
+        wrong, left, listings, seconds = totals[by_key]
+        print(f"  {label}: {wrong / trials:4.1f} good levels cancelled, {left / trials:4.1f} stale left, "
+              f"{listings / trials:3.1f} listings, {seconds / trials * 1e3:6.0f} ms per requote")
+    wrong = totals[False][0] / trials
+    print(f"  first N listed also re-creates the {wrong:.1f} good levels it cancelled on the next requote")
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Order submission through `OrderExecutor` against awaiting blocking chain calls on the
+event loop, as `OrderClient` did: wall time to submit a ladder, the longest stall seen
+by a market data task ticking every millisecond meanwhile, and the nonces handed out
+to transactions signed in parallel.
+
+Chain calls are simulated: each order spends `rpc_ms` blocked in RPC round-trips and
+signing, and the transaction goes through `NonceManagedOrder._multicall_transaction`.
+
+Run from `src`:
+    python -m benchmarks.order_pipeline
+"""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from exchanges.rfx.orders.executor import NonceManagedOrder, NonceManager, OrderExecutor
+
+
+class SimulatedEth:
+    """The `web3.eth` calls an order makes, with the sent nonces recorded"""
+
+    def __init__(self, rpc_s: float):
+        self.rpc_s = rpc_s
+        self.sent = []
+        self.count_calls = 0
+        self._lock = threading.Lock()
+        self.account = SimpleNamespace(sign_transaction=lambda tx, key: SimpleNamespace(raw_transaction=tx))
+
+    def get_transaction_count(self, address, block_identifier="latest"):
+        self.count_calls += 1
+        time.sleep(self.rpc_s / 4)
+        return len(self.sent)
+
+    def send_raw_transaction(self, raw_tx):
+        time.sleep(self.rpc_s / 4)
+        with self._lock:
+            self.sent.append(raw_tx["nonce"])
+        return bytes(32)
+
+
+class SimulatedOrder:
+    """A pyrfx order reduced to what `_multicall_transaction` touches"""
+
+    def __init__(self, config, rpc_s: float):
+        self.config = config
+        self.rpc_s = rpc_s
+        self.debug_mode = False
+        self.max_fee_per_gas = 1
+        self._gas_limits_order_type_contract_function = None
+        self._exchange_router_contract = SimpleNamespace(functions=SimpleNamespace(multicall=self._multicall))
+
+    def _multicall(self, args):
+        return SimpleNamespace(build_transaction=lambda params: dict(params, data=args))
+
+    def _multicall_transaction(self, value_amount, multicall_args):
+        # pyrfx: fetch the nonce from the chain for every transaction
+        nonce = self.config.connection.eth.get_transaction_count(self.config.user_wallet_address)
+        tx = {"nonce": nonce}
+        return self.config.connection.eth.send_raw_transaction(tx)
+
+    def create_and_execute(self):
+        # Prices, markets and gas limits before the transaction itself
+        time.sleep(self.rpc_s / 2)
+        return {"tx_hash": self._multicall_transaction(0, [b"order"])}
+
+
+class ManagedSimulatedOrder(NonceManagedOrder, SimulatedOrder):
+    pass
+
+
+def make_config(rpc_s: float):
+    return SimpleNamespace(
+        connection=SimpleNamespace(eth=SimulatedEth(rpc_s)),
+        user_wallet_address="0x0", chain_id=1, private_key=None,
+    )
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.001) -> float:
+    """Largest gap between ticks of a task that wants to run every `interval` seconds"""
+    worst = 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        worst = max(worst, now - last - interval)
+        last = now
+    return worst
+
+
+async def submit_blocking(config, num_orders: int, rpc_s: float):
+    """Each order awaited in turn, its chain calls run on the event loop"""
+    for _ in range(num_orders):
+        SimulatedOrder(config, rpc_s).create_and_execute()
+        await asyncio.sleep(0)
+
+
+async def submit_pipelined(config, num_orders: int, rpc_s: float, max_in_flight: int):
+    executor = OrderExecutor(max_in_flight=max_in_flight)
+    nonce_manager = NonceManager(config)
+
+    def execute():
+        order = ManagedSimulatedOrder(config, rpc_s)
+        order.nonce_manager = nonce_manager
+        return order.create_and_execute()
+
+    futures = [executor.submit(execute) for _ in range(num_orders)]
+    await asyncio.gather(*futures)
+    executor.shutdown()
+
+
+async def measure(submit, *args):
+    stop = asyncio.Event()
+    ticker = asyncio.ensure_future(heartbeat(stop))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await submit(*args)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await ticker
+
+
+async def run(num_orders: int = 20, rpc_ms: float = 40.0) -> None:
+    rpc_s = rpc_ms / 1e3
+
+    config = make_config(rpc_s)
+    blocking_time, blocking_stall = await measure(submit_blocking, config, num_orders, rpc_s)
+    print(f"{num_orders}-order ladder, {rpc_ms:.0f}ms of chain calls per order")
+    print(f"  blocking on the loop : {blocking_time * 1e3:8.1f} ms, "
+          f"market data stalled up to {blocking_stall * 1e3:6.1f} ms")
+
+    for max_in_flight in (1, 4, 8, 20):
+        config = make_config(rpc_s)
+        pipelined_time, pipelined_stall = await measure(submit_pipelined, config, num_orders, rpc_s, max_in_flight)
+        sent = config.connection.eth.sent
+        assert sorted(sent) == list(range(num_orders)), f"Nonces collided or skipped: {sorted(sent)}"
+        assert config.connection.eth.count_calls == 1, "Nonce fetched from the chain more than once"
+        print(f"  OrderExecutor({max_in_flight:2d})    : {pipelined_time * 1e3:8.1f} ms, "
+              f"market data stalled up to {pipelined_stall * 1e3:6.1f} ms "
+              f"({blocking_time / pipelined_time:.1f}x)")
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Microbenchmark of the incremental orderbook against the previous
+filter + vstack + argsort implementation.
+
+Run from `src`:
+    python -m benchmarks.orderbook
+"""
+import time
+
+import numpy as np
+from numba import njit
+from numba.types import Array, bool_
+
+from exchanges.binance.ws.handlers.orderbook import Orderbook
+
+
+@njit(fastmath=True)
+def nbisin(a: Array, b: Array) -> Array:
+    out = np.empty(a.size, dtype=bool_)
+    b = set(b)
+
+    for i in range(a.size):
+        out[i] = a[i] in b
+
+    return out
+
+
+class LegacyOrderbook:
+    """The rebuild-on-every-diff book this benchmark compares against."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.asks = np.zeros((self.size, 2), dtype=np.float64)
+        self.bids = np.zeros((self.size, 2), dtype=np.float64)
+        self.bba = np.zeros((2, 2), dtype=np.float64)
+        self.seq_id = 0
+
+    def sort_bids(self):
+        self.bids = self.bids[self.bids[:, 0].argsort()][::-1][: self.size]
+        self.bba[0, :] = self.bids[0]
+
+    def sort_asks(self):
+        self.asks = self.asks[self.asks[:, 0].argsort()][: self.size]
+        self.bba[1, :] = self.asks[0]
+
+    def refresh(self, asks, bids, new_seq_id: int):
+        self.seq_id = new_seq_id
+        self.asks[:, :] = asks[: self.size]
+        self.bids[:, :] = bids[: self.size]
+        self.sort_bids()
+        self.sort_asks()
+
+    def update_bids(self, bids, new_seq_id: int):
+        if bids.size == 0 or new_seq_id < self.seq_id:
+            return
+        self.seq_id = new_seq_id
+        self.bids = self.bids[~nbisin(self.bids[:, 0], bids[:, 0])]
+        self.bids = np.vstack((self.bids, bids[bids[:, 1] != 0]))
+        self.sort_bids()
+
+    def update_asks(self, asks, new_seq_id: int):
+        if asks.size == 0 or new_seq_id < self.seq_id:
+            return
+        self.seq_id = new_seq_id
+        self.asks = self.asks[~nbisin(self.asks[:, 0], asks[:, 0])]
+        self.asks = np.vstack((self.asks, asks[asks[:, 1] != 0]))
+        self.sort_asks()
+
+
+def generate_diffs(num_diffs: int, levels_per_diff: int, depth: int, seed: int = 42):
+    """Random-walk book diffs with a mix of inserts, updates and deletes."""
+    rng = np.random.default_rng(seed)
+    tick = 0.01
+    mid = 50_000.0
+    snapshot_bids = np.column_stack((mid - tick * np.arange(1, depth * 2 + 1), rng.uniform(0.1, 5.0, depth * 2)))
+    snapshot_asks = np.column_stack((mid + tick * np.arange(1, depth * 2 + 1), rng.uniform(0.1, 5.0, depth * 2)))
+
+    diffs = []
+    for _ in range(num_diffs):
+        mid += tick * rng.integers(-2, 3)
+        offsets = rng.choice(np.arange(1, depth), levels_per_diff, replace=False)
+        qtys = rng.uniform(0.1, 5.0, levels_per_diff)
+        qtys[rng.random(levels_per_diff) < 0.3] = 0.0
+        bids = np.column_stack((np.round(mid - tick * offsets, 2), qtys))
+        asks = np.column_stack((np.round(mid + tick * offsets, 2), qtys[::-1].copy()))
+        diffs.append((bids, asks))
+
+    return snapshot_bids, snapshot_asks, diffs
+
+
+def run(book, snapshot_bids, snapshot_asks, diffs) -> float:
+    book.refresh(snapshot_asks, snapshot_bids, 1)
+    start = time.perf_counter()
+    for seq_id, (bids, asks) in enumerate(diffs, start=2):
+        book.update_bids(bids, seq_id)
+        book.update_asks(asks, seq_id)
+    return time.perf_counter() - start
+
+
+def main(num_diffs: int = 20_000, levels_per_diff: int = 20, depth: int = 100) -> None:
+    snapshot_bids, snapshot_asks, diffs = generate_diffs(num_diffs, levels_per_diff, depth)
+
+    # Compile both paths before timing.
+    run(LegacyOrderbook(depth), snapshot_bids, snapshot_asks, diffs[:10])
+    run(Orderbook(depth), snapshot_bids, snapshot_asks, diffs[:10])
+
+    legacy, current = LegacyOrderbook(depth), Orderbook(depth)
+    legacy_time = run(legacy, snapshot_bids, snapshot_asks, diffs)
+    current_time = run(current, snapshot_bids, snapshot_asks, diffs)
+
+    assert np.array_equal(legacy.bids[:len(current.bids)], current.bids), "Bids diverged"
+    assert np.array_equal(legacy.asks[:len(current.asks)], current.asks), "Asks diverged"
+
+    print(f"{num_diffs} diffs x {levels_per_diff} levels, depth {depth}")
+    print(f"  legacy      : {legacy_time / num_diffs * 1e6:8.2f} us/diff")
+    print(f"  incremental : {current_time / num_diffs * 1e6:8.2f} us/diff")
+    print(f"  speedup     : {legacy_time / current_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Array-backed quote ladder against the per-level construction it replaces: parity of
+every quote with a reference built level by level from `np.geomspace` and the
+inventory checks, and the cost of generating a ladder and materializing `Quote`s.
+
+Run from `src`:
+    python -m benchmarks.quote_ladder
+"""
+import logging
+import time
+
+import numpy as np
+
+from exchanges.rfx.inventory import DexInventoryManager
+from features.vector import FeatureVector
+from feed.replay import StaticPositionHandler
+from oms.quote import QuoteGenerator, Quote
+from utils.utils import generate_geometric_weights
+
+
+def reference_side(generator: QuoteGenerator, side: str, mid: float, spread: float, larger_size: bool = True):
+    """One side built level by level, as QuoteGenerator did before QuoteLadder"""
+    inventory = generator.inventory_manager
+    n = generator.num_levels
+    half_spread = spread / 2
+    increase = side.startswith('increase')
+    long_side = side.endswith('long')
+    price_width = spread * (5 if increase else 3)
+    below = long_side == increase
+    first = mid * (1 - half_spread) if below else mid * (1 + half_spread)
+    last = mid * (1 - half_spread - price_width) if below else mid * (1 + half_spread + price_width)
+    prefix = ('long' if long_side else 'short') + ('_inc' if increase else '_dec')
+
+    quotes = []
+    if increase:
+        base_size_usd = min(generator.total_quote_size, inventory.max_position - inventory.get_gross_position())
+        sizes_usd = base_size_usd * (1.5 if larger_size else 0.5) * generate_geometric_weights(n, r=0.5)
+        can_increase = inventory.can_increase_long if long_side else inventory.can_increase_short
+        for i, (price, size_usd) in enumerate(zip(np.geomspace(first, last, n), sizes_usd)):
+            if can_increase(size_usd / price):
+                quotes.append(Quote(round(float(price), 2), round(float(size_usd / price), 6),
+                                    round(float(size_usd), 2), side, f'{prefix}_{i:02d}'))
+    else:
+        current = inventory.position.long_size if long_side else inventory.position.short_size
+        if current > 0:
+            size = current / n
+            for i, price in enumerate(np.geomspace(first, last, n)):
+                quotes.append(Quote(round(float(price), 2), round(float(size), 6),
+                                    round(float(size * price), 2), side, f'{prefix}_{i:02d}'))
+    return quotes
+
+
+def reference_quotes(generator: QuoteGenerator, features: FeatureVector):
+    spread = generator._calculate_spread(features.volatility)
+    skew = generator._adjust_skew(features.skew)
+    mid = features.adjusted_mid
+    if skew < 0:
+        sides = [('increase_short', True), ('decrease_long', True), ('increase_long', False)]
+    elif skew > 0:
+        sides = [('increase_long', True), ('decrease_short', True), ('increase_short', False)]
+    else:
+        sides = [('increase_long', True), ('increase_short', True)]
+    return [quote for side, larger in sides for quote in reference_side(generator, side, mid, spread, larger)]
+
+
+def features_for(rng) -> FeatureVector:
+    features = FeatureVector()
+    features.adjusted_mid = float(rng.uniform(100.0, 100_000.0))
+    features.skew = float(rng.normal())
+    features.volatility = float(rng.uniform(0.0, 50.0))
+    return features
+
+
+def check_parity(num_checks: int = 2000) -> None:
+    rng = np.random.default_rng(42)
+    for _ in range(num_checks):
+        inventory = DexInventoryManager(StaticPositionHandler(*rng.uniform(0.0, 30.0, 2)), 50.0, 10.0)
+        generator = QuoteGenerator(inventory, num_levels=int(rng.integers(2, 20)),
+                                   total_quote_size=float(rng.uniform(1.0, 2000.0)), vol_impact=0.1)
+        features = features_for(rng)
+        quotes = generator.generate_quotes(features).to_quotes()
+        expected = reference_quotes(generator, features)
+        assert len(quotes) == len(expected), f"{len(quotes)} quotes != {len(expected)}"
+        for quote, reference in zip(quotes, expected):
+            assert (quote.side, quote.order_id) == (reference.side, reference.order_id), f"{quote} != {reference}"
+            assert abs(quote.price - reference.price) <= 0.01 + 1e-9, f"{quote} != {reference}"
+            assert abs(quote.size - reference.size) <= 1e-6 + 1e-12, f"{quote} != {reference}"
+            assert abs(quote.size_usd - reference.size_usd) <= 0.01 + 1e-9, f"{quote} != {reference}"
+
+
+def main(iterations: int = 20_000) -> None:
+    logging.disable(logging.INFO)
+    check_parity()
+
+    inventory = DexInventoryManager(StaticPositionHandler(5.0, 3.0), 50.0, 10.0)
+    features = features_for(np.random.default_rng(1))
+    features.skew = 0.5
+    for num_levels in (10, 20):
+        generator = QuoteGenerator(inventory, num_levels=num_levels, total_quote_size=5.0)
+        ladder = generator.generate_quotes(features)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            reference_quotes(generator, features)
+        reference_time = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            generator.generate_quotes(features)
+        ladder_time = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            ladder.to_quotes()
+        materialize_time = (time.perf_counter() - start) / iterations
+
+        print(f"{num_levels} levels, {len(ladder)} quotes over three sides")
+        print(f"  per-level quotes : {reference_time * 1e6:8.2f} us")
+        print(f"  QuoteLadder      : {ladder_time * 1e6:8.2f} us ({reference_time / ladder_time:.1f}x)")
+        print(f"  to_quotes        : {materialize_time * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Streaming trade-flow features against the vectorized window kernels they replace:
+parity of `TradeFlow` with `trades_imbalance`/`trades_diffs` after every trade, and
+the cost of reading the features once per `compute_features` call.
+
+Run from `src`:
+    python -m benchmarks.trade_flow
+"""
+import time
+
+import numpy as np
+
+from exchanges.binance.ws.handlers.trades import BinanceTradesHandler, Side, Trade
+from features.trades_diff import trades_diffs
+from features.trades_imbalance import trades_imbalance
+
+
+def generate_trades(num_trades: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    prices = 50_000.0 + np.cumsum(rng.normal(0.0, 2.0, num_trades))
+    sizes = rng.lognormal(-4.0, 1.5, num_trades)
+    sides = np.where(rng.random(num_trades) < 0.5, Side.BUY, Side.SELL)
+    return [
+        Trade(timestamp=float(i), side=float(side), price=float(price), size=float(size))
+        for i, (side, price, size) in enumerate(zip(sides, prices, sizes))
+    ]
+
+
+def check_parity(trades, window: int = 100, lookback: int = 100) -> None:
+    handler = BinanceTradesHandler(length=1000, flow_lookback=lookback)
+    for i, trade in enumerate(trades):
+        handler.add_single(trade)
+        if i < 1:
+            continue
+        buffer = handler.unwrap()
+        expected_imbalance = trades_imbalance(buffer, window)
+        expected_volatility = trades_diffs(buffer, lookback)
+        assert abs(handler.flow.imbalance() - expected_imbalance) < 1e-9, \
+            f"Imbalance diverged at trade {i}: {handler.flow.imbalance()} != {expected_imbalance}"
+        assert abs(handler.flow.abs_price_change() - expected_volatility) < 1e-6 * max(1.0, expected_volatility), \
+            f"Abs price change diverged at trade {i}: {handler.flow.abs_price_change()} != {expected_volatility}"
+
+
+def main(num_trades: int = 20_000, window: int = 100, lookback: int = 100) -> None:
+    trades = generate_trades(num_trades)
+    check_parity(trades, window, lookback)
+
+    handler = BinanceTradesHandler(length=1000, flow_lookback=lookback)
+    handler.add_many(trades)
+    buffer = handler.unwrap()
+    trades_imbalance(buffer, window)
+    trades_diffs(buffer, lookback)
+
+    reads = 100_000
+    start = time.perf_counter()
+    for _ in range(reads):
+        buffer = handler.unwrap()
+        trades_imbalance(buffer, window)
+        trades_diffs(buffer, lookback)
+    vectorized_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(reads):
+        handler.flow.imbalance()
+        handler.flow.abs_price_change()
+    streaming_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for trade in trades:
+        handler.flow.update(trade.side, trade.price, trade.size)
+    update_time = time.perf_counter() - start
+
+    print(f"Parity OK over {num_trades} trades (window {window}, lookback {lookback})")
+    print(f"  vectorized read : {vectorized_time / reads * 1e6:8.2f} us")
+    print(f"  streaming read  : {streaming_time / reads * 1e6:8.2f} us")
+    print(f"  streaming update: {update_time / num_trades * 1e6:8.2f} us/trade")
+
+
+if __name__ == "__main__":
+    main()
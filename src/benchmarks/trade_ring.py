@@ -0,0 +1,126 @@
+"""
+Mirrored columnar trade ring against the `numpy_ringbuffer.RingBuffer` it replaces:
+parity of the buffered trades under wrap-around, append throughput per trade and per
+decoded batch during bursts, and the cost of reading the buffer for a feature
+computation.
+
+Run from `src`:
+    python -m benchmarks.trade_ring
+"""
+import time
+
+import numpy as np
+from numpy_ringbuffer import RingBuffer
+
+from exchanges.binance.ws.handlers.trades import BinanceTradesHandler
+from features.multi_horizon import TradeHorizons
+from features.trade_flow import TradeFlow
+
+
+class LegacyTrades:
+    """The previous buffer: one array allocation per trade and a full copy per read"""
+
+    def __init__(self, length: int):
+        self._rb_ = RingBuffer(length, dtype=(np.float64, 4))
+        self.flow = TradeFlow()
+
+    def add(self, timestamp: float, side: float, price: float, size: float):
+        self._rb_.append(np.array([timestamp, side, price, size], dtype=np.float64))
+        self.flow.update(side, price, size)
+
+    def unwrap(self):
+        return self._rb_._unwrap()
+
+
+def generate_bursts(num_trades: int, burst_size: int, seed: int = 42) -> np.ndarray:
+    """Trades arriving in bursts of `burst_size` within 1ms, 100ms apart"""
+    rng = np.random.default_rng(seed)
+    burst = np.arange(num_trades) // burst_size
+    times = 1.7e12 + burst * 100.0 + rng.uniform(0.0, 1.0, num_trades)
+    return np.column_stack([
+        np.sort(times),
+        np.where(rng.random(num_trades) < 0.5, 1.0, -1.0),
+        50_000.0 + np.cumsum(rng.normal(0.0, 2.0, num_trades)),
+        rng.lognormal(-4.0, 1.5, num_trades),
+    ])
+
+
+def check_parity(trades: np.ndarray, length: int) -> None:
+    legacy = LegacyTrades(length)
+    handler = BinanceTradesHandler(length=length)
+    batched = BinanceTradesHandler(length=length)
+    rng = np.random.default_rng(7)
+    start = 0
+    while start < trades.shape[0]:
+        end = min(start + int(rng.integers(1, 2 * length)), trades.shape[0])
+        for row in trades[start:end].tolist():
+            legacy.add(*row)
+            handler.add(*row)
+        batched.add_batch(trades[start:end])
+        expected = legacy.unwrap()
+        assert np.array_equal(handler.unwrap(), expected), f"Ring diverged after {end} trades"
+        assert np.array_equal(batched.unwrap(), expected), f"Batched ring diverged after {end} trades"
+        assert np.array_equal(handler.window(10), expected[-10:]), f"Window diverged after {end} trades"
+        assert abs(handler.flow.abs_price_change() - batched.flow.abs_price_change()) < 1e-6
+        start = end
+
+
+def main(num_trades: int = 200_000, burst_size: int = 2_000, length: int = 1000) -> None:
+    trades = generate_bursts(num_trades, burst_size)
+    check_parity(trades[:20_000], length)
+    rows = trades.tolist()
+    horizons = TradeHorizons(trades=[100, 500], seconds=[1, 5, 30, 300], volumes=[1.0, 10.0])
+
+    legacy = LegacyTrades(length)
+    start = time.perf_counter()
+    for row in rows:
+        legacy.add(*row)
+    legacy_single = time.perf_counter() - start
+
+    handler = BinanceTradesHandler(length=length)
+    start = time.perf_counter()
+    for row in rows:
+        handler.add(*row)
+    ring_single = time.perf_counter() - start
+
+    handler = BinanceTradesHandler(length=length)
+    start = time.perf_counter()
+    for i in range(0, num_trades, burst_size):
+        handler.add_batch(trades[i:i + burst_size])
+    ring_batch = time.perf_counter() - start
+
+    reads = 20_000
+    now_ms = trades[-1, 0]
+    start = time.perf_counter()
+    for _ in range(reads):
+        legacy.unwrap()
+    legacy_unwrap = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(reads):
+        handler.unwrap()
+    ring_unwrap = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(reads):
+        horizons.compute(legacy.unwrap(), now_ms)
+    legacy_read = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(reads):
+        horizons.compute(handler.unwrap(), now_ms)
+    ring_read = time.perf_counter() - start
+
+    print(f"{num_trades} trades in bursts of {burst_size}, buffer of {length}")
+    print(f"  legacy append  : {num_trades / legacy_single:12,.0f} trades/s")
+    print(f"  ring append    : {num_trades / ring_single:12,.0f} trades/s ({legacy_single / ring_single:.1f}x)")
+    print(f"  ring add_batch : {num_trades / ring_batch:12,.0f} trades/s ({legacy_single / ring_batch:.1f}x)")
+    print(f"  legacy unwrap  : {legacy_unwrap / reads * 1e6:8.2f} us")
+    print(f"  ring unwrap    : {ring_unwrap / reads * 1e6:8.2f} us ({legacy_unwrap / ring_unwrap:.1f}x)")
+    print(f"  legacy read    : {legacy_read / reads * 1e6:8.2f} us per feature computation")
+    print(f"  ring read      : {ring_read / reads * 1e6:8.2f} us per feature computation "
+          f"({legacy_read / ring_read:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
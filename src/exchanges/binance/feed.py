@@ -1,13 +1,19 @@
 import asyncio
-from typing import Tuple, Dict, List, Any
+import time
+from typing import Dict, List, Any, Optional, Set, Union
 import ssl
 import websockets
 import orjson
 from exchanges.binance.ws.handlers.trades import BinanceTradesHandler
 from exchanges.binance.ws.handlers.kline import BinanceOhlcvHandler
 from exchanges.binance.ws.handlers.orderbook import BinanceOrderbookHandler
+from exchanges.binance.ws.handlers.bba import BinanceBbaHandler
 from exchanges.binance.get.client import BinanceClient
 from exchanges.binance.ws.public import BinancePublicWs
+from exchanges.binance.ws.decoders import BinanceStreamDecoder, StreamMessage
+from feed.events import EventBus, topic
+from feed.recorder import MarketDataRecorder, RECORD_WS_FRAME, RECORD_DEPTH_SNAPSHOT
+from utils.latency import latency
 import logging
 
 
@@ -17,94 +23,210 @@ logger = logging.getLogger(__name__)
 class BinanceWebsocket:
     """
     Handles Websocket connections and data management for Binance.
+
+    One instance serves any number of symbols: their streams are multiplexed over
+    combined-stream connections, sharded so no connection exceeds
+    `max_streams_per_connection`, and each frame is routed to that symbol's handlers
+    by the payload's `s` field. Event bus topics are per symbol, see `feed.events.topic`.
+
+    If a `recorder` is given, every raw frame is queued to it with its local receive
+    time, along with the REST depth snapshots the orderbooks are built from.
     """
 
-    def __init__(self, symbol: str) -> None:
-        self.symbol = symbol
+    # Event bus topic published after each handler update
+    EVENT_TOPICS = {
+        "depthUpdate": "book",
+        "trade": "trades",
+        "kline": "candles",
+        "bookTicker": "bba",
+    }
+
+    # Latency stage comparing each event's Binance event time with its local receive time
+    LAG_STAGES = {
+        "depthUpdate": "exchange_lag.depthUpdate",
+        "trade": "exchange_lag.trade",
+        "kline": "exchange_lag.kline",
+    }
+
+    def __init__(self,
+                 symbols: Union[str, List[str]],
+                 events: Optional[EventBus] = None,
+                 max_streams_per_connection: int = 200,
+                 recorder: Optional[MarketDataRecorder] = None,
+                 trades_length: int = 1000,
+                 orderbook_size: int = 1000,
+                 orderbook_refill_interval: float = 600.0) -> None:
+        self.symbols = [symbols.lower()] if isinstance(symbols, str) else [s.lower() for s in symbols]
+        self.symbol = self.symbols[0]
+        self.events = events if events is not None else EventBus()
         self.client = BinanceClient()
-        self.ws_url, self.ws_topics = BinancePublicWs(self.symbol).multi_stream_request(
-            topics=["Trades", "Orderbook", "Kline"], interval="1m"
+        self.decoder = BinanceStreamDecoder()
+        self.recorder = recorder
+        self.trades_length = trades_length
+        # Levels per side kept and fetched per snapshot; deeper than the widest depth band
+        self.orderbook_size = orderbook_size
+        self.orderbook_refill_interval = orderbook_refill_interval
+        self.ws_requests = BinancePublicWs.sharded_stream_request(
+            symbols=self.symbols,
+            topics=["Trades", "Orderbook", "BBA", "Kline"],
+            max_streams_per_connection=max_streams_per_connection,
+            interval="1m"
         )
-        self.data = {
-            "orderbook": {},
-            "trades": [],
-            "ohlcv": []
-        }
+        self.time_to_first_book: Dict[str, float] = {}
+        # time.monotonic_ns() receive time of the latest frame applied, per symbol
+        self.last_frame_ns: Dict[str, int] = {symbol: 0 for symbol in self.symbols}
+        self._started_at = 0.0
+        self.create_handlers()
 
     def create_handlers(self) -> None:
-        self.public_handler_map = {
-            "depthUpdate": BinanceOrderbookHandler(size=100),
-            "trade": BinanceTradesHandler(length=1000),
-            "kline": BinanceOhlcvHandler(length=1000),
-        }
-        self.public_handler_map["bookTicker"] = self.public_handler_map["depthUpdate"]
+        self.handlers: Dict[str, Dict[str, Any]] = {}
+        self._orderbook_resync: Dict[str, asyncio.Event] = {}
+        # Symbols whose bootstrap has applied its snapshot; until then resyncs are left to it
+        self._bootstrapped: Set[str] = set()
+        self._topics: Dict[str, Dict[str, str]] = {}
+
+        for symbol in self.symbols:
+            handler_map = {
+                "depthUpdate": BinanceOrderbookHandler(size=self.orderbook_size),
+                "trade": BinanceTradesHandler(length=self.trades_length),
+                "kline": BinanceOhlcvHandler(length=1000),
+                "bookTicker": BinanceBbaHandler(),
+            }
+            self.handlers[symbol] = handler_map
+            self._orderbook_resync[symbol] = asyncio.Event()
+            self._topics[symbol] = {event: topic(symbol, name) for event, name in self.EVENT_TOPICS.items()}
+
+    @property
+    def public_handler_map(self) -> Dict[str, Any]:
+        """Handlers of the first symbol"""
+        return self.handlers[self.symbol]
+
+    async def bootstrap(self, symbol: str) -> None:
+        """
+        Fetches the initial orderbook snapshot, recent trades and klines for a symbol concurrently.
+
+        Runs alongside the public stream so depth diffs received while the snapshot is in
+        flight are buffered by the orderbook handler and replayed onto it. Those diffs do not
+        request a resync until the bootstrap snapshot has been applied, so only one snapshot
+        request is in flight at startup.
+        """
+        handler_map = self.handlers[symbol]
+        orderbook_data, trades_data, ohlcv_data = await asyncio.gather(
+            self.client.get_order_book(symbol, limit=handler_map["depthUpdate"].size),
+            self.client.get_recent_trades(symbol),
+            self.client.get_klines(symbol, "1m"),
+            return_exceptions=True,
+        )
+
+        for name, data, event in (("trades", trades_data, "trade"), ("ohlcv", ohlcv_data, "kline")):
+            try:
+                if isinstance(data, Exception) or not data:
+                    raise Exception(data or "empty response")
+                handler_map[event].refresh(data)
+                self.events.publish(self._topics[symbol][event])
+            except Exception as e:
+                logger.error(f"Bootstrap {symbol} {name} error: {e}")
+
+        handler = handler_map["depthUpdate"]
+        try:
+            if isinstance(orderbook_data, Exception) or not orderbook_data:
+                raise Exception(orderbook_data or "empty response")
+            self._record_depth_snapshot(symbol, orderbook_data)
+            handler.refresh(orderbook_data)
+        except Exception as e:
+            logger.error(f"Bootstrap {symbol} orderbook error: {e}")
+
+        self._bootstrapped.add(symbol)
+        if handler.synced:
+            self._on_orderbook_synced(symbol)
+        else:
+            self._orderbook_resync[symbol].set()
 
-    async def refresh_orderbook_data(self, timer: int = 600) -> None:
+    def _record_depth_snapshot(self, symbol: str, orderbook_data: Dict) -> None:
+        if self.recorder is not None:
+            self.recorder.record(RECORD_DEPTH_SNAPSHOT, {"symbol": symbol, "data": orderbook_data})
+
+    def _on_orderbook_synced(self, symbol: str) -> None:
+        if symbol not in self.time_to_first_book:
+            self.time_to_first_book[symbol] = time.monotonic() - self._started_at
+            logger.info(f"Time to first valid {symbol} orderbook: {self.time_to_first_book[symbol] * 1000:.1f}ms")
+        self.events.publish(self._topics[symbol]["depthUpdate"])
+
+    async def maintain_orderbook(self, symbol: str, retry_delay: float = 1.0) -> None:
+        """
+        Fetches a depth snapshot whenever the symbol's orderbook handler loses sync with the
+        stream, and every `orderbook_refill_interval` seconds while it is in sync, to refill
+        the levels pulled in from the tail of the book since the last snapshot.
+        """
+        handler = self.handlers[symbol]["depthUpdate"]
+        resync = self._orderbook_resync[symbol]
         while True:
             try:
-                orderbook_data = await self.client.get_order_book(self.symbol)
-                self.public_handler_map["depthUpdate"].refresh(orderbook_data)
-                await asyncio.sleep(timer)
+                await asyncio.wait_for(resync.wait(), timeout=self.orderbook_refill_interval)
+            except asyncio.TimeoutError:
+                handler.start_refill()
+            resync.clear()
+            if handler.synced and not handler.refilling:
+                continue
+
+            try:
+                orderbook_data = await self.client.get_order_book(symbol, limit=handler.size)
+                if orderbook_data:
+                    self._record_depth_snapshot(symbol, orderbook_data)
+                    handler.refresh(orderbook_data)
+                    if handler.synced:
+                        self._on_orderbook_synced(symbol)
 
             except Exception as e:
-                print(f"Orderbook refresh error: {e}")
+                logger.error(f"Orderbook {symbol} resync error: {e}")
 
-    async def refresh_trades_data(self, timer: int = 600) -> None:
+            if not handler.synced:
+                await asyncio.sleep(retry_delay)
+                resync.set()
+
+    async def refresh_trades_data(self, symbol: str, timer: int = 600) -> None:
         while True:
+            await asyncio.sleep(timer)
             try:
-                trades_data = await self.client.get_recent_trades(self.symbol)
-                self.public_handler_map["trade"].refresh(trades_data)
-                await asyncio.sleep(timer)
+                trades_data = await self.client.get_recent_trades(symbol)
+                self.handlers[symbol]["trade"].refresh(trades_data)
+                self.events.publish(self._topics[symbol]["trade"])
 
             except Exception as e:
-                print(f"Trades refresh error: {e}")
+                logger.error(f"Trades {symbol} refresh error: {e}")
 
-    async def refresh_ohlcv_data(self, timer: int = 600) -> None:
+    async def refresh_ohlcv_data(self, symbol: str, timer: int = 600) -> None:
         while True:
+            await asyncio.sleep(timer)
             try:
-                ohlcv_data = await self.client.get_klines(self.symbol, "1m")
-                self.public_handler_map["kline"].refresh(ohlcv_data)
-                await asyncio.sleep(timer)
+                ohlcv_data = await self.client.get_klines(symbol, "1m")
+                self.handlers[symbol]["kline"].refresh(ohlcv_data)
+                self.events.publish(self._topics[symbol]["kline"])
 
             except Exception as e:
-                print(f"OHLCV refresh error: {e}")
-
-    def public_stream_sub(self) -> Tuple[str, Dict[str, Any]]:
-        request = {
-            "method": "SUBSCRIBE",
-            "params": [
-                f"{self.symbol.lower()}@trade",
-                f"{self.symbol.lower()}@depth@100ms",
-                f"{self.symbol.lower()}@kline_1m"
-            ],
-        }
-        return (self.ws_url, request)
-
+                logger.error(f"OHLCV {symbol} refresh error: {e}")
 
-    async def public_stream_handler(self, recv: Dict[str, Any]) -> None:
-        try:
-            self.public_handler_map[recv["e"]].process(recv)
-    
-        except KeyError as ke:
-            if "id" not in recv:
-                raise ke
-    
-        except Exception as e:
-            raise e
+    async def public_stream_handler(self, msg: StreamMessage, recv_ns: int = 0) -> None:
+        symbol = msg.symbol.lower()
+        handler = self.handlers[symbol][msg.event]
+        handler.process(msg)
+        self.last_frame_ns[symbol] = recv_ns
+        if msg.event == "depthUpdate" and not handler.synced:
+            if symbol in self._bootstrapped:
+                self._orderbook_resync[symbol].set()
+            return
+        self.events.publish(self._topics[symbol][msg.event])
 
     async def start_public_stream(self) -> None:
         """
-        Initializes and starts the public Websocket stream.
+        Initializes and starts one public Websocket connection per stream shard.
         """
         try:
-            url, requests = self.public_stream_sub()
-            await self.start_public_ws(url, requests)
+            await asyncio.gather(*(self.start_public_ws(url) for url, _ in self.ws_requests))
         except Exception as e:
-            print(f"Public stream error: {e}")
+            logger.error(f"Public stream error: {e}")
 
-
-
-    async def start_public_ws(self, url: str, request: List[Dict[str, Any]]) -> None:
+    async def start_public_ws(self, url: str) -> None:
         """Start websocket connection for public data"""
         ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
         ssl_context.check_hostname = False
@@ -115,18 +237,22 @@ class BinanceWebsocket:
                 async with websockets.connect(url, ssl=ssl_context) as websocket:
                     logger.info(f"Connected to {url}")
                     
-                    request_str = orjson.dumps(request).decode('utf-8')
-                    await websocket.send(request_str)
-                    
                     while True:
                         try:
                             recv = await websocket.recv()
-                            if isinstance(recv, str):
-                                data = orjson.loads(recv.encode('utf-8'))
-                            else:
-                                data = orjson.loads(recv)
-                                
-                            await self.start_public_ws(url, request)
+                            recv_ns = time.monotonic_ns()
+                            wall_ns = time.time_ns()
+                            if self.recorder is not None:
+                                self.recorder.record(RECORD_WS_FRAME, recv, wall_ns)
+                            msg = self.decoder.decode(recv)
+                            decoded_ns = time.monotonic_ns()
+                            if msg is not None:
+                                await self.public_stream_handler(msg, recv_ns)
+                                latency.record("decode", recv_ns, decoded_ns)
+                                latency.record("handler", decoded_ns)
+                                lag_stage = self.LAG_STAGES.get(msg.event)
+                                if lag_stage is not None:
+                                    latency.record_duration(lag_stage, wall_ns - int(msg.event_time * 1e6))
                             
                         except orjson.JSONDecodeError as e:
                             logger.error(f"JSON decode error: {e}, raw data: {recv[:100]}...")
@@ -151,24 +277,35 @@ class BinanceWebsocket:
 
 
     async def start(self) -> None:
-        self.create_handlers()
-        await asyncio.gather(
-            self.refresh_orderbook_data(),
-            self.refresh_trades_data(),
-            self.refresh_ohlcv_data(),
-            self.start_public_stream(),
-        )
+        self._started_at = time.monotonic()
+        await self.client.start()
+        try:
+            await asyncio.gather(
+                self.start_public_stream(),
+                *(self.bootstrap(symbol) for symbol in self.symbols),
+                *(self.maintain_orderbook(symbol) for symbol in self.symbols),
+                *(self.refresh_trades_data(symbol) for symbol in self.symbols),
+                *(self.refresh_ohlcv_data(symbol) for symbol in self.symbols),
+            )
+        finally:
+            await self.client.close()
 
-    def get_latest_data(self):
-        print("Fetching latest market data...") 
-        
-        orderbook_data = self.public_handler_map["depthUpdate"].recordable()
-        trades_data = self.public_handler_map["trade"].recordable() 
-        ohlcv_data = self.public_handler_map["kline"].recordable() 
-
-        return {
-            "orderbook": orderbook_data,
-            "trades": trades_data,
-            "ohlcv": ohlcv_data,
-        }
+    async def stop(self) -> None:
+        await self.client.close()
 
+    def get_latest_data(self, symbol: Optional[str] = None, records: bool = False) -> Dict[str, Any]:
+        """
+        Get versioned snapshots of a symbol's orderbook, trades, candles and top of book (the first
+        symbol by default). Pass `records=True` to get the (much more expensive)
+        dict/record conversion instead.
+        """
+        handler_map = self.handlers[symbol.lower() if symbol else self.symbol]
+        handlers = {
+            "orderbook": handler_map["depthUpdate"],
+            "trades": handler_map["trade"],
+            "ohlcv": handler_map["kline"],
+            "bba": handler_map["bookTicker"],
+        }
+        if records:
+            return {name: handler.recordable() for name, handler in handlers.items()}
+        return {name: handler.snapshot() for name, handler in handlers.items()}
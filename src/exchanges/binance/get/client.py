@@ -2,14 +2,55 @@ import aiohttp
 import asyncio
 import orjson
 import logging
+from typing import Optional
 
 
 logger = logging.getLogger(__name__)
 
 
 class BinanceClient:
-    def __init__(self, base_url="https://api.binance.com"):
+    """
+    REST client for Binance public market data.
+
+    Owns one long-lived `aiohttp.ClientSession` whose connector keeps connections
+    alive between requests, so only the first call pays DNS, TCP and TLS setup.
+    Call `start()` (or use the client as an async context manager) before use and
+    `close()` on shutdown; a session is also created lazily on first request.
+    """
+    def __init__(self, base_url="https://api.binance.com", connection_limit: int = 10, keepalive_timeout: float = 60.0):
         self.base_url = base_url
+        self.connection_limit = connection_limit
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Open the pooled session"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=False,
+                limit=self.connection_limit,
+                ttl_dns_cache=300,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self) -> None:
+        """Close the pooled session and its connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "BinanceClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
 
     async def fetch(self, session, endpoint, params):
         """Fetch data from API endpoint using orjson"""
@@ -41,8 +82,7 @@ class BinanceClient:
             "symbol": symbol.upper(),
             "limit": limit
         }
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            return await self.fetch(session, endpoint, params)
+        return await self.fetch(await self._get_session(), endpoint, params)
 
     async def get_recent_trades(self, symbol, limit=500):
         endpoint = "/api/v3/trades"
@@ -50,8 +90,7 @@ class BinanceClient:
             "symbol": symbol.upper(),
             "limit": limit
         }
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            return await self.fetch(session, endpoint, params)
+        return await self.fetch(await self._get_session(), endpoint, params)
 
     async def get_klines(self, symbol, interval, limit=500, start_time=None, end_time=None):
         endpoint = "/api/v3/klines"
@@ -64,7 +103,6 @@ class BinanceClient:
             params["startTime"] = start_time
         if end_time:
             params["endTime"] = end_time
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            return await self.fetch(session, endpoint, params)
+        return await self.fetch(await self._get_session(), endpoint, params)
 
 
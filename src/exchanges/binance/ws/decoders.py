@@ -0,0 +1,201 @@
+from itertools import chain
+from typing import Any, Dict, Optional, Union
+import numpy as np
+import orjson
+
+
+Frame = Union[str, bytes]
+
+
+class DepthUpdate:
+    """Decoded `depthUpdate` event. `bids`/`asks` are views into the decoder's scratch arrays."""
+    __slots__ = ("symbol", "event_time", "first_id", "final_id", "bids", "asks")
+    event = "depthUpdate"
+
+    def __init__(self):
+        self.symbol = ""
+        self.event_time = 0.0
+        self.first_id = 0
+        self.final_id = 0
+        self.bids = np.empty((0, 2), dtype=np.float64)
+        self.asks = np.empty((0, 2), dtype=np.float64)
+
+    def copy(self) -> "DepthUpdate":
+        out = DepthUpdate()
+        out.symbol = self.symbol
+        out.event_time = self.event_time
+        out.first_id = self.first_id
+        out.final_id = self.final_id
+        out.bids = self.bids.copy()
+        out.asks = self.asks.copy()
+        return out
+
+
+class TradeUpdate:
+    __slots__ = ("symbol", "event_time", "trade_id", "trade_time", "price", "size", "is_buyer_maker")
+    event = "trade"
+
+    def __init__(self):
+        self.symbol = ""
+        self.event_time = 0.0
+        self.trade_id = 0
+        self.trade_time = 0.0
+        self.price = 0.0
+        self.size = 0.0
+        self.is_buyer_maker = False
+
+
+class KlineUpdate:
+    __slots__ = ("symbol", "event_time", "open_time", "open", "high", "low", "close", "volume", "closed")
+    event = "kline"
+
+    def __init__(self):
+        self.symbol = ""
+        self.event_time = 0.0
+        self.open_time = 0.0
+        self.open = 0.0
+        self.high = 0.0
+        self.low = 0.0
+        self.close = 0.0
+        self.volume = 0.0
+        self.closed = False
+
+
+class BookTickerUpdate:
+    __slots__ = ("symbol", "update_id", "bid_price", "bid_qty", "ask_price", "ask_qty")
+    event = "bookTicker"
+
+    def __init__(self):
+        self.symbol = ""
+        self.update_id = 0
+        self.bid_price = 0.0
+        self.bid_qty = 0.0
+        self.ask_price = 0.0
+        self.ask_qty = 0.0
+
+
+StreamMessage = Union[DepthUpdate, TradeUpdate, KlineUpdate, BookTickerUpdate]
+
+
+class BinanceStreamDecoder:
+    """
+    Schema-specific decoder for Binance public stream frames.
+
+    Recognises `depthUpdate`, `trade`, `kline` and `bookTicker` payloads, either raw or wrapped
+    in the combined-stream envelope, and parses them into slotted message structs. The frame is
+    parsed once, str or bytes as received, and dispatch is cached per stream name. One struct
+    per message type and the depth level arrays are preallocated and reused for every frame,
+    so a decoded message is only valid until the next call to `decode`; use `DepthUpdate.copy`
+    to keep one around.
+    """
+
+    def __init__(self, max_levels: int = 1000):
+        self._max_levels = max_levels
+        self._bids = np.empty((max_levels, 2), dtype=np.float64)
+        self._asks = np.empty((max_levels, 2), dtype=np.float64)
+        self._bids_flat = self._bids.reshape(-1)
+        self._asks_flat = self._asks.reshape(-1)
+        self._depth = DepthUpdate()
+        self._trade = TradeUpdate()
+        self._kline = KlineUpdate()
+        self._book_ticker = BookTickerUpdate()
+
+        self._event_decoders = {
+            "depthUpdate": self._decode_depth,
+            "trade": self._decode_trade,
+            "kline": self._decode_kline,
+            "bookTicker": self._decode_book_ticker,
+        }
+        self._stream_decoders: Dict[str, Any] = {}
+
+    def _decoder_for_stream(self, stream: str):
+        decoder = self._stream_decoders.get(stream)
+        if decoder is None:
+            kind = stream.split("@")[1] if "@" in stream else ""
+            if kind.startswith("depth"):
+                decoder = self._decode_depth
+            elif kind == "trade":
+                decoder = self._decode_trade
+            elif kind.startswith("kline"):
+                decoder = self._decode_kline
+            elif kind == "bookTicker":
+                decoder = self._decode_book_ticker
+            else:
+                return None
+            self._stream_decoders[stream] = decoder
+        return decoder
+
+    def _decoder_for_payload(self, data: Dict[str, Any]):
+        event = data.get("e")
+        if event is not None:
+            return self._event_decoders.get(event)
+        if "A" in data and "u" in data:
+            return self._decode_book_ticker
+        return None
+
+    def decode(self, raw: Frame) -> Optional[StreamMessage]:
+        """
+        Decodes a single websocket frame. Returns None for frames that are not market data,
+        such as subscription acknowledgements, or for unrecognised streams.
+        """
+        data = orjson.loads(raw)
+        stream = data.get("stream")
+        if stream is not None:
+            data = data["data"]
+
+        decoder = self._decoder_for_stream(stream) if stream else self._decoder_for_payload(data)
+        if decoder is None:
+            return None
+        return decoder(data)
+
+    def _fill_levels(self, buffer: np.ndarray, flat: np.ndarray, levels) -> np.ndarray:
+        num_levels = len(levels)
+        if num_levels > self._max_levels:
+            raise ValueError(f"{num_levels} levels exceed decoder capacity {self._max_levels}")
+        flat[:2 * num_levels] = np.fromiter(chain.from_iterable(levels), dtype=np.float64, count=2 * num_levels)
+        return buffer[:num_levels]
+
+    def _decode_depth(self, data: Dict[str, Any]) -> DepthUpdate:
+        msg = self._depth
+        msg.symbol = data["s"]
+        msg.event_time = float(data["E"])
+        msg.first_id = data["U"]
+        msg.final_id = data["u"]
+        msg.bids = self._fill_levels(self._bids, self._bids_flat, data["b"])
+        msg.asks = self._fill_levels(self._asks, self._asks_flat, data["a"])
+        return msg
+
+    def _decode_trade(self, data: Dict[str, Any]) -> TradeUpdate:
+        msg = self._trade
+        msg.symbol = data["s"]
+        msg.event_time = float(data["E"])
+        msg.trade_id = data["t"]
+        msg.trade_time = float(data["T"])
+        msg.price = float(data["p"])
+        msg.size = float(data["q"])
+        msg.is_buyer_maker = data["m"]
+        return msg
+
+    def _decode_kline(self, data: Dict[str, Any]) -> KlineUpdate:
+        candle = data["k"]
+        msg = self._kline
+        msg.symbol = data["s"]
+        msg.event_time = float(data["E"])
+        msg.open_time = float(candle["t"])
+        msg.open = float(candle["o"])
+        msg.high = float(candle["h"])
+        msg.low = float(candle["l"])
+        msg.close = float(candle["c"])
+        msg.volume = float(candle["v"])
+        msg.closed = candle["x"]
+        return msg
+
+    def _decode_book_ticker(self, data: Dict[str, Any]) -> BookTickerUpdate:
+        msg = self._book_ticker
+        msg.symbol = data["s"]
+        msg.update_id = data["u"]
+        msg.bid_price = float(data["b"])
+        msg.bid_qty = float(data["B"])
+        msg.ask_price = float(data["a"])
+        msg.ask_qty = float(data["A"])
+        return msg
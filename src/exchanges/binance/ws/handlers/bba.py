@@ -0,0 +1,81 @@
+from typing import Dict
+from exchanges.binance.ws.decoders import BookTickerUpdate
+
+
+class BestBidAsk:
+    """
+    Top of book with the L1 features derived from it, recomputed on every update.
+
+    `update_id` is the orderbook update id the quote reflects, the same sequence as the
+    depth stream's `seq_id`, so the fresher of the two sources can be told apart.
+    """
+    __slots__ = (
+        "bid_price", "bid_qty", "ask_price", "ask_qty", "update_id", "version",
+        "mid", "spread", "microprice", "imbalance",
+    )
+
+    def __init__(self):
+        self.version = 0
+        self.reset()
+
+    def reset(self):
+        self.bid_price = 0.0
+        self.bid_qty = 0.0
+        self.ask_price = 0.0
+        self.ask_qty = 0.0
+        self.update_id = 0
+        self.mid = 0.0
+        self.spread = 0.0
+        self.microprice = 0.0
+        self.imbalance = 0.0
+
+    @property
+    def valid(self) -> bool:
+        return self.bid_price > 0.0 and self.ask_price > 0.0
+
+    def update(self, bid_price: float, bid_qty: float, ask_price: float, ask_qty: float, update_id: int):
+        self.bid_price = bid_price
+        self.bid_qty = bid_qty
+        self.ask_price = ask_price
+        self.ask_qty = ask_qty
+        self.update_id = update_id
+
+        self.mid = (bid_price + ask_price) / 2
+        self.spread = ask_price - bid_price
+        total_qty = bid_qty + ask_qty
+        if total_qty > 0.0:
+            # Each side's price weighted by the opposite side's queue
+            self.microprice = (bid_price * ask_qty + ask_price * bid_qty) / total_qty
+            self.imbalance = (bid_qty - ask_qty) / total_qty
+        else:
+            self.microprice = self.mid
+            self.imbalance = 0.0
+        self.version += 1
+
+    def snapshot(self) -> "BestBidAsk":
+        snapshot = BestBidAsk()
+        for name in BestBidAsk.__slots__:
+            setattr(snapshot, name, getattr(self, name))
+        return snapshot
+
+    def recordable(self) -> Dict:
+        return {
+            "update_id": self.update_id,
+            "bid_price": self.bid_price,
+            "bid_qty": self.bid_qty,
+            "ask_price": self.ask_price,
+            "ask_qty": self.ask_qty,
+        }
+
+
+class BinanceBbaHandler(BestBidAsk):
+    """Top of book fed by the real-time `@bookTicker` stream"""
+
+    def process(self, msg: BookTickerUpdate):
+        try:
+            # Frames from before a reconnect can arrive after newer ones
+            if msg.update_id < self.update_id:
+                return
+            self.update(msg.bid_price, msg.bid_qty, msg.ask_price, msg.ask_qty, msg.update_id)
+        except Exception as e:
+            raise Exception(f"BBA process - {e}")
@@ -2,6 +2,8 @@ from typing import List, Dict, Any
 import numpy as np
 from dataclasses import dataclass
 from numpy_ringbuffer import RingBuffer
+from exchanges.binance.ws.decoders import KlineUpdate
+from features.candle_volatility import CandleVolatility
 
 @dataclass
 class OHLCV:
@@ -33,14 +35,38 @@ class OHLCV:
             "volume": self.volume
         }
 
+class CandlesSnapshot:
+    """
+    Immutable copy of a `Candles` buffer as of `version`, taken on the first `snapshot()`
+    call per version, so it keeps showing its version after new candles arrive.
+    """
+    __slots__ = ("version", "count", "_data")
+
+    def __init__(self, version: int, data: np.ndarray):
+        data.flags.writeable = False
+        self.version = version
+        self.count = data.shape[0]
+        self._data = data
+
+    def unwrap(self):
+        return self._data
+
+    def recordable(self):
+        return [OHLCV.from_array(row).to_dict() for row in self._data.tolist()]
+
 class Candles:
-    def __init__(self, length: int = 1000):
+    def __init__(self, length: int = 1000, volatility_window: int = 60):
         self.length = length
         self._rb_ = RingBuffer(self.length, dtype=(np.float64, 6))
+        self.volatility = CandleVolatility(window=volatility_window)
+        self.version = 0
+        self._snapshot = None
         self._latest_timestamp_ = 0
 
     def reset(self):
         self._rb_ = RingBuffer(self.length, dtype=(np.float64, 6))
+        self.volatility.reset()
+        self.version += 1
         self._latest_timestamp_ = 0
 
     def add_single(self, candle: OHLCV):
@@ -51,6 +77,8 @@ class Candles:
         self._rb_.append(np.array([
             candle.timestamp, candle.open, candle.high, candle.low, candle.close, candle.volume
         ], dtype=np.float64))
+        self.volatility.update(candle.timestamp, candle.open, candle.high, candle.low, candle.close)
+        self.version += 1
 
     def add_many(self, candles: List[OHLCV]):
         for candle in candles:
@@ -59,6 +87,11 @@ class Candles:
     def unwrap(self):
         return self._rb_._unwrap()
 
+    def snapshot(self) -> CandlesSnapshot:
+        if self._snapshot is None or self._snapshot.version != self.version:
+            self._snapshot = CandlesSnapshot(self.version, self.unwrap().copy())
+        return self._snapshot
+
     def recordable(self):
         return [OHLCV.from_array(ohlcv).to_dict() for ohlcv in self._rb_]
 
@@ -77,8 +110,8 @@ class Candles:
         return f"Candles(length={self.length}, candles={self.unwrap()})"
 
 class BinanceOhlcvHandler(Candles):
-    def __init__(self, length: int = 1000):
-        super().__init__(length)
+    def __init__(self, length: int = 1000, volatility_window: int = 60):
+        super().__init__(length, volatility_window)
 
     def refresh(self, recv: List[List]):
         try:
@@ -95,16 +128,15 @@ class BinanceOhlcvHandler(Candles):
         except Exception as e:
             raise Exception(f"OHLCV refresh - {e}")
 
-    def process(self, recv: Dict[str, Any]):
+    def process(self, msg: KlineUpdate):
         try:
-            candle = recv["k"]
             self.add_single(OHLCV(
-                timestamp=float(candle.get("t")),
-                open=float(candle.get("o")),
-                high=float(candle.get("h")),
-                low=float(candle.get("l")),
-                close=float(candle.get("c")),
-                volume=float(candle.get("v"))
+                timestamp=msg.open_time,
+                open=msg.open,
+                high=msg.high,
+                low=msg.low,
+                close=msg.close,
+                volume=msg.volume
             ))
         except Exception as e:
             raise Exception(f"OHLCV process - {e}")
@@ -1,39 +1,203 @@
 import numpy as np
 from numba.experimental import jitclass
-from numba.types import uint32, int32, float64
-from typing import Dict, Union
+from numba.types import uint32, int32, int64, float64
+from typing import Dict, Tuple, Union
+from collections import deque
+import logging
 
 from numba import njit
-from numba.types import Array, bool_
+from numba.types import Array
+from exchanges.binance.ws.decoders import DepthUpdate
 
-@njit(fastmath=True)
-def nbisin(a: Array, b: Array) -> Array:
-    out = np.empty(a.size, dtype=bool_)
-    b = set(b)
 
-    for i in range(a.size):
-        out[i] = a[i] in b
+logger = logging.getLogger(__name__)
+
+
+@njit(["UniTuple(int64, 2)(float64[:, :], int64, float64[:, :], boolean)"], error_model="numpy", fastmath=True, cache=True)
+def apply_levels(side: Array, num_levels: int, levels: Array, descending: bool) -> Tuple[int, int]:
+    """
+    Applies a batch of price level changes to one side of a sorted book, in place.
+
+    Each level is located with a binary search. A zero quantity deletes the level,
+    an existing price has its quantity replaced and a new price is inserted by
+    shifting the worse levels down one row. Levels that would fall beyond the
+    side's capacity are dropped, so the book always keeps the best `capacity` levels.
+
+    Parameters
+    ----------
+    side : Array
+        Preallocated (capacity, 2) array of [price, quantity] rows, sorted best -> worst.
+
+    num_levels : int
+        Number of valid rows at the top of `side`.
+
+    levels : Array
+        An array of [price, quantity] changes to apply.
+
+    descending : bool
+        True for bids (highest price first), False for asks (lowest price first).
+
+    Returns
+    -------
+    Tuple[int, int]
+        The new number of valid rows in `side`, and the first row that changed
+        (`capacity` if none did).
+    """
+    capacity = side.shape[0]
+    first_changed = capacity
+
+    for j in range(levels.shape[0]):
+        price = levels[j, 0]
+        qty = levels[j, 1]
+
+        lo = 0
+        hi = num_levels
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if (side[mid, 0] > price) if descending else (side[mid, 0] < price):
+                lo = mid + 1
+            else:
+                hi = mid
+
+        found = lo < num_levels and side[lo, 0] == price
+
+        if qty == 0.0:
+            if found:
+                first_changed = min(first_changed, lo)
+                for k in range(lo, num_levels - 1):
+                    side[k, 0] = side[k + 1, 0]
+                    side[k, 1] = side[k + 1, 1]
+                num_levels -= 1
+                side[num_levels, 0] = 0.0
+                side[num_levels, 1] = 0.0
+
+        elif found:
+            side[lo, 1] = qty
+            first_changed = min(first_changed, lo)
+
+        elif lo < capacity:
+            first_changed = min(first_changed, lo)
+            end = num_levels if num_levels < capacity else capacity - 1
+            for k in range(end, lo, -1):
+                side[k, 0] = side[k - 1, 0]
+                side[k, 1] = side[k - 1, 1]
+            side[lo, 0] = price
+            side[lo, 1] = qty
+            if num_levels < capacity:
+                num_levels += 1
+
+    return num_levels, first_changed
+
+
+@njit(["void(float64[:, :], float64[:, :], int64, int64)"], error_model="numpy", fastmath=True, cache=True)
+def accumulate_levels(side: Array, cumulative: Array, start: int, num_levels: int) -> None:
+    """
+    Recomputes the running totals of one side of the book from row `start` onwards, in place.
+
+    Parameters
+    ----------
+    side : Array
+        A (capacity, 2) array of [price, quantity] rows, sorted best -> worst.
+
+    cumulative : Array
+        A (capacity, 2) array of [cumulative quantity, cumulative notional] rows, where row
+        `k` totals levels `0..k` of `side`. Rows before `start` must already be up to date.
+
+    start : int
+        The first row whose level changed.
+
+    num_levels : int
+        Number of valid rows at the top of `side`.
+    """
+    qty = cumulative[start - 1, 0] if start > 0 else 0.0
+    notional = cumulative[start - 1, 1] if start > 0 else 0.0
+    for k in range(start, num_levels):
+        qty += side[k, 1]
+        notional += side[k, 0] * side[k, 1]
+        cumulative[k, 0] = qty
+        cumulative[k, 1] = notional
+
+
+class BookSnapshot:
+    """
+    Immutable copy of an `Orderbook` as of `version`.
+
+    `bids`/`asks` and their running totals `cum_bids`/`cum_asks` are read-only
+    copies of the valid rows, taken on the first `snapshot()` call per version, so
+    a snapshot keeps showing its version after the book moves on.
+    """
+    __slots__ = ("version", "seq_id", "bids", "asks", "bba", "cum_bids", "cum_asks")
+
+    def __init__(self, version: int, seq_id: int, bids, asks, bba, cum_bids, cum_asks):
+        self.version = version
+        self.seq_id = seq_id
+        self.bids = bids
+        self.asks = asks
+        self.bba = bba
+        self.cum_bids = cum_bids
+        self.cum_asks = cum_asks
 
-    return out
 
 # @jitclass
 class Orderbook:
+    """
+    Preallocated, always-sorted L2 book.
+
+    Both sides live in fixed (size, 2) arrays kept sorted best -> worst, and depth
+    diffs are applied in place by `apply_levels`. `bids`/`asks` are views over the
+    valid rows, so consumers see the same [price, quantity] layout as before
+    without any per-update allocation.
+
+    `cum_bids`/`cum_asks` hold the running [quantity, notional] totals of each side,
+    best level first, recomputed from the first changed level on every diff. The
+    liquidity within any price of the touch is then a binary search and a lookup,
+    see `features.book_depth`.
+    """
     size: uint32
-    asks: float64[:, :]
-    bids: float64[:, :]
+    _asks: float64[:, :]
+    _bids: float64[:, :]
+    _num_asks: int64
+    _num_bids: int64
     bba: float64[:, :]
     seq_id: int32
+    version: int64
 
     def __init__(self, size: int):
         self.size = size
-        self.asks = np.zeros((self.size, 2), dtype=np.float64)
-        self.bids = np.zeros((self.size, 2), dtype=np.float64)
+        self._asks = np.zeros((self.size, 2), dtype=np.float64)
+        self._bids = np.zeros((self.size, 2), dtype=np.float64)
+        self._num_asks = 0
+        self._num_bids = 0
+        self._cum_asks = np.zeros((self.size, 2), dtype=np.float64)
+        self._cum_bids = np.zeros((self.size, 2), dtype=np.float64)
         self.bba = np.zeros((2, 2), dtype=np.float64)
         self.seq_id = 0
+        self.version = 0
+        self._snapshot = None
+
+    @property
+    def asks(self):
+        return self._asks[:self._num_asks]
+
+    @property
+    def bids(self):
+        return self._bids[:self._num_bids]
+
+    @property
+    def cum_asks(self):
+        return self._cum_asks[:self._num_asks]
+
+    @property
+    def cum_bids(self):
+        return self._cum_bids[:self._num_bids]
 
     def reset(self):
-        self.asks.fill(0)
-        self.bids.fill(0)
+        self._asks.fill(0)
+        self._bids.fill(0)
+        self._num_asks = 0
+        self._num_bids = 0
+        self._cum_asks.fill(0)
+        self._cum_bids.fill(0)
         self.bba.fill(0)
         self.seq_id = 0
 
@@ -44,47 +208,100 @@ class Orderbook:
             "bids": self.bids.astype(np.float64)
         }
 
-    def sort_bids(self):
-        self.bids = self.bids[self.bids[:, 0].argsort()][::-1][: self.size]
-        self.bba[0, :] = self.bids[0]
+    def snapshot(self) -> BookSnapshot:
+        if self._snapshot is None or self._snapshot.version != self.version:
+            bids, asks, bba = self.bids.copy(), self.asks.copy(), self.bba.copy()
+            cum_bids, cum_asks = self.cum_bids.copy(), self.cum_asks.copy()
+            for arr in (bids, asks, bba, cum_bids, cum_asks):
+                arr.flags.writeable = False
+            self._snapshot = BookSnapshot(self.version, self.seq_id, bids, asks, bba, cum_bids, cum_asks)
+        return self._snapshot
 
-    def sort_asks(self):
-        self.asks = self.asks[self.asks[:, 0].argsort()][: self.size]
-        self.bba[1, :] = self.asks[0]
+    def update_bba(self):
+        self.bba[0, :] = self._bids[0]
+        self.bba[1, :] = self._asks[0]
 
     def refresh(self, asks, bids, new_seq_id: int):
         self.reset()
         self.seq_id = new_seq_id
-        max_asks_idx = min(asks.shape[0], self.size)
-        max_bids_idx = min(bids.shape[0], self.size)
-        self.asks[:max_asks_idx, :] = asks[:max_asks_idx, :]
-        self.bids[:max_bids_idx, :] = bids[:max_bids_idx, :]
-        self.sort_bids()
-        self.sort_asks()
+        asks = asks[asks[:, 1] != 0]
+        bids = bids[bids[:, 1] != 0]
+        asks = asks[asks[:, 0].argsort()][: self.size]
+        bids = bids[bids[:, 0].argsort()[::-1]][: self.size]
+        self._num_asks = asks.shape[0]
+        self._num_bids = bids.shape[0]
+        self._asks[:self._num_asks, :] = asks
+        self._bids[:self._num_bids, :] = bids
+        accumulate_levels(self._asks, self._cum_asks, 0, self._num_asks)
+        accumulate_levels(self._bids, self._cum_bids, 0, self._num_bids)
+        self.update_bba()
+        self.version += 1
 
     def update_bids(self, bids, new_seq_id: int):
         if bids.size == 0 or new_seq_id < self.seq_id:
             return
         self.seq_id = new_seq_id
-        self.bids = self.bids[~nbisin(self.bids[:, 0], bids[:, 0])]
-        self.bids = np.vstack((self.bids, bids[bids[:, 1] != 0]))
-        self.sort_bids()
+        self._num_bids, first_changed = apply_levels(self._bids, self._num_bids, bids, True)
+        if first_changed < self._num_bids:
+            accumulate_levels(self._bids, self._cum_bids, first_changed, self._num_bids)
+        self.bba[0, :] = self._bids[0]
+        self.version += 1
 
     def update_asks(self, asks, new_seq_id: int):
         if asks.size == 0 or new_seq_id < self.seq_id:
             return
         self.seq_id = new_seq_id
-        self.asks = self.asks[~nbisin(self.asks[:, 0], asks[:, 0])]
-        self.asks = np.vstack((self.asks, asks[asks[:, 1] != 0]))
-        self.sort_asks()
+        self._num_asks, first_changed = apply_levels(self._asks, self._num_asks, asks, False)
+        if first_changed < self._num_asks:
+            accumulate_levels(self._asks, self._cum_asks, first_changed, self._num_asks)
+        self.bba[1, :] = self._asks[0]
+        self.version += 1
 
     def update_full(self, asks, bids, new_seq_id: int):
         self.update_asks(asks, new_seq_id)
         self.update_bids(bids, new_seq_id)
 
 class BinanceOrderbookHandler(Orderbook):
-    def __init__(self, size: int):
+    """
+    Orderbook fed by the Binance diff-depth stream.
+
+    Diffs are only applied while the book is in sync with the stream, i.e. every
+    event bridges the last applied update id (`U <= seq_id + 1 <= u`). Until a
+    snapshot has been applied, or after a gap is detected, incoming diffs are
+    buffered and `synced` is False so the owner can fetch a fresh snapshot;
+    `refresh` then replays the buffered diffs on top of it.
+
+    Levels deleted near the touch pull deeper ones in, so without new snapshots the book
+    holds fewer levels over time. `start_refill` keeps the book in sync while also
+    buffering diffs, so a snapshot fetched afterwards can replace the book and catch up.
+    """
+    def __init__(self, size: int, max_buffer: int = 1000):
         super().__init__(size)
+        self.synced = False
+        self.refilling = False
+        self._buffer = deque(maxlen=max_buffer)
+
+    def start_refill(self):
+        """Buffer diffs as they are applied, until the next `refresh`"""
+        if self.synced:
+            self._buffer.clear()
+            self.refilling = True
+
+    def _apply(self, msg: DepthUpdate):
+        self.update_bids(msg.bids, msg.final_id)
+        self.update_asks(msg.asks, msg.final_id)
+        self.seq_id = msg.final_id
+
+    def _replay_buffer(self):
+        while self._buffer:
+            msg = self._buffer[0]
+            if msg.final_id <= self.seq_id:
+                self._buffer.popleft()
+                continue
+            if msg.first_id > self.seq_id + 1:
+                return False
+            self._apply(self._buffer.popleft())
+        return True
 
     def refresh(self, recv: Dict):
         try:
@@ -93,18 +310,37 @@ class BinanceOrderbookHandler(Orderbook):
             asks = np.array(recv.get("asks"), dtype=np.float64)
             # self.refresh(asks, bids, seq_id)
             super().refresh(asks, bids, seq_id)
+            self.refilling = False
+            self.synced = self._replay_buffer()
+
+            if not self.synced:
+                logger.warning(f"Orderbook snapshot {seq_id} is older than buffered diffs, resync required")
 
         except Exception as e:
+            self.synced = False
+            self.refilling = False
             raise Exception(f"Orderbook refresh - {e}")
 
-    def process(self, recv: Dict):
+    def process(self, msg: DepthUpdate):
         try:
-            seq_id = int(recv.get("u"))
-            if recv.get("b", []):
-                bids = np.array(recv["b"], dtype=np.float64)
-                self.update_bids(bids, seq_id)
-            if recv.get("a", []):
-                asks = np.array(recv["a"], dtype=np.float64)
-                self.update_asks(asks, seq_id)
+            if not self.synced:
+                self._buffer.append(msg.copy())
+                return
+
+            if msg.final_id <= self.seq_id:
+                return
+
+            if msg.first_id > self.seq_id + 1:
+                logger.warning(f"Orderbook sequence gap: expected {self.seq_id + 1}, got {msg.first_id}")
+                self.synced = False
+                self.refilling = False
+                self._buffer.clear()
+                self._buffer.append(msg.copy())
+                return
+
+            self._apply(msg)
+            if self.refilling:
+                self._buffer.append(msg.copy())
+
         except Exception as e:
             raise Exception(f"Orderbook process - {e}")
@@ -1,7 +1,9 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
 from dataclasses import dataclass
-from numpy_ringbuffer import RingBuffer
+from exchanges.binance.ws.decoders import TradeUpdate
+from features.trade_flow import TradeFlow
+from utils.ring import MirroredRing
 
 @dataclass
 class Trade:
@@ -27,26 +29,98 @@ class Trade:
             "size": self.size
         }
 
+class TradesSnapshot:
+    """
+    Immutable copy of a `Trades` buffer as of `version`, taken on the first `snapshot()`
+    call per version, so it keeps showing its version after new trades arrive.
+    """
+    __slots__ = ("version", "count", "_data")
+
+    def __init__(self, version: int, data: np.ndarray):
+        data.flags.writeable = False
+        self.version = version
+        self.count = data.shape[0]
+        self._data = data
+
+    def unwrap(self):
+        return self._data
+
+    def recordable(self):
+        return [Trade.from_array(row).to_dict() for row in self._data.tolist()]
+
+# Column layout of the trade ring and of `Trades.unwrap()`
+TRADE_TIME = 0
+TRADE_SIDE = 1
+TRADE_PRICE = 2
+TRADE_SIZE = 3
+
+
 class Trades:
-    def __init__(self, length: int = 1000):
+    """
+    The last `length` trades in a `MirroredRing` of [time, side, price, size] rows.
+
+    `unwrap()` and `window(n)` are zero-copy views of the newest rows, oldest first,
+    valid until the next trade is added; copy them to keep them around.
+    """
+    def __init__(self, length: int = 1000, flow_decay: float = 0.75, flow_lookback: int = 100):
         self.length = length
-        self._rb_ = RingBuffer(self.length, dtype=(np.float64, 4))
+        self._ring = MirroredRing(self.length, 4)
+        self._row = np.empty(4, dtype=np.float64)
+        self.flow = TradeFlow(decay=flow_decay, lookback=flow_lookback)
+        self.version = 0
+        self._snapshot = None
 
     def reset(self):
-        self._rb_ = RingBuffer(self.length, dtype=(np.float64, 4))
+        self._ring.reset()
+        self.flow.reset()
+        self.version += 1
 
     def recordable(self):
-        return [Trade.from_array(trade).to_dict() for trade in self._rb_]
+        return [Trade.from_array(trade).to_dict() for trade in self.unwrap().tolist()]
+
+    def add(self, timestamp: float, side: float, price: float, size: float):
+        row = self._row
+        row[0] = timestamp
+        row[1] = side
+        row[2] = price
+        row[3] = size
+        self._ring.append(row)
+        self.flow.update(side, price, size)
+        self.version += 1
 
     def add_single(self, trade: Trade):
-        self._rb_.append(np.array([trade.timestamp, trade.side, trade.price, trade.size], dtype=np.float64))
+        self.add(trade.timestamp, trade.side, trade.price, trade.size)
+
+    def add_batch(self, rows: np.ndarray):
+        """Add a (num_trades, 4) float64 array of [time, side, price, size] rows, oldest first"""
+        if rows.shape[0] == 0:
+            return
+        self._ring.extend(rows)
+        update = self.flow.update
+        for _, side, price, size in rows.tolist():
+            update(side, price, size)
+        self.version += 1
 
     def add_many(self, trades: List[Trade]):
-        for trade in trades:
-            self.add_single(trade)
+        self.add_batch(np.array(
+            [(trade.timestamp, trade.side, trade.price, trade.size) for trade in trades], dtype=np.float64
+        ).reshape(-1, 4))
 
     def unwrap(self):
-        return self._rb_._unwrap()
+        return self._ring.view()
+
+    def window(self, n: int):
+        """The last `n` trades, oldest first"""
+        return self._ring.view(n)
+
+    def column(self, k: int, n: Optional[int] = None):
+        """The last `n` values (all by default) of column `k`, e.g. TRADE_PRICE, as a contiguous array"""
+        return self._ring.column(k, n)
+
+    def snapshot(self) -> TradesSnapshot:
+        if self._snapshot is None or self._snapshot.version != self.version:
+            self._snapshot = TradesSnapshot(self.version, self.unwrap().copy())
+        return self._snapshot
 
     def __eq__(self, other):
         if isinstance(other, Trades):
@@ -57,7 +131,7 @@ class Trades:
         return self.unwrap()[idx]
 
     def __len__(self):
-        return len(self._rb_)
+        return len(self._ring)
 
     def __repr__(self):
         return f"Trades(length={self.length}, trades={self.unwrap()})"
@@ -67,29 +141,86 @@ class Side:
     SELL = -1.0
 
 class BinanceTradesHandler(Trades):
-    def __init__(self, length: int = 1000):
-        super().__init__(length)
+    """
+    `Trades` fed by the Binance trade stream and REST backfills, merged by trade id.
+
+    The Binance id of every buffered trade is kept in a parallel ring. Trades newer than
+    the newest one held are appended; older trades that are missing, such as the REST
+    history fetched while the stream already runs or trades missed during a reconnect,
+    are merged into place and the buffer is rebuilt in id order.
+    """
+    def __init__(self, length: int = 1000, flow_decay: float = 0.75, flow_lookback: int = 100):
+        super().__init__(length, flow_decay, flow_lookback)
+        self._ids = MirroredRing(self.length, 1)
+        self._id_row = np.empty(1, dtype=np.float64)
+        self.last_trade_id = -1  # Binance id of the newest trade in the ring
+
+    def reset(self):
+        super().reset()
+        self._ids.reset()
+        self.last_trade_id = -1
 
     def refresh(self, recv: List[Dict]):
+        """Merge a REST trades response into the buffer, skipping trades already held"""
         try:
-            self.reset()
-            new_trades = [Trade(
-                timestamp=float(trade.get("time")),
-                side=Side.SELL if trade.get("isBuyerMaker") else Side.BUY,
-                price=float(trade.get("price")),
-                size=float(trade.get("qty"))
-            ) for trade in recv]
-            self.add_many(new_trades)
+            recv = sorted(recv, key=lambda trade: trade["id"])
+            ids = np.array([trade["id"] for trade in recv], dtype=np.float64)
+            rows = np.array([(
+                float(trade.get("time")),
+                Side.SELL if trade.get("isBuyerMaker") else Side.BUY,
+                float(trade.get("price")),
+                float(trade.get("qty"))
+            ) for trade in recv], dtype=np.float64).reshape(-1, 4)
+            self._merge(ids, rows)
         except Exception as e:
             raise Exception(f"Trades refresh - {e}")
 
-    def process(self, recv: Dict[str, Any]):
+    def _merge(self, ids: np.ndarray, rows: np.ndarray):
+        """Add `rows` with Binance ids `ids` (ascending), keeping the buffer in id order"""
+        if ids.size == 0:
+            return
+        if ids[0] > self.last_trade_id:
+            # Nothing older than the newest trade held, the common case
+            self._append(ids, rows)
+            return
+
+        if len(self._ids) != len(self):
+            # Trades were added through `add` without ids, so there is nothing to merge against
+            return
+        held_ids = self._ids.column(0)
+        missing = ~np.isin(ids, held_ids)
+        if not missing.any():
+            return
+        ids, rows = ids[missing], rows[missing]
+        if ids[0] > self.last_trade_id:
+            self._append(ids, rows)
+            return
+
+        # Rebuild from the union in id order, replaying the trade flow over it
+        all_ids = np.concatenate((held_ids, ids))
+        all_rows = np.concatenate((self.unwrap(), rows))
+        order = np.argsort(all_ids, kind="stable")[-self.length:]
+        all_ids, all_rows = all_ids[order], all_rows[order]
+        self.reset()
+        self._append(all_ids, all_rows)
+
+    def _append(self, ids: np.ndarray, rows: np.ndarray):
+        self.add_batch(rows)
+        self._ids.extend(ids.reshape(-1, 1))
+        self.last_trade_id = int(ids[-1])
+
+    def process(self, msg: TradeUpdate):
         try:
-            self.add_single(Trade(
-                timestamp=float(recv.get("T")),
-                side=Side.SELL if recv.get("m") else Side.BUY,
-                price=float(recv.get("p")),
-                size=float(recv.get("q"))
-            ))
+            if msg.trade_id <= self.last_trade_id:
+                # Already held after a REST backfill, or arrived out of order
+                self._merge(
+                    np.array([msg.trade_id], dtype=np.float64),
+                    np.array([[msg.trade_time, Side.SELL if msg.is_buyer_maker else Side.BUY, msg.price, msg.size]])
+                )
+                return
+            self.add(msg.trade_time, Side.SELL if msg.is_buyer_maker else Side.BUY, msg.price, msg.size)
+            self._id_row[0] = msg.trade_id
+            self._ids.append(self._id_row)
+            self.last_trade_id = msg.trade_id
         except Exception as e:
             raise Exception(f"Trades process - {e}")
@@ -15,27 +15,48 @@ class BinancePublicWs:
         self.spot_base_url = WsStreamLinks.SPOT_PUBLIC_STREAM
 
 
-    def multi_stream_request(self, topics: List[str], **kwargs) -> Tuple[str, List[str]]:
+    def stream_names(self, topics: List[str], **kwargs) -> List[str]:
         list_of_topics = []
-        url = self.spot_base_url + "/stream?streams="
 
         for topic in topics:
             stream = ""
             if topic == "Trades":
-                stream = f"{self.symbol.lower()}@trade/"
+                stream = f"{self.symbol.lower()}@trade"
             elif topic == "Orderbook":
-                stream = f"{self.symbol.lower()}@depth@100ms/"
+                stream = f"{self.symbol.lower()}@depth@100ms"
             elif topic == "BBA":
-                stream = f"{self.symbol.lower()}@bookTicker/"
+                stream = f"{self.symbol.lower()}@bookTicker"
             elif topic == "MarkPrice":
-                stream = f"{self.symbol.lower()}@markPrice@1s/"
+                stream = f"{self.symbol.lower()}@markPrice@1s"
             elif topic == "Kline" and "interval" in kwargs:
-                stream = f"{self.symbol.lower()}@kline_{kwargs['interval']}/"
+                stream = f"{self.symbol.lower()}@kline_{kwargs['interval']}"
 
             if stream:
-                url += stream
-                list_of_topics.append(stream[:-1])
-
-        return url[:-1], list_of_topics
+                list_of_topics.append(stream)
 
+        return list_of_topics
 
+    def multi_stream_request(self, topics: List[str], **kwargs) -> Tuple[str, List[str]]:
+        list_of_topics = self.stream_names(topics, **kwargs)
+        url = self.spot_base_url + "/stream?streams=" + "/".join(list_of_topics)
+        return url, list_of_topics
+
+    @staticmethod
+    def sharded_stream_request(symbols: List[str],
+                               topics: List[str],
+                               max_streams_per_connection: int = 200,
+                               **kwargs) -> List[Tuple[str, List[str]]]:
+        """
+        Builds combined-stream URLs for several symbols, splitting the streams across as
+        many connections as needed so none carries more than `max_streams_per_connection`
+        (Binance allows at most 1024 streams per connection).
+        """
+        max_streams_per_connection = min(max_streams_per_connection, 1024)
+        streams = [stream for symbol in symbols for stream in BinancePublicWs(symbol).stream_names(topics, **kwargs)]
+
+        requests = []
+        for i in range(0, len(streams), max_streams_per_connection):
+            shard = streams[i:i + max_streams_per_connection]
+            requests.append((WsStreamLinks.SPOT_PUBLIC_STREAM + "/stream?streams=" + "/".join(shard), shard))
+
+        return requests
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 import time
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 from decimal import Decimal
 import logging
 
@@ -15,7 +15,7 @@ class DexMarketData:
     timestamp: float
 
 class DexDataHandler:
-    def __init__(self, symbol: str, token_address: str, market_symbol: str):
+    def __init__(self, symbol: str, token_address: str, market_symbol: str, clock: Callable[[], float] = time.time):
         """
         Initialize DEX data handler
         
@@ -23,8 +23,10 @@ class DexDataHandler:
         - symbol: Trading symbol (e.g., 'BTC')
         - token_address: Token address on DEX
         - market_symbol: Market symbol on DEX (e.g., 'BTC/USD [WETH-USDC]')
+        - clock: Returns the current time in seconds, used to timestamp processed data
         """
         self.symbol = symbol
+        self.clock = clock
         self.token_address = token_address
         self.market_symbol = market_symbol
         
@@ -103,7 +105,7 @@ class DexDataHandler:
                 symbol=self.symbol,
                 oracle_price=oracle_price,
                 funding_rate=funding_rate,
-                timestamp=time.time()
+                timestamp=self.clock()
             )
             
         except Exception as e:
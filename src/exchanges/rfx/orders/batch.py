@@ -0,0 +1,207 @@
+import logging
+from typing import Any, List, Optional
+
+from exchanges.rfx.orders.executor import NonceManager
+
+
+logger = logging.getLogger(__name__)
+
+
+CREATE = "create"
+CANCEL = "cancel"
+
+
+class BatchLeg:
+    """
+    One order operation in a batch: the router calls it contributes to the multicall,
+    the native value it sends, and once the batch is mined, its decoded result.
+    """
+    __slots__ = ("kind", "args", "value", "request", "order_key", "ok")
+
+    def __init__(self, kind: str, args: List[bytes], value: int = 0, request: Any = None,
+                 order_key: Optional[bytes] = None):
+        self.kind = kind
+        self.args = args
+        self.value = value
+        self.request = request
+        self.order_key = order_key  # Created key for creates, targeted key for cancels
+        self.ok = False
+
+    def __repr__(self):
+        key = f"0x{bytes(self.order_key).hex()}" if self.order_key else None
+        return f"BatchLeg({self.kind}, calls={len(self.args)}, ok={self.ok}, order_key={key})"
+
+
+class MulticallBatch:
+    """Order creations and cancellations sent as a single exchange router multicall"""
+    __slots__ = ("legs",)
+
+    def __init__(self):
+        self.legs: List[BatchLeg] = []
+
+    def __len__(self) -> int:
+        return len(self.legs)
+
+    def add_create(self, args: List[bytes], value: int, request: Any = None) -> BatchLeg:
+        leg = BatchLeg(CREATE, list(args), int(value), request)
+        self.legs.append(leg)
+        return leg
+
+    def add_cancel(self, arg: bytes, order_key: bytes, value: int = 0, request: Any = None) -> BatchLeg:
+        leg = BatchLeg(CANCEL, [arg], int(value), request, order_key)
+        self.legs.append(leg)
+        return leg
+
+    @property
+    def multicall_args(self) -> List[bytes]:
+        return [arg for leg in self.legs for arg in leg.args]
+
+    @property
+    def value(self) -> int:
+        return sum(leg.value for leg in self.legs)
+
+    @property
+    def creates(self) -> List[BatchLeg]:
+        return [leg for leg in self.legs if leg.kind == CREATE]
+
+    @property
+    def cancels(self) -> List[BatchLeg]:
+        return [leg for leg in self.legs if leg.kind == CANCEL]
+
+
+class BatchResult:
+    """
+    The sent batch with its legs decoded from the receipt. `status` is None until the
+    receipt is in. A `dry_run` result is for a batch that debug mode did not send: it has
+    no transaction and every leg is left failed.
+    """
+    __slots__ = ("batch", "tx_hash", "gas_used", "status", "dry_run")
+
+    def __init__(self, batch: MulticallBatch, tx_hash: Optional[bytes], gas_used: int = 0,
+                 status: Optional[int] = None, dry_run: bool = False):
+        self.batch = batch
+        self.tx_hash = tx_hash
+        self.gas_used = gas_used
+        self.status = status
+        self.dry_run = dry_run
+
+    @property
+    def legs(self) -> List[BatchLeg]:
+        return self.batch.legs
+
+    def __repr__(self):
+        ok = sum(leg.ok for leg in self.batch.legs)
+        if self.dry_run:
+            return f"BatchResult(legs={len(self.batch)}, dry_run=True)"
+        return f"BatchResult(legs={len(self.batch)}, ok={ok}, gas_used={self.gas_used}, status={self.status})"
+
+
+class CapturedMulticallOrder:
+    """
+    Mixin for pyrfx orders that records the multicall a `create_and_execute` would send,
+    as `captured = (value_amount, multicall_args)`, instead of sending it.
+    """
+    captured = None
+
+    def _multicall_transaction(self, value_amount: int, multicall_args: list) -> None:
+        self.captured = (int(value_amount), list(multicall_args))
+        return None
+
+
+def order_event_keys(receipt: Any, keccak, event_name: str) -> List[bytes]:
+    """
+    Order keys of the `event_name` ('OrderCreated', 'OrderCancelled') events in a receipt,
+    in log order. The event emitter logs the event name hash as topic 1 and the order
+    key as topic 2.
+    """
+    topic = bytes(keccak(text=event_name))
+    return [
+        log["topics"][2] for log in receipt["logs"]
+        if len(log["topics"]) >= 3 and bytes(log["topics"][1]) == topic
+    ]
+
+
+def decode_receipt(batch: MulticallBatch, receipt: Any, keccak) -> None:
+    """
+    Sets each leg's result from the batch receipt. Creates take the `OrderCreated` keys
+    in log order, which is leg order; cancels succeed if an `OrderCancelled` log carries
+    their key. A reverted batch leaves every leg failed, since the multicall is atomic.
+    """
+    for leg in batch.legs:
+        leg.ok = False
+    if not receipt or receipt["status"] != 1:
+        return
+
+    created_keys = order_event_keys(receipt, keccak, "OrderCreated")
+    cancelled_keys = {bytes(key) for key in order_event_keys(receipt, keccak, "OrderCancelled")}
+
+    for leg, key in zip(batch.creates, created_keys):
+        leg.order_key = key
+        leg.ok = True
+    for leg in batch.cancels:
+        leg.ok = bytes(leg.order_key) in cancelled_keys
+
+
+class BatchSender:
+    """
+    Signs and sends a `MulticallBatch` as one exchange router transaction, with its
+    nonce from the shared `NonceManager`. `submit` returns once the transaction is
+    broadcast; `wait` then blocks on the receipt and decodes the legs, so callers can
+    run it without holding a submission slot.
+
+    Gas comes from estimating the multicall, times `gas_headroom`. Because the multicall is
+    atomic, estimation fails if any leg would revert, before anything is sent. In debug mode
+    nothing is estimated or sent, and `submit` returns a `dry_run` result.
+    """
+
+    def __init__(self, config: Any, router_contract: Any, nonce_manager: NonceManager,
+                 gas_headroom: float = 1.2, receipt_timeout: float = 120.0):
+        self.config = config
+        self.router_contract = router_contract
+        self.nonce_manager = nonce_manager
+        self.gas_headroom = gas_headroom
+        self.receipt_timeout = receipt_timeout
+
+    def submit(self, batch: MulticallBatch, max_fee_per_gas: int, debug_mode: bool = False) -> BatchResult:
+        if debug_mode:
+            logger.info(f"Debug mode enabled. Batch of {len(batch)} legs not submitted.")
+            return BatchResult(batch, None, dry_run=True)
+
+        eth = self.config.connection.eth
+        multicall = self.router_contract.functions.multicall(batch.multicall_args)
+        nonce = self.nonce_manager.reserve()
+        try:
+            gas_estimate = multicall.estimate_gas({"from": self.config.user_wallet_address, "value": batch.value})
+            raw_tx = multicall.build_transaction(
+                {
+                    "value": batch.value,
+                    "chainId": self.config.chain_id,
+                    "gas": int(gas_estimate * self.gas_headroom),
+                    "maxFeePerGas": int(max_fee_per_gas),
+                    "maxPriorityFeePerGas": 0,
+                    "nonce": nonce,
+                }
+            )
+            signed_txn = eth.account.sign_transaction(raw_tx, self.config.private_key)
+        except Exception:
+            # Never sent, e.g. a leg would revert, so the nonce can go to the next transaction
+            self.nonce_manager.release(nonce)
+            raise
+        try:
+            tx_hash = eth.send_raw_transaction(signed_txn.raw_transaction)
+        except Exception:
+            self.nonce_manager.failed(nonce)
+            raise
+        self.nonce_manager.sent(nonce)
+        logger.info(f"Batch of {len(batch)} legs submitted with nonce {nonce}: 0x{bytes(tx_hash).hex()}")
+        return BatchResult(batch, tx_hash)
+
+    def wait(self, result: BatchResult) -> BatchResult:
+        """Waits for the receipt of a submitted batch and decodes its legs into `result`"""
+        if result.dry_run:
+            return result
+        receipt = self.config.connection.eth.wait_for_transaction_receipt(result.tx_hash, timeout=self.receipt_timeout)
+        decode_receipt(result.batch, receipt, self.config.connection.keccak)
+        result.gas_used = receipt["gasUsed"]
+        result.status = receipt["status"]
+        return result
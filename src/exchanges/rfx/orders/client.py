@@ -1,19 +1,46 @@
+import asyncio
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from hexbytes import HexBytes
 import logging
+import time
 from pyrfx.custom_error_parser import CustomErrorParser
-from pyrfx.order.limit_cancel import LimitCancelOrder
 from pyrfx.config_manager import ConfigManager
 from pyrfx.order.limit_increase import LimitIncreaseOrder
 from pyrfx.order.decrease import DecreaseOrder
 from pyrfx.order.arg_parser_order import OrderArgumentParser
+from pyrfx.gas_utils import get_max_fee_per_gas
+from pyrfx.utils import (
+    get_account_orders, get_bytes_32_values_at, get_exchange_router_contract, get_order_handler_contract
+)
+from exchanges.rfx.orders.batch import (
+    BatchResult, BatchSender, CapturedMulticallOrder, MulticallBatch, order_event_keys
+)
+from exchanges.rfx.orders.executor import NonceManagedOrder, NonceManager, OrderExecutor
+from utils.latency import latency
 
 
 
 logger = logging.getLogger(__name__)
 
+
+class ManagedLimitIncreaseOrder(NonceManagedOrder, LimitIncreaseOrder):
+    pass
+
+
+class ManagedDecreaseOrder(NonceManagedOrder, DecreaseOrder):
+    pass
+
+
+class CapturedLimitIncreaseOrder(CapturedMulticallOrder, LimitIncreaseOrder):
+    pass
+
+
+class CapturedDecreaseOrder(CapturedMulticallOrder, DecreaseOrder):
+    pass
+
+
 class OrderSide(Enum):
     INCREASE_LONG = "increase_long"
     INCREASE_SHORT = "increase_short"
@@ -34,7 +61,8 @@ class OrderClient:
                  market_symbol: str = "BTC/USD [WETH-USDC]",
                  collateral_token: str = "USDC",
                  initial_collateral: float = 5.0,  # Fixed initial collateral for all orders
-                 debug_mode: bool = True):
+                 debug_mode: bool = True,
+                 max_in_flight: int = 4):  # Chain calls running at once
         
         self.config = config
         self.market_symbol = market_symbol
@@ -50,8 +78,15 @@ class OrderClient:
         # Track open orders
         self.open_orders: Dict[str, OrderRequest] = {}
 
+        # Chain calls run off the event loop, sharing one local nonce counter
+        self.executor = OrderExecutor(max_in_flight=max_in_flight)
+        self.nonce_manager = NonceManager(config)
+        self.batch_sender = BatchSender(config, get_exchange_router_contract(config), self.nonce_manager)
+        self._order_handler = get_order_handler_contract(config)
+
     async def submit_order(self, order: OrderRequest) -> Optional[Dict[str, HexBytes]]:
         """Submit an order to the exchange"""
+        start_ns = time.monotonic_ns()
         try:
             if order.side in [OrderSide.INCREASE_LONG, OrderSide.INCREASE_SHORT]:
                 return await self._submit_limit_increase(order)
@@ -63,106 +98,264 @@ class OrderClient:
             self._handle_error(e)
             return None
 
+        finally:
+            latency.record("submit_order", start_ns)
+
+    def submit_orders(self, orders: List[OrderRequest]) -> List[asyncio.Future]:
+        """Submit orders concurrently, returning a future per order for its `submit_order` result"""
+        return [asyncio.ensure_future(self.submit_order(order)) for order in orders]
+
     async def _submit_limit_increase(self, order: OrderRequest) -> Optional[Dict[str, HexBytes]]:
         """Submit a limit increase order"""
         try:
-            # Prepare order parameters
-            parameters = {
-                "selected_market": self.market_symbol,
-                "collateral_token_symbol": self.collateral_token,
-                "start_token_symbol": self.collateral_token,
-                "position_type": "long" if order.side == OrderSide.INCREASE_LONG else "short",
-                "size_delta_usd": order.size_usd,
-                "initial_collateral_delta": self.initial_collateral,  # Use fixed initial collateral
-                "trigger_price": order.price_usd,
-                "slippage_percent": order.slippage_percent
-            }
-
-            # Process parameters
-            order_parameters = self.increase_parser.process_parameters(parameters=parameters)
-
-            # Create and execute order
-            limit_order = LimitIncreaseOrder(
-                config=self.config,
-                market_address=order_parameters["market_address"],
-                collateral_address=order_parameters["start_token_address"],
-                index_token_address=order_parameters["index_token_address"],
-                is_long=(order_parameters["position_type"] == "long"),
-                size_delta=order_parameters["size_delta"],
-                initial_collateral_delta=order_parameters["initial_collateral_delta"],
-                trigger_price=order_parameters["trigger_price"],
-                slippage_percent=order_parameters["slippage_percent"],
-                debug_mode=self.debug_mode
-            )
-
-            # Execute order and track it
-            tx_hashes = limit_order.create_and_execute()
-            if tx_hashes:
-                self.open_orders[order.order_id] = order
-            
-            return tx_hashes
+            return await self.executor.run(self._execute_limit_increase, order)
 
         except Exception as e:
             logger.error(f"Error submitting limit increase order: {e}")
             self._handle_error(e)
             return None
 
+    def _execute_limit_increase(self, order: OrderRequest) -> Optional[Dict[str, HexBytes]]:
+        """Build, sign and send a limit increase order; blocks, so runs on the executor"""
+        limit_order = self._limit_increase_order(order, ManagedLimitIncreaseOrder)
+        limit_order.nonce_manager = self.nonce_manager
+
+        # Execute order and track it
+        tx_hashes = limit_order.create_and_execute()
+        if tx_hashes:
+            self.open_orders[order.order_id] = order
+
+        return tx_hashes
+
+    def _limit_increase_order(self, order: OrderRequest, order_class: type) -> LimitIncreaseOrder:
+        """A pyrfx limit increase order of `order_class` for `order`"""
+        order_parameters = self._limit_increase_parameters(order)
+
+        return order_class(
+            config=self.config,
+            market_address=order_parameters["market_address"],
+            collateral_address=order_parameters["start_token_address"],
+            index_token_address=order_parameters["index_token_address"],
+            is_long=(order_parameters["position_type"] == "long"),
+            size_delta=order_parameters["size_delta"],
+            initial_collateral_delta=order_parameters["initial_collateral_delta"],
+            trigger_price=order_parameters["trigger_price"],
+            slippage_percent=order_parameters["slippage_percent"],
+            debug_mode=self.debug_mode
+        )
+
+    def _limit_increase_parameters(self, order: OrderRequest) -> Dict[str, Any]:
+        """`order` as processed pyrfx limit increase parameters, in on-chain units"""
+        # Prepare order parameters
+        parameters = {
+            "selected_market": self.market_symbol,
+            "collateral_token_symbol": self.collateral_token,
+            "start_token_symbol": self.collateral_token,
+            "position_type": "long" if order.side == OrderSide.INCREASE_LONG else "short",
+            "size_delta_usd": order.size_usd,
+            "initial_collateral_delta": self.initial_collateral,  # Use fixed initial collateral
+            "trigger_price": order.price_usd,
+            "slippage_percent": order.slippage_percent
+        }
+
+        # Process parameters
+        return self.increase_parser.process_parameters(parameters=parameters)
+
     async def _submit_market_decrease(self, order: OrderRequest) -> Optional[Dict[str, HexBytes]]:
         """Submit a market decrease order"""
         try:
-            # Prepare order parameters
-            parameters = {
-                "selected_market": self.market_symbol,
-                "collateral_token_symbol": self.collateral_token,
-                "start_token_symbol": self.collateral_token,
-                "position_type": "long" if order.side == OrderSide.DECREASE_LONG else "short",
-                "size_delta_usd": order.size_usd,
-                "initial_collateral_delta": self.initial_collateral,  # Use fixed initial collateral
-                "slippage_percent": order.slippage_percent
-            }
-
-            # Process parameters
-            order_parameters = self.decrease_parser.process_parameters(parameters=parameters)
-
-            # Create and execute order
-            decrease_order = DecreaseOrder(
-                config=self.config,
-                market_address=order_parameters["market_address"],
-                collateral_address=order_parameters["collateral_address"],
-                index_token_address=order_parameters["index_token_address"],
-                is_long=(order_parameters["position_type"] == "long"),
-                size_delta=order_parameters["size_delta"],
-                initial_collateral_delta=order_parameters["initial_collateral_delta"],
-                slippage_percent=order_parameters["slippage_percent"],
-                debug_mode=self.debug_mode
-            )
-
-            return decrease_order.create_and_execute()
+            return await self.executor.run(self._execute_market_decrease, order)
 
         except Exception as e:
             logger.error(f"Error submitting market decrease order: {e}")
             self._handle_error(e)
             return None
 
+    def _execute_market_decrease(self, order: OrderRequest) -> Optional[Dict[str, HexBytes]]:
+        """Build, sign and send a market decrease order; blocks, so runs on the executor"""
+        decrease_order = self._market_decrease_order(order, ManagedDecreaseOrder)
+        decrease_order.nonce_manager = self.nonce_manager
+
+        return decrease_order.create_and_execute()
+
+    async def order_key(self, tx_hash: HexBytes) -> Optional[bytes]:
+        """
+        The on-chain key of the order created by `tx_hash`, once it is mined, or None if
+        the transaction created no order. Waits outside the executor's in-flight slots.
+        """
+        return await self.executor.wait(self._created_order_key, tx_hash)
+
+    async def recover_order_keys(self, orders: List[OrderRequest]) -> List[Optional[bytes]]:
+        """
+        Keys of live limit increase `orders`, matched against one listing of the account's
+        open orders on market, side, size and trigger price. None for orders not listed.
+        """
+        return await self.executor.run(self._match_listed_orders, orders)
+
+    def _match_listed_orders(self, orders: List[OrderRequest]) -> List[Optional[bytes]]:
+        """Lists the account's orders and matches `orders` against them; blocks"""
+        keys = get_bytes_32_values_at(self.config)
+        listed = get_account_orders(self.config)
+        if len(keys) != len(listed):
+            raise Exception("Account orders changed while listing them")
+
+        claimed = set()
+        matches = []
+        for order in orders:
+            parameters = self._limit_increase_parameters(order)
+            match = None
+            for key, listed_order in zip(keys, listed):
+                if (bytes(key) not in claimed
+                        and listed_order["market"].lower() == parameters["market_address"].lower()
+                        and listed_order["is_long"] == (parameters["position_type"] == "long")
+                        and listed_order["size_delta_usd"] == int(parameters["size_delta"])
+                        and listed_order["trigger_price"] == int(parameters["trigger_price"])):
+                    match = key
+                    claimed.add(bytes(key))
+                    break
+            matches.append(match)
+        return matches
+
+    def _created_order_key(self, tx_hash: HexBytes) -> Optional[bytes]:
+        """Waits for the receipt of `tx_hash` and reads its `OrderCreated` key; blocks"""
+        receipt = self.config.connection.eth.wait_for_transaction_receipt(tx_hash)
+        keys = order_event_keys(receipt, self.config.connection.keccak, "OrderCreated")
+        if receipt["status"] != 1 or not keys:
+            return None
+        return keys[0]
+
+    def _market_decrease_order(self, order: OrderRequest, order_class: type) -> DecreaseOrder:
+        """A pyrfx market decrease order of `order_class` for `order`"""
+        # Prepare order parameters
+        parameters = {
+            "selected_market": self.market_symbol,
+            "collateral_token_symbol": self.collateral_token,
+            "start_token_symbol": self.collateral_token,
+            "position_type": "long" if order.side == OrderSide.DECREASE_LONG else "short",
+            "size_delta_usd": order.size_usd,
+            "initial_collateral_delta": self.initial_collateral,  # Use fixed initial collateral
+            "slippage_percent": order.slippage_percent
+        }
+
+        # Process parameters
+        order_parameters = self.decrease_parser.process_parameters(parameters=parameters)
+
+        return order_class(
+            config=self.config,
+            market_address=order_parameters["market_address"],
+            collateral_address=order_parameters["collateral_address"],
+            index_token_address=order_parameters["index_token_address"],
+            is_long=(order_parameters["position_type"] == "long"),
+            size_delta=order_parameters["size_delta"],
+            initial_collateral_delta=order_parameters["initial_collateral_delta"],
+            slippage_percent=order_parameters["slippage_percent"],
+            debug_mode=self.debug_mode
+        )
+
+    async def submit_batch(self, orders: List[OrderRequest], cancel_keys: List[bytes] = ()) -> Optional[BatchResult]:
+        """
+        Cancel the orders with `cancel_keys` and submit `orders` in one multicall transaction.
+        Returns the batch with each leg's result (a `dry_run` result in debug mode), or None
+        if it could not be sent.
+        """
+        start_ns = time.monotonic_ns()
+        try:
+            batch = MulticallBatch()
+            for key in cancel_keys:
+                batch.add_cancel(self._encode_cancel(key), key)
+
+            # Legs are built concurrently, each pricing its order like a standalone submission
+            captured = await asyncio.gather(*(self.executor.run(self._capture_order, order) for order in orders))
+            for order, (value, multicall_args) in zip(orders, captured):
+                batch.add_create(multicall_args, value, order)
+
+            if not len(batch):
+                return None
+
+            result = await self._send_batch(batch)
+            for leg in result.batch.creates:
+                if leg.ok or result.dry_run:
+                    self.open_orders[leg.request.order_id] = leg.request
+            logger.info(f"Order batch executed: {result}")
+            return result
+
+        except Exception as e:
+            logger.error(f"Error submitting order batch: {e}")
+            self._handle_error(e)
+            return None
+
+        finally:
+            latency.record("submit_batch", start_ns)
+
+    def _capture_order(self, order: OrderRequest):
+        """The `(value, multicall_args)` submitting `order` on its own would send; blocks, so runs on the executor"""
+        if order.side in [OrderSide.INCREASE_LONG, OrderSide.INCREASE_SHORT]:
+            captured_order = self._limit_increase_order(order, CapturedLimitIncreaseOrder)
+        else:
+            captured_order = self._market_decrease_order(order, CapturedDecreaseOrder)
+        captured_order.create_and_execute()
+        return captured_order.captured
+
+    async def _send_batch(self, batch: MulticallBatch) -> BatchResult:
+        """Sign and send `batch` in an executor slot, then wait for its receipt outside the slots"""
+        result = await self.executor.run(self._submit_batch, batch)
+        return await self.executor.wait(self.batch_sender.wait, result)
+
+    def _submit_batch(self, batch: MulticallBatch) -> BatchResult:
+        """Sign and send `batch`; blocks, so runs on the executor"""
+        return self.batch_sender.submit(batch, get_max_fee_per_gas(self.config), debug_mode=self.debug_mode)
+
+    def _encode_cancel(self, order_key: bytes) -> HexBytes:
+        return HexBytes(self._order_handler.encode_abi("cancelOrder", args=[order_key]))
+
+    async def cancel_orders_by_keys(self, order_keys: List[bytes]) -> List[bytes]:
+        """
+        Cancel the orders with `order_keys` in one transaction, returning the keys no longer
+        open. A single filled or already cancelled order reverts the whole multicall, so on
+        failure the account's open orders are listed once and the rest retried. In debug
+        mode nothing is sent and every key is reported cancelled.
+        """
+        if not order_keys:
+            return []
+        try:
+            return await self._cancel_keys(order_keys)
+        except Exception as e:
+            logger.warning(f"Cancel by key failed, checking which orders are still open: {e}")
+
+        try:
+            open_keys = {bytes(key) for key in await self.executor.run(get_bytes_32_values_at, self.config)}
+            gone = [key for key in order_keys if bytes(key) not in open_keys]
+            still_open = [key for key in order_keys if bytes(key) in open_keys]
+            return gone + (await self._cancel_keys(still_open) if still_open else [])
+
+        except Exception as e:
+            logger.error(f"Error cancelling orders: {e}")
+            self._handle_error(e)
+            return []
+
+    async def _cancel_keys(self, order_keys: List[bytes]) -> List[bytes]:
+        batch = MulticallBatch()
+        for key in order_keys:
+            batch.add_cancel(self._encode_cancel(key), key)
+        result = await self._send_batch(batch)
+        if result.dry_run:
+            logger.info(f"Debug mode: {len(order_keys)} cancels not submitted")
+            return list(order_keys)
+        if result.status != 1:
+            raise Exception(f"Cancel transaction reverted: {result}")
+        cancelled = [leg.order_key for leg in result.batch.cancels if leg.ok]
+        logger.info(f"Cancelled {len(cancelled)}/{len(order_keys)} orders by key")
+        return cancelled
+
     async def cancel_orders(self, num_orders: int = None) -> None:
-        """Cancel open orders"""
+        """
+        Cancel the first `num_orders` open orders listed for the account, or all of them.
+        The listing order is arbitrary, so only cancelling all of them is targeted; to cancel
+        specific orders use `cancel_orders_by_keys`.
+        """
         try:
-            cancel_order = LimitCancelOrder(
-                config=self.config,
-                debug_mode=self.debug_mode
-            )
-
-            # List current orders
-            cancel_order.list_orders()
-
-            # Cancel specified number of orders or all if not specified
-            num_to_cancel = num_orders if num_orders else len(self.open_orders)
-            
-            for _ in range(num_to_cancel):
-                tx_hashes = cancel_order.create_and_execute()
-                if tx_hashes:
-                    for k, v in tx_hashes.items():
-                        logger.info(f"Cancelled order - {k}: {v.hex()}")
+            keys = await self.executor.run(get_bytes_32_values_at, self.config)
+            await self.cancel_orders_by_keys(keys[:num_orders] if num_orders else keys)
 
             # Clear tracked orders
             self.open_orders.clear()
@@ -171,6 +364,10 @@ class OrderClient:
             logger.error(f"Error cancelling orders: {e}")
             self._handle_error(e)
 
+    def close(self) -> None:
+        """Stop the executor once in-flight chain calls finish"""
+        self.executor.shutdown()
+
     def _handle_error(self, error: Exception) -> None:
         """Handle order execution errors"""
         try:
@@ -179,4 +376,4 @@ class OrderClient:
                 error_message = self.error_parser.get_error_string(error_reason=error_reason)
                 logger.error(f"Order execution error: {error_message}")
         except Exception as e:
-            logger.error(f"Error parsing execution error: {e}")
\ No newline at end of file
+            logger.error(f"Error parsing execution error: {e}")
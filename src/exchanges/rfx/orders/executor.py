@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Set
+
+
+logger = logging.getLogger(__name__)
+
+
+class NonceManager:
+    """
+    Hands out consecutive transaction nonces for one wallet from a local counter, so
+    transactions signed in parallel never reuse a nonce.
+
+    The counter starts from the wallet's pending transaction count on first use. Each
+    reserved nonce is settled with `sent` once broadcast, `release` if its transaction
+    was never sent, or `failed` if sending raised and it may or may not have reached the
+    node. Released nonces are reused lowest first, so the next transactions fill any gap
+    they leave. A failed send is reconciled with the chain's pending count only once no
+    other reservation is outstanding, since until then other threads hold nonces the
+    chain has not seen.
+    """
+
+    def __init__(self, config: Any):
+        self.config = config
+        self._lock = threading.Lock()
+        self._next: Optional[int] = None
+        self._reserved: Set[int] = set()  # Handed out and not yet settled
+        self._free: List[int] = []  # Heap of released nonces below `_next`
+        self._uncertain: Set[int] = set()  # Failed sends awaiting reconciliation
+
+    def _chain_nonce(self) -> int:
+        return self.config.connection.eth.get_transaction_count(self.config.user_wallet_address, "pending")
+
+    def reserve(self) -> int:
+        with self._lock:
+            if self._next is None:
+                self._next = self._chain_nonce()
+            if self._free:
+                nonce = heapq.heappop(self._free)
+            else:
+                nonce = self._next
+                self._next += 1
+            self._reserved.add(nonce)
+            return nonce
+
+    def sent(self, nonce: int) -> None:
+        with self._lock:
+            self._reserved.discard(nonce)
+            self._reconcile()
+
+    def release(self, nonce: int) -> None:
+        """Hands back a nonce whose transaction was never sent, e.g. its gas estimate reverted"""
+        with self._lock:
+            self._reserved.discard(nonce)
+            heapq.heappush(self._free, nonce)
+            self._reconcile()
+
+    def failed(self, nonce: int) -> None:
+        """Marks a nonce whose send raised, so it may or may not have been broadcast"""
+        with self._lock:
+            self._reserved.discard(nonce)
+            self._uncertain.add(nonce)
+            self._reconcile()
+
+    def _reconcile(self) -> None:
+        """
+        Once nothing is reserved, re-reads the pending count: nonces below it are used, so
+        uncertain and released nonces at or above it are free, as is everything from
+        `max(_next, pending)` up. Called with the lock held.
+        """
+        if not self._uncertain or self._reserved:
+            return
+        try:
+            pending = self._chain_nonce()
+        except Exception as e:
+            logger.error(f"Failed to reconcile nonces with the chain: {e}")
+            return
+        self._next = max(self._next, pending)
+        self._free = sorted(nonce for nonce in set(self._free) | self._uncertain if pending <= nonce < self._next)
+        self._uncertain.clear()
+
+
+class NonceManagedOrder:
+    """
+    Mixin for pyrfx orders that takes transaction nonces from a shared `NonceManager`
+    instead of querying the chain for each transaction. Mix in ahead of the pyrfx order
+    class and set `nonce_manager` before calling `create_and_execute`.
+    """
+    nonce_manager: Optional[NonceManager] = None
+
+    def _multicall_transaction(self, value_amount: int, multicall_args: list) -> Optional[bytes]:
+        """`Order._multicall_transaction` with the nonce from `nonce_manager`"""
+        if self.nonce_manager is None:
+            return super()._multicall_transaction(value_amount, multicall_args)
+
+        if not isinstance(value_amount, int):
+            value_amount = int(value_amount)
+
+        if self.debug_mode:
+            logger.info("Debug mode enabled. Transaction not submitted.")
+            return None
+
+        nonce = None
+        try:
+            if self._gas_limits_order_type_contract_function:
+                gas_estimate = 2 * self._gas_limits_order_type_contract_function.call()
+            else:
+                gas_estimate = 2_000_000
+
+            nonce = self.nonce_manager.reserve()
+            raw_tx = self._exchange_router_contract.functions.multicall(multicall_args).build_transaction(
+                {
+                    "value": value_amount,
+                    "chainId": self.config.chain_id,
+                    "gas": gas_estimate,
+                    "maxFeePerGas": int(self.max_fee_per_gas),
+                    "maxPriorityFeePerGas": 0,
+                    "nonce": nonce,
+                }
+            )
+            signed_txn = self.config.connection.eth.account.sign_transaction(raw_tx, self.config.private_key)
+        except Exception as e:
+            # Never sent, so the nonce can go to the next transaction
+            if nonce is not None:
+                self.nonce_manager.release(nonce)
+            logger.error(f"Failed to submit transaction: {e}")
+            raise Exception(f"Failed to submit transaction: {e}")
+
+        try:
+            tx_hash = self.config.connection.eth.send_raw_transaction(signed_txn.raw_transaction)
+        except Exception as e:
+            self.nonce_manager.failed(nonce)
+            logger.error(f"Failed to submit transaction: {e}")
+            raise Exception(f"Failed to submit transaction: {e}")
+
+        self.nonce_manager.sent(nonce)
+        logger.info(f"Transaction submitted with nonce {nonce}: 0x{tx_hash.hex()}")
+        return tx_hash
+
+
+class OrderExecutor:
+    """
+    Runs blocking chain calls (building, signing and sending transactions) on a
+    dedicated thread pool, with at most `max_in_flight` running at once, so order
+    submission never blocks the event loop.
+
+    Waiting for receipts goes through `wait` instead, on a separate pool of up to
+    `max_waiting` threads, so a transaction waiting to be mined never holds a slot.
+    """
+
+    def __init__(self, max_in_flight: int = 4, max_waiting: int = 16):
+        assert max_in_flight > 0, "max_in_flight must be positive."
+        assert max_waiting > 0, "max_waiting must be positive."
+        self.max_in_flight = max_in_flight
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="rfx-orders")
+        self._wait_pool = ThreadPoolExecutor(max_workers=max_waiting, thread_name_prefix="rfx-receipts")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Runs `fn(*args)` on the pool once an in-flight slot is free and returns its result"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+            finally:
+                self.in_flight -= 1
+
+    def submit(self, fn: Callable, *args) -> asyncio.Future:
+        """Schedules `fn(*args)` and returns a future for its result"""
+        return asyncio.ensure_future(self.run(fn, *args))
+
+    async def wait(self, fn: Callable, *args) -> Any:
+        """Runs `fn(*args)`, e.g. waiting for a receipt, on the wait pool without taking a slot"""
+        return await asyncio.get_running_loop().run_in_executor(self._wait_pool, fn, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+        self._wait_pool.shutdown(wait=wait)
@@ -0,0 +1,263 @@
+"""
+Offline computation of the `FeatureCalculator` features over historical data.
+
+Every snapshot is independent, so the kernel splits the snapshots into chunks and
+computes them in parallel across all numba threads (`NUMBA_NUM_THREADS`, or
+`numba.set_num_threads`). Each feature is returned as its own contiguous column,
+ready for fitting the skew weights.
+"""
+import numpy as np
+from numba import njit, prange, get_num_threads
+from numba.types import Array
+from typing import Dict, Optional
+
+from exchanges.binance.ws.handlers.orderbook import accumulate_levels
+from features.book_depth import depth_profile, depth_imbalance, NUM_DEPTH_FEATURES
+from features.multi_horizon import multi_horizon_features, NUM_HORIZON_FEATURES
+
+
+# Row layout of the scalar feature columns
+BATCH_FEATURES = (
+    "spot_mid",
+    "microprice",
+    "l1_imbalance",
+    "book_imbalance",
+    "depth_weighted_mid",
+    "trade_imbalance",
+    "volatility",
+    "dex_price",
+    "basis",
+    "adjusted_mid",
+    "skew",
+)
+NUM_BATCH_FEATURES = len(BATCH_FEATURES)
+
+
+@njit(["void(float64[:], float64[:, :, :], int64[:], float64[:, :, :], int64[:], float64[:, :], "
+       "float64[:], float64[:], float64[:], float64[:], float64[:], float64, int64, int64, "
+       "int64[:], float64[:], int64, float64[:, :], float64[:, :, :], float64[:, :, :])"],
+      error_model="numpy", fastmath=True, cache=True, parallel=True)
+def batch_features_kernel(timestamps: Array,
+                          bids: Array, num_bids: Array,
+                          asks: Array, num_asks: Array,
+                          trades: Array,
+                          oracle_prices: Array, funding_rates: Array,
+                          depths: Array, depth_weights: Array, skew_weights: Array,
+                          decay: float, window: int, lookback: int,
+                          horizon_kinds: Array, horizon_limits: Array, num_chunks: int,
+                          out: Array, book_depth: Array, trade_horizons: Array) -> None:
+    """
+    Computes the features of every snapshot, in parallel over chunks of snapshots.
+
+    Steps
+    -----
+    1. Split the snapshots into `num_chunks` contiguous chunks, one `prange` iteration each,
+       so the cumulative depth scratch arrays are allocated once per chunk.
+
+    2. For each snapshot, accumulate both sides of the book and build the depth profile
+       exactly as the live `Orderbook` and `depth_profile` do, then read the top of book.
+
+    3. Binary search the trades up to the snapshot time and compute the decayed trade
+       imbalance over the last `window` trades, the sum of absolute price changes over
+       the last `lookback` trades and, if any horizons are given, the multi-horizon features.
+
+    4. Combine with the DEX oracle price and funding rate into basis, adjusted mid and skew.
+
+    Parameters
+    ----------
+    timestamps : Array
+        Snapshot times in milliseconds, in the units of the trade times.
+
+    bids, asks : Array
+        (num_snapshots, num_levels, 2) arrays of [price, quantity] rows, best first.
+
+    num_bids, num_asks : Array
+        Number of valid leading levels of each snapshot's bids and asks.
+
+    trades : Array
+        A 2D array of trade data sorted by time, where each row is [time (ms), side, price, size].
+
+    oracle_prices, funding_rates : Array
+        The DEX oracle price and funding rate as of each snapshot.
+
+    depths : Array
+        Price depths (in basis points) of the depth profile.
+
+    depth_weights : Array
+        A weight per depth for the book imbalance.
+
+    skew_weights : Array
+        Skew weights of book imbalance, trade imbalance, basis and volatility.
+
+    decay : float
+        Per-trade decay of the trade imbalance, as in `TradeFlow`.
+
+    window : int
+        Number of most recent trades in the trade imbalance.
+
+    lookback : int
+        Number of most recent trades in the absolute price change sum.
+
+    horizon_kinds, horizon_limits : Array
+        Multi-horizon trade features to compute, see `TradeHorizons`. May be empty.
+
+    num_chunks : int
+        Number of chunks to split the snapshots into.
+
+    out : Array
+        A (NUM_BATCH_FEATURES, num_snapshots) array, filled in place in the layout of BATCH_FEATURES.
+
+    book_depth : Array
+        A (num_snapshots, num_depths, NUM_DEPTH_FEATURES) array, filled with the depth profiles.
+
+    trade_horizons : Array
+        A (num_snapshots, num_horizons, NUM_HORIZON_FEATURES) array, filled with the horizon features.
+    """
+    num_snapshots = timestamps.size
+    num_levels = bids.shape[1]
+    chunk_size = (num_snapshots + num_chunks - 1) // num_chunks
+    trade_times = trades[:, 0]
+
+    for chunk in prange(num_chunks):
+        cum_bids = np.zeros((num_levels, 2), dtype=np.float64)
+        cum_asks = np.zeros((num_levels, 2), dtype=np.float64)
+
+        for i in range(chunk * chunk_size, min((chunk + 1) * chunk_size, num_snapshots)):
+            snapshot_bids = bids[i, :num_bids[i]]
+            snapshot_asks = asks[i, :num_asks[i]]
+            accumulate_levels(snapshot_bids, cum_bids, 0, num_bids[i])
+            accumulate_levels(snapshot_asks, cum_asks, 0, num_asks[i])
+            depth_profile(snapshot_bids, cum_bids[:num_bids[i]], snapshot_asks, cum_asks[:num_asks[i]],
+                          depths, book_depth[i])
+
+            spot_mid = 0.0
+            microprice = 0.0
+            l1_imbalance = 0.0
+            if num_bids[i] > 0 and num_asks[i] > 0:
+                bid_p, bid_q = snapshot_bids[0, 0], snapshot_bids[0, 1]
+                ask_p, ask_q = snapshot_asks[0, 0], snapshot_asks[0, 1]
+                spot_mid = (bid_p + ask_p) / 2.0
+                total_q = bid_q + ask_q
+                microprice = (bid_p * ask_q + ask_p * bid_q) / total_q if total_q > 0.0 else spot_mid
+                l1_imbalance = (bid_q - ask_q) / total_q if total_q > 0.0 else 0.0
+
+            book_imbalance = depth_imbalance(book_depth[i], depth_weights)
+
+            num_trades = np.searchsorted(trade_times, timestamps[i], side="right")
+            buy_volume = 0.0
+            sell_volume = 0.0
+            weight = 1.0
+            for k in range(min(window, num_trades)):
+                idx = num_trades - 1 - k
+                if trades[idx, 1] > 0.0:
+                    buy_volume += np.log1p(trades[idx, 3]) * weight
+                else:
+                    sell_volume += np.log1p(trades[idx, 3]) * weight
+                weight *= decay
+            total_volume = buy_volume + sell_volume
+            trade_imbalance = (buy_volume - sell_volume) / total_volume if total_volume > 0.0 else 0.0
+
+            volatility = 0.0
+            for k in range(max(num_trades - lookback + 1, 1), num_trades):
+                volatility += abs(trades[k, 2] - trades[k - 1, 2])
+
+            if horizon_kinds.size > 0:
+                multi_horizon_features(trades[:num_trades], timestamps[i], horizon_kinds, horizon_limits,
+                                       trade_horizons[i])
+
+            dex_price = oracle_prices[i]
+            basis = (dex_price - spot_mid) / spot_mid if spot_mid > 0.0 else 0.0
+            adjusted_mid = np.round(spot_mid * (1.0 + basis - funding_rates[i] / (365.0 * 24.0)), 2)
+            skew = (
+                skew_weights[0] * book_imbalance +
+                skew_weights[1] * trade_imbalance +
+                skew_weights[2] * basis +
+                skew_weights[3] * -volatility
+            )
+
+            out[0, i] = spot_mid
+            out[1, i] = microprice
+            out[2, i] = l1_imbalance
+            out[3, i] = book_imbalance
+            out[4, i] = book_depth[i, 0, 4]
+            out[5, i] = trade_imbalance
+            out[6, i] = volatility
+            out[7, i] = dex_price
+            out[8, i] = basis
+            out[9, i] = adjusted_mid
+            out[10, i] = skew
+
+
+def asof(times: np.ndarray, value_times: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Latest of `values` (sorted by `value_times`) at or before each of `times`, the first value before any"""
+    idx = np.searchsorted(value_times, times, side="right") - 1
+    return values[np.clip(idx, 0, None)]
+
+
+def batch_features(timestamps: np.ndarray,
+                   bids: np.ndarray,
+                   asks: np.ndarray,
+                   trades: np.ndarray,
+                   oracle_prices: np.ndarray,
+                   funding_rates: np.ndarray,
+                   calculator=None,
+                   num_bids: Optional[np.ndarray] = None,
+                   num_asks: Optional[np.ndarray] = None,
+                   decay: float = 0.75,
+                   window: int = 100,
+                   lookback: int = 100,
+                   num_chunks: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Computes the `FeatureCalculator` features of every historical snapshot.
+
+    Depths, depth weights, skew weights and trade horizons are taken from `calculator`
+    (a default `FeatureCalculator` if None). Top of book features come from the
+    snapshots' best levels. The candle volatilities are per candle rather than per
+    snapshot and are not included; run `CandleVolatility` over the candles instead.
+
+    Returns a dict of columns, one entry per snapshot: every name in BATCH_FEATURES,
+    plus `book_depth` (num_snapshots, num_depths, NUM_DEPTH_FEATURES) and, if the
+    calculator has trade horizons, `trade_horizons` (num_snapshots, len(names)).
+    """
+    if calculator is None:
+        from features.features import FeatureCalculator
+        calculator = FeatureCalculator()
+
+    timestamps = np.ascontiguousarray(timestamps, dtype=np.float64)
+    bids = np.ascontiguousarray(bids, dtype=np.float64)
+    asks = np.ascontiguousarray(asks, dtype=np.float64)
+    trades = np.ascontiguousarray(trades, dtype=np.float64)
+    num_snapshots = timestamps.size
+    num_bids = np.full(num_snapshots, bids.shape[1], dtype=np.int64) if num_bids is None else num_bids.astype(np.int64)
+    num_asks = np.full(num_snapshots, asks.shape[1], dtype=np.int64) if num_asks is None else num_asks.astype(np.int64)
+
+    horizons = calculator.trade_horizons
+    horizon_kinds = horizons.kinds if horizons is not None else np.zeros(0, dtype=np.int64)
+    horizon_limits = horizons.limits if horizons is not None else np.zeros(0, dtype=np.float64)
+    skew_weights = np.array([
+        calculator.weights['book_imbalance'],
+        calculator.weights['trade_imbalance'],
+        calculator.weights['basis'],
+        calculator.weights['volatility'],
+    ])
+
+    out = np.zeros((NUM_BATCH_FEATURES, num_snapshots), dtype=np.float64)
+    book_depth = np.zeros((num_snapshots, calculator.depths.size, NUM_DEPTH_FEATURES), dtype=np.float64)
+    trade_horizons = np.zeros((num_snapshots, horizon_kinds.size, NUM_HORIZON_FEATURES), dtype=np.float64)
+    if num_chunks is None:
+        num_chunks = get_num_threads() * 8
+
+    batch_features_kernel(
+        timestamps, bids, num_bids, asks, num_asks, trades,
+        np.ascontiguousarray(oracle_prices, dtype=np.float64),
+        np.ascontiguousarray(funding_rates, dtype=np.float64),
+        calculator.depths.astype(np.float64), calculator.depth_weights, skew_weights,
+        decay, window, lookback, horizon_kinds, horizon_limits,
+        max(1, min(num_chunks, num_snapshots)), out, book_depth, trade_horizons
+    )
+
+    columns = {name: out[k] for k, name in enumerate(BATCH_FEATURES)}
+    columns['book_depth'] = book_depth
+    if horizon_kinds.size:
+        columns['trade_horizons'] = trade_horizons.reshape(num_snapshots, -1)
+    return columns
@@ -0,0 +1,132 @@
+import numpy as np
+from numba import njit
+from numba.types import Array
+
+
+# Per-depth layout of `depth_profile`
+DEPTH_FEATURES = (
+    "bid_qty",             # Bid quantity within the depth of the best bid
+    "ask_qty",             # Ask quantity within the depth of the best ask
+    "bid_notional",        # Bid notional within the depth
+    "ask_notional",        # Ask notional within the depth
+    "depth_weighted_mid",  # Bid and ask VWAPs within the depth, each weighted by the opposite side's quantity
+)
+NUM_DEPTH_FEATURES = len(DEPTH_FEATURES)
+
+
+@njit(["int64(float64[:, :], float64, boolean)"], error_model="numpy", fastmath=True, cache=True)
+def levels_within(side: Array, bound: float, descending: bool) -> int:
+    """
+    Binary searches one side of the book for the number of levels at or better than `bound`.
+
+    Parameters
+    ----------
+    side : Array
+        An array of [price, quantity] rows, sorted best -> worst.
+
+    bound : float
+        The worst price to include.
+
+    descending : bool
+        True for bids (highest price first), False for asks (lowest price first).
+
+    Returns
+    -------
+    int
+        The number of leading rows of `side` within `bound`.
+    """
+    lo = 0
+    hi = side.shape[0]
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if (side[mid, 0] >= bound) if descending else (side[mid, 0] <= bound):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+@njit(["void(float64[:, :], float64[:, :], float64[:, :], float64[:, :], float64[:], float64[:, :])"],
+      error_model="numpy", fastmath=True, cache=True)
+def depth_profile(bids: Array, cum_bids: Array, asks: Array, cum_asks: Array, depths: Array, out: Array) -> None:
+    """
+    Computes liquidity features at several depths from the book's running totals.
+
+    Each depth costs one binary search per side and a lookup into the cumulative
+    [quantity, notional] arrays maintained by `Orderbook`, instead of a scan of the book.
+
+    Parameters
+    ----------
+    bids : Array
+        An array of bid prices and quantities, best first.
+
+    cum_bids : Array
+        Running [quantity, notional] totals of `bids`.
+
+    asks : Array
+        An array of ask prices and quantities, best first.
+
+    cum_asks : Array
+        Running [quantity, notional] totals of `asks`.
+
+    depths : Array
+        An array of price depths (in basis points) from the best bid/ask.
+
+    out : Array
+        A (num_depths, NUM_DEPTH_FEATURES) array, filled in place in the layout of DEPTH_FEATURES.
+    """
+    if bids.shape[0] == 0 or asks.shape[0] == 0:
+        out[:, :] = 0.0
+        return
+
+    best_bid_p, best_ask_p = bids[0, 0], asks[0, 0]
+
+    for i in range(depths.size):
+        depth = depths[i] * 1e-4  # NOTE: BPS -> Decimals
+        num_bids = levels_within(bids, best_bid_p * (1.0 - depth), True)
+        num_asks = levels_within(asks, best_ask_p * (1.0 + depth), False)
+
+        bid_qty = cum_bids[num_bids - 1, 0] if num_bids > 0 else 0.0
+        ask_qty = cum_asks[num_asks - 1, 0] if num_asks > 0 else 0.0
+        bid_notional = cum_bids[num_bids - 1, 1] if num_bids > 0 else 0.0
+        ask_notional = cum_asks[num_asks - 1, 1] if num_asks > 0 else 0.0
+
+        out[i, 0] = bid_qty
+        out[i, 1] = ask_qty
+        out[i, 2] = bid_notional
+        out[i, 3] = ask_notional
+
+        if bid_qty > 0.0 and ask_qty > 0.0:
+            bid_vwap = bid_notional / bid_qty
+            ask_vwap = ask_notional / ask_qty
+            out[i, 4] = (bid_vwap * ask_qty + ask_vwap * bid_qty) / (bid_qty + ask_qty)
+        else:
+            out[i, 4] = (best_bid_p + best_ask_p) / 2.0
+
+
+@njit(["float64(float64[:, :], float64[:])"], error_model="numpy", fastmath=True, cache=True)
+def depth_imbalance(profile: Array, weights: Array) -> float:
+    """
+    Calculates the weighted log ratio of bid to ask quantity across the depths of a `depth_profile`.
+
+    Equivalent to `orderbook_imbalance` with the same depths and weights, from the
+    precomputed profile rather than the raw book.
+
+    Parameters
+    ----------
+    profile : Array
+        The output of `depth_profile`.
+
+    weights : Array
+        A weight per depth, e.g. `geometric_weights(num_depths)`.
+
+    Returns
+    -------
+    float
+        The weighted imbalance; depths where either side is empty are skipped.
+    """
+    weighted_imbalance = 0.0
+    for i in range(profile.shape[0]):
+        if profile[i, 0] > 0.0 and profile[i, 1] > 0.0:
+            weighted_imbalance += np.log(profile[i, 0] / profile[i, 1]) * weights[i]
+    return weighted_imbalance
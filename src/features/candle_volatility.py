@@ -0,0 +1,112 @@
+import math
+from typing import List
+
+
+_LN2 = math.log(2.0)
+_GK_CLOSE_COEF = 2.0 * _LN2 - 1.0
+
+
+class _RollingSum:
+    """Sum of the last `size` values, recomputed from the window each time it wraps"""
+    __slots__ = ("values", "pos", "count", "total")
+
+    def __init__(self, size: int):
+        self.values: List[float] = [0.0] * size
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+
+    def push(self, value: float) -> None:
+        if not self.values:
+            return
+        if self.count == len(self.values):
+            self.total -= self.values[self.pos]
+        else:
+            self.count += 1
+        self.values[self.pos] = value
+        self.total += value
+        self.pos += 1
+        if self.pos == len(self.values):
+            self.pos = 0
+            self.total = math.fsum(self.values)
+
+
+class CandleVolatility:
+    """
+    Rolling per-candle volatility estimators, maintained incrementally from OHLC updates.
+
+    Estimates cover the last `window` candles, the most recent being the one still
+    forming. Per-candle variance terms of closed candles are kept in rolling sums that
+    only change when a candle closes; an update to the forming candle recomputes its
+    own terms and the cached estimates in O(1), so reading them costs nothing.
+
+    Estimators, as the volatility of one candle's log return:
+
+    - Parkinson: mean of ln(H/L)^2 / (4 ln 2)
+    - Garman-Klass: mean of 0.5 ln(H/L)^2 - (2 ln 2 - 1) ln(C/O)^2
+    - Close-to-close: root mean square of ln(C_t / C_t-1), assuming zero drift
+
+    Parameters
+    ----------
+    window : int
+        Number of candles in the estimates, including the forming one.
+    """
+    __slots__ = (
+        "window", "parkinson", "garman_klass", "close_to_close",
+        "_parkinson_sum", "_garman_klass_sum", "_close_to_close_sum",
+        "_timestamp", "_open", "_high", "_low", "_close", "_last_close",
+    )
+
+    def __init__(self, window: int = 60):
+        assert window > 1, "Window must be at least 2 candles."
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        self.parkinson = 0.0
+        self.garman_klass = 0.0
+        self.close_to_close = 0.0
+        self._parkinson_sum = _RollingSum(self.window - 1)
+        self._garman_klass_sum = _RollingSum(self.window - 1)
+        self._close_to_close_sum = _RollingSum(self.window - 1)
+        self._timestamp = None
+        self._open = self._high = self._low = self._close = 0.0
+        self._last_close = 0.0
+
+    @staticmethod
+    def _terms(open: float, high: float, low: float, close: float, last_close: float):
+        if open <= 0.0 or low <= 0.0:
+            return 0.0, 0.0, 0.0
+        hl = math.log(high / low)
+        co = math.log(close / open)
+        parkinson = hl * hl / (4.0 * _LN2)
+        garman_klass = 0.5 * hl * hl - _GK_CLOSE_COEF * co * co
+        cc = math.log(close / last_close) if last_close > 0.0 else 0.0
+        return parkinson, garman_klass, cc * cc
+
+    def update(self, timestamp: float, open: float, high: float, low: float, close: float) -> None:
+        """Apply an update of the forming candle, or the first update of a new one"""
+        if self._timestamp is not None and timestamp > self._timestamp:
+            # The forming candle closed
+            parkinson, garman_klass, close_to_close = self._terms(
+                self._open, self._high, self._low, self._close, self._last_close
+            )
+            self._parkinson_sum.push(parkinson)
+            self._garman_klass_sum.push(garman_klass)
+            if self._last_close > 0.0:
+                self._close_to_close_sum.push(close_to_close)
+            self._last_close = self._close
+
+        self._timestamp = timestamp
+        self._open, self._high, self._low, self._close = open, high, low, close
+
+        parkinson, garman_klass, close_to_close = self._terms(open, high, low, close, self._last_close)
+
+        count = self._parkinson_sum.count + 1
+        self.parkinson = math.sqrt(max((self._parkinson_sum.total + parkinson) / count, 0.0))
+        self.garman_klass = math.sqrt(max((self._garman_klass_sum.total + garman_klass) / count, 0.0))
+
+        returns = self._close_to_close_sum.count + (1 if self._last_close > 0.0 else 0)
+        self.close_to_close = (
+            math.sqrt((self._close_to_close_sum.total + close_to_close) / returns) if returns else 0.0
+        )
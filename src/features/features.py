@@ -1,10 +1,13 @@
 import time
-from typing import Dict, Optional
+from typing import Callable, Optional
 from exchanges.rfx.handlers.public import DexMarketData
+from exchanges.binance.ws.handlers.bba import BestBidAsk
 
-from features.orderbook_imbalance import orderbook_imbalance
-from features.trades_imbalance import trades_imbalance
-from features.trades_diff import trades_diffs
+from features.book_depth import depth_profile, depth_imbalance, NUM_DEPTH_FEATURES
+from features.multi_horizon import TradeHorizons
+from features.registry import FeatureRegistry
+from features.vector import FeatureVector, FeatureHistory
+from utils.utils import geometric_weights
 
 import numpy as np
 import logging
@@ -14,13 +17,33 @@ logger = logging.getLogger(__name__)
 
 
 class FeatureCalculator:
-    def __init__(self, compute_interval: float = 0.1): 
+    """
+    Computes quoting features through a `FeatureRegistry`.
+
+    The built-in features are registered in `_register_features`; more can be added
+    with `self.registry.register(name, inputs, fn)` and show up in the output's `extra`.
+    Each feature is only recomputed when the book, trades, candles, DEX data or features
+    it depends on have changed since its last evaluation.
+
+    Results are `FeatureVector`s, and their scalar features are kept in `self.history`.
+    """
+
+    def __init__(self,
+                 compute_interval: float = 0.1,
+                 clock: Callable[[], float] = time.time,
+                 trade_horizons: Optional[TradeHorizons] = None,
+                 history_length: int = 3600): 
+        # `clock` returns the current time in seconds; replays pass a simulated one
+        self.clock = clock
         self.compute_interval = compute_interval
         self.last_computed = 0.0
         
         self.depths = np.array([10.0, 25.0, 50.0, 100.0, 250.0])
-        self.trade_window = 100
-        self.lookback_window = 100
+        self.depth_weights = geometric_weights(self.depths.size)
+        self._depth_profile = np.zeros((self.depths.size, NUM_DEPTH_FEATURES), dtype=np.float64)
+        self.trade_horizons = trade_horizons
+        # Top of book taken from the depth stream, for when it is fresher than the bookTicker stream
+        self._book_top = BestBidAsk()
         
         self.weights = {
             'book_imbalance': 0.30,
@@ -29,12 +52,91 @@ class FeatureCalculator:
             'volatility': 0.15
         }
 
+        self.registry = FeatureRegistry()
+        self._register_features()
+        # Scalar features of the last `history_length` computations
+        self.history = FeatureHistory(history_length)
+
+    def _register_features(self) -> None:
+        register = self.registry.register
+
+        # Per depth in `self.depths`, laid out as `features.book_depth.DEPTH_FEATURES`
+        register('book_depth', ('book',), self._book_depth)
+        register('book_imbalance', ('book_depth',), lambda profile: depth_imbalance(profile, self.depth_weights))
+        register('depth_weighted_mid', ('book_depth',), lambda profile: profile[0, 4])
+
+        # From the freshest top of book, see `_top_of_book`
+        register('spot_mid', ('top_of_book',), lambda top: top.mid)
+        register('microprice', ('top_of_book',), lambda top: top.microprice)
+        register('l1_imbalance', ('top_of_book',), lambda top: top.imbalance)
+
+        # Maintained per trade by the handler, see features.trade_flow
+        register('trade_imbalance', ('trades',), lambda trades: trades.flow.imbalance())
+        register('volatility', ('trades',), lambda trades: trades.flow.abs_price_change())
+
+        # Per-candle volatility in bps, cached by the handler between candle updates
+        register('vol_parkinson', ('candles',), lambda candles: candles.volatility.parkinson * 1e4)
+        register('vol_garman_klass', ('candles',), lambda candles: candles.volatility.garman_klass * 1e4)
+        register('vol_close_to_close', ('candles',), lambda candles: candles.volatility.close_to_close * 1e4)
+
+        register('dex_price', ('dex',), lambda dex_data: dex_data.oracle_price)
+        register('basis', ('dex_price', 'spot_mid'), self._basis)
+        register('adjusted_mid', ('spot_mid', 'basis', 'dex'), self._adjusted_mid)
+        register('skew', ('book_imbalance', 'trade_imbalance', 'basis', 'volatility'), self._skew)
+
+        if self.trade_horizons is not None and len(self.trade_horizons):
+            # Flat vector laid out as `self.trade_horizons.names`
+            register('trade_horizons', ('trades', 'time'), self._trade_horizons)
+
+    def _top_of_book(self, orderbook_handler, bba_handler: Optional[BestBidAsk]) -> BestBidAsk:
+        """
+        The bookTicker quote unless the depth stream has seen a later update: both carry
+        the same orderbook update id, and bookTicker is real-time while depth is batched
+        every 100ms.
+        """
+        if bba_handler is not None and bba_handler.valid and bba_handler.update_id >= orderbook_handler.seq_id:
+            return bba_handler
+
+        book_top = self._book_top
+        if book_top.update_id != orderbook_handler.seq_id or not book_top.valid:
+            bba = orderbook_handler.bba
+            book_top.update(bba[0][0], bba[0][1], bba[1][0], bba[1][1], orderbook_handler.seq_id)
+        return book_top
+
+    def _book_depth(self, book) -> np.ndarray:
+        depth_profile(book.bids, book.cum_bids, book.asks, book.cum_asks, self.depths, self._depth_profile)
+        return self._depth_profile.copy()
+
+    def _trade_horizons(self, trades, current_time: float) -> np.ndarray:
+        return self.trade_horizons.compute(trades.unwrap(), current_time * 1000.0)
+
+    @staticmethod
+    def _basis(dex_price: float, spot_mid: float) -> float:
+        return (dex_price - spot_mid) / spot_mid if spot_mid > 0 else 0
+
+    @staticmethod
+    def _adjusted_mid(spot_mid: float, basis: float, dex_data: DexMarketData) -> float:
+        funding_adjustment = dex_data.funding_rate / (365 * 24)  
+        adjusted_basis = basis - funding_adjustment
+        adjusted_mid = spot_mid * (1 + adjusted_basis)
+        return round(float(adjusted_mid), 2)
+
+    def _skew(self, book_imbalance: float, trade_imbalance: float, basis: float, volatility: float) -> float:
+        return (
+            self.weights['book_imbalance'] * book_imbalance +
+            self.weights['trade_imbalance'] * trade_imbalance +
+            self.weights['basis'] * basis +
+            self.weights['volatility'] * -volatility
+        )
+
     def compute_features(self, 
                         orderbook_handler,
                         trade_handler,
-                        dex_data: Optional[DexMarketData]) -> Dict:
+                        dex_data: Optional[DexMarketData],
+                        ohlcv_handler=None,
+                        bba_handler: Optional[BestBidAsk] = None) -> Optional[FeatureVector]:
         """Compute features from market data"""
-        current_time = time.time()
+        current_time = self.clock()
         if current_time - self.last_computed < self.compute_interval:
             return None
 
@@ -42,50 +144,17 @@ class FeatureCalculator:
             if not all([orderbook_handler, trade_handler, dex_data]):
                 return None
 
-            book_imbalance = orderbook_imbalance(
-                bids=orderbook_handler.bids,
-                asks=orderbook_handler.asks,
-                depths=self.depths
-            )
-
-            trades_array = trade_handler.unwrap()
-            trade_imbalance = trades_imbalance(
-                trades=trades_array,
-                window=self.trade_window
-            )
-
-            volatility = trades_diffs(
-                trades=trades_array,
-                lookback=self.lookback_window
-            )
-
-            spot_mid = (orderbook_handler.bba[0][0] + orderbook_handler.bba[1][0]) / 2
-            basis = (dex_data.oracle_price - spot_mid) / spot_mid if spot_mid > 0 else 0
-
-            skew = (
-                self.weights['book_imbalance'] * book_imbalance +
-                self.weights['trade_imbalance'] * trade_imbalance +
-                self.weights['basis'] * basis +
-                self.weights['volatility'] * -volatility
-            )
-
-            funding_adjustment = dex_data.funding_rate / (365 * 24)  
-            adjusted_basis = basis - funding_adjustment
-            adjusted_mid = spot_mid * (1 + adjusted_basis)
-
-            adjusted_mid = round(float(adjusted_mid), 2)
-
-            features = {
-                'spot_mid': spot_mid,
-                'dex_price': dex_data.oracle_price,
-                'adjusted_mid': adjusted_mid,
-                'basis': basis,
-                'book_imbalance': book_imbalance,
-                'trade_imbalance': trade_imbalance,
-                'volatility': volatility,
-                'skew': skew,
-                'timestamp': current_time
-            }
+            top_of_book = self._top_of_book(orderbook_handler, bba_handler)
+            values = self.registry.compute({
+                'book': (orderbook_handler, orderbook_handler.version),
+                'top_of_book': (top_of_book, (id(top_of_book), top_of_book.version)),
+                'trades': (trade_handler, trade_handler.version),
+                'candles': (ohlcv_handler, ohlcv_handler.version if ohlcv_handler is not None else None),
+                'dex': (dex_data, dex_data.timestamp),
+                'time': (current_time, current_time),
+            })
+            features = FeatureVector.from_values(values, current_time)
+            self.history.append(features)
 
             self.last_computed = current_time
             return features
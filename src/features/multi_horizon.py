@@ -0,0 +1,178 @@
+import numpy as np
+from numba import njit
+from numba.types import Array
+from typing import Dict, List, Sequence
+
+
+# Horizon kinds
+HORIZON_TRADES = 0    # Last N trades
+HORIZON_SECONDS = 1   # Trades in the last N seconds
+HORIZON_VOLUME = 2    # Most recent trades until N base units have traded
+
+# Per-horizon layout of the feature vector
+HORIZON_FEATURES = (
+    "volume",            # Traded base volume
+    "imbalance",         # (buy volume - sell volume) / volume, from -1 to 1
+    "num_trades",        # Number of trades
+    "vwap",              # Volume weighted average price
+    "abs_price_change",  # Sum of absolute price changes between consecutive trades
+    "return",            # Newest price / oldest price - 1
+    "complete",          # 1 if the horizon fits in the buffer, 0 if it was cut short
+)
+# Features of an incomplete horizon are NaN, so they read as missing rather than as a short horizon
+NUM_HORIZON_FEATURES = len(HORIZON_FEATURES)
+
+
+@njit(["void(float64[:, :], float64, int64[:], float64[:], float64[:, :])"], error_model="numpy", fastmath=True, cache=True)
+def multi_horizon_features(trades: Array, now_ms: float, kinds: Array, limits: Array, out: Array) -> None:
+    """
+    Computes trade features over any number of horizons in a single backward pass.
+
+    Steps
+    -----
+    1. Walk the trades from newest to oldest, accumulating buy/sell volume, notional,
+       trade count and the absolute price changes between consecutive trades.
+
+    2. Before adding each trade, close every open horizon the trade falls outside of:
+       a trade-count horizon once it holds `limit` trades, a time horizon once trades
+       are older than `now_ms - limit * 1000` and a volume horizon once at least
+       `limit` has traded. A closed horizon's row is written from the accumulators.
+
+    3. Stop as soon as every horizon is closed, so the pass only reads as many trades
+       as the longest horizon needs. Horizons still open when the buffer runs out are
+       flagged incomplete, with NaN features.
+
+    Parameters
+    ----------
+    trades : Array
+        A 2D array of trade data, oldest first, where each row is [time (ms), side, price, size].
+
+    now_ms : float
+        Current time in milliseconds, the end of the time horizons.
+
+    kinds : Array
+        Kind of each horizon, one of HORIZON_TRADES, HORIZON_SECONDS or HORIZON_VOLUME.
+
+    limits : Array
+        Length of each horizon: a trade count, seconds or base volume.
+
+    out : Array
+        A (num_horizons, NUM_HORIZON_FEATURES) array, filled in place in the layout of HORIZON_FEATURES.
+    """
+    num_horizons = kinds.size
+    num_trades = trades.shape[0]
+    closed = np.zeros(num_horizons, dtype=np.bool_)
+    num_open = num_horizons
+
+    buy_volume = 0.0
+    sell_volume = 0.0
+    notional = 0.0
+    abs_price_change = 0.0
+    count = 0
+    newest_price = trades[num_trades - 1, 2] if num_trades > 0 else 0.0
+    oldest_price = newest_price
+
+    i = num_trades - 1
+    while num_open > 0:
+        exhausted = i < 0
+
+        for h in range(num_horizons):
+            if closed[h]:
+                continue
+
+            if kinds[h] == HORIZON_TRADES:
+                full = count >= limits[h]
+            elif kinds[h] == HORIZON_SECONDS:
+                full = not exhausted and trades[i, 0] < now_ms - limits[h] * 1000.0
+            else:
+                full = buy_volume + sell_volume >= limits[h]
+
+            if not full and exhausted:
+                for k in range(NUM_HORIZON_FEATURES - 1):
+                    out[h, k] = np.nan
+                out[h, 6] = 0.0
+                closed[h] = True
+                num_open -= 1
+            elif full:
+                volume = buy_volume + sell_volume
+                out[h, 0] = volume
+                out[h, 1] = (buy_volume - sell_volume) / volume if volume > 0.0 else 0.0
+                out[h, 2] = count
+                out[h, 3] = notional / volume if volume > 0.0 else 0.0
+                out[h, 4] = abs_price_change
+                out[h, 5] = newest_price / oldest_price - 1.0 if oldest_price > 0.0 else 0.0
+                out[h, 6] = 1.0
+                closed[h] = True
+                num_open -= 1
+
+        if exhausted:
+            break
+
+        price = trades[i, 2]
+        size = trades[i, 3]
+        if trades[i, 1] > 0.0:
+            buy_volume += size
+        else:
+            sell_volume += size
+        notional += price * size
+        if count > 0:
+            abs_price_change += abs(oldest_price - price)
+        oldest_price = price
+        count += 1
+        i -= 1
+
+
+class TradeHorizons:
+    """
+    A configurable set of trade horizons, computed together by `multi_horizon_features`.
+
+    The output is a flat vector with NUM_HORIZON_FEATURES entries per horizon, in the order
+    the horizons were given (trade counts, then seconds, then volumes); `names` labels
+    each entry, e.g. `trades_100.imbalance` or `seconds_5.vwap`.
+
+    A horizon longer than the trade buffer comes back incomplete, with NaN features. Size
+    the buffer to at least `max_trades`; time and volume horizons depend on the trade rate.
+    """
+
+    def __init__(self,
+                 trades: Sequence[int] = (),
+                 seconds: Sequence[float] = (),
+                 volumes: Sequence[float] = ()):
+        horizons = (
+            [(HORIZON_TRADES, float(n), f"trades_{n}") for n in trades] +
+            [(HORIZON_SECONDS, float(s), f"seconds_{s:g}") for s in seconds] +
+            [(HORIZON_VOLUME, float(v), f"volume_{v:g}") for v in volumes]
+        )
+        self.kinds = np.array([kind for kind, _, _ in horizons], dtype=np.int64)
+        self.limits = np.array([limit for _, limit, _ in horizons], dtype=np.float64)
+        self.horizon_names: List[str] = [name for _, _, name in horizons]
+        self.names: List[str] = [
+            f"{horizon}.{feature}" for horizon in self.horizon_names for feature in HORIZON_FEATURES
+        ]
+        self._out = np.zeros((len(horizons), NUM_HORIZON_FEATURES), dtype=np.float64)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "TradeHorizons":
+        return cls(
+            trades=config.get("trades", ()),
+            seconds=config.get("seconds", ()),
+            volumes=config.get("volumes", ()),
+        )
+
+    def __len__(self) -> int:
+        return self.kinds.size
+
+    @property
+    def max_trades(self) -> int:
+        """Longest trade-count horizon, the fewest buffered trades that cover every one"""
+        counts = self.limits[self.kinds == HORIZON_TRADES]
+        return int(counts.max()) if counts.size else 0
+
+    def compute(self, trades: np.ndarray, now_ms: float) -> np.ndarray:
+        """Feature vector for the given trades, as a new flat array"""
+        if self.kinds.size:
+            multi_horizon_features(trades, now_ms, self.kinds, self.limits, self._out)
+        return self._out.ravel().copy()
+
+    def to_dict(self, vector: np.ndarray) -> Dict[str, float]:
+        return dict(zip(self.names, vector.tolist()))
@@ -5,7 +5,7 @@ from numba.types import float64, Array
 from utils.utils import geometric_weights
 
 
-@njit(["float64(float64[:, :], float64[:, :], float64[:])"], error_model="numpy", fastmath=True)
+@njit(["float64(float64[:, :], float64[:, :], float64[:])"], error_model="numpy", fastmath=True, cache=True)
 def orderbook_imbalance(bids: Array, asks: Array, depths: Array) -> float:
     """
     Calculates the geometrically weighted order book imbalance across different price depths.
@@ -36,10 +36,12 @@ def orderbook_imbalance(bids: Array, asks: Array, depths: Array) -> float:
     Notes
     -----
     - Depths are converted from basis points (BPS) to decimals within the function.
+    - Scans the book once per depth; `features.book_depth` computes the same imbalance
+      from the book's cumulative totals.
 
     """
     num_depths = depths.size
-    depths = depths / 1e-4  # NOTE: BPS -> Decimals
+    depths = depths * 1e-4  # NOTE: BPS -> Decimals
     weights = geometric_weights(num_depths)
     imbalances = np.empty(num_depths, dtype=np.float64)
 
@@ -56,9 +58,12 @@ def orderbook_imbalance(bids: Array, asks: Array, depths: Array) -> float:
         total_bid_size_within_depth = np.sum(bid_q[:num_bids_within_depth])
         total_ask_size_within_depth = np.sum(ask_q[:num_asks_within_depth])
 
-        imbalances[i] = np.log(
-            total_bid_size_within_depth / total_ask_size_within_depth
-        )
+        if total_bid_size_within_depth > 0.0 and total_ask_size_within_depth > 0.0:
+            imbalances[i] = np.log(
+                total_bid_size_within_depth / total_ask_size_within_depth
+            )
+        else:
+            imbalances[i] = 0.0
 
     weighted_imbalance = np.sum(imbalances * weights)
 
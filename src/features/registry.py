@@ -0,0 +1,139 @@
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+
+# Inputs provided by the caller of `FeatureRegistry.compute`, rather than by another feature
+SOURCES = ("book", "top_of_book", "trades", "candles", "dex", "time")
+
+
+class Feature:
+    """A registered feature: `fn(*inputs)` is evaluated whenever one of its inputs changes"""
+    __slots__ = (
+        "name", "inputs", "fn", "value", "version", "input_versions",
+        "calls", "skips", "total_ns",
+    )
+
+    def __init__(self, name: str, inputs: Sequence[str], fn: Callable[..., Any]):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.fn = fn
+        self.value = None
+        self.version = 0
+        self.input_versions = None
+        self.calls = 0
+        self.skips = 0
+        self.total_ns = 0
+
+
+class FeatureRegistry:
+    """
+    Features declared with their inputs and evaluated in dependency order.
+
+    An input is either a source (SOURCES: the book, top of book, trades and candle
+    handlers, the DEX data and the current time) or the name of another feature. `compute` is given
+    each source with a version counter; a feature is only re-evaluated when the
+    versions of its inputs differ from its previous evaluation, otherwise its memoised
+    value is reused at no cost. Re-evaluating a feature bumps its own version, which
+    is what features depending on it see. Features with a missing (None) source, or
+    depending on one, are left out of the result.
+    """
+
+    def __init__(self):
+        self.features: Dict[str, Feature] = {}
+        self._order: List[Feature] = []
+        # Scratch space of `compute`, reused between calls
+        self.values: Dict[str, Any] = {}
+        self._inputs: Dict[str, Any] = {}
+        self._versions: Dict[str, Any] = {}
+
+    def register(self, name: str, inputs: Sequence[str], fn: Callable[..., Any]) -> Feature:
+        if name in self.features or name in SOURCES:
+            raise ValueError(f"Feature {name} is already registered")
+        feature = Feature(name, inputs, fn)
+        self.features[name] = feature
+        self._order = []
+        return feature
+
+    def feature(self, name: str, inputs: Sequence[str]):
+        """Decorator form of `register`"""
+        def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+            self.register(name, inputs, fn)
+            return fn
+        return decorator
+
+    def order(self) -> List[Feature]:
+        """Features sorted so every feature comes after its inputs"""
+        if self._order:
+            return self._order
+
+        order: List[Feature] = []
+        state: Dict[str, int] = {}  # 1: visiting, 2: done
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Feature dependency cycle: {' -> '.join(path + (name,))}")
+            state[name] = 1
+            for dependency in self.features[name].inputs:
+                if dependency in SOURCES:
+                    continue
+                if dependency not in self.features:
+                    raise ValueError(f"Feature {name} depends on unknown input {dependency}")
+                visit(dependency, path + (name,))
+            state[name] = 2
+            order.append(self.features[name])
+
+        for name in self.features:
+            visit(name, ())
+        self._order = order
+        return order
+
+    def compute(self, sources: Dict[str, Tuple[Any, Any]]) -> Dict[str, Any]:
+        """
+        Evaluates stale features given `{source: (value, version)}` and returns the value
+        of every feature whose inputs are available. The returned dict is reused by the
+        next call.
+        """
+        inputs = self._inputs
+        versions = self._versions
+        values = self.values
+        inputs.clear()
+        versions.clear()
+        values.clear()
+        for name, (value, version) in sources.items():
+            if value is not None:
+                inputs[name] = value
+                versions[name] = version
+
+        for feature in self.order():
+            if any(dependency not in inputs for dependency in feature.inputs):
+                continue
+
+            input_versions = tuple(versions[dependency] for dependency in feature.inputs)
+            if input_versions != feature.input_versions:
+                start_ns = time.perf_counter_ns()
+                feature.value = feature.fn(*(inputs[dependency] for dependency in feature.inputs))
+                feature.total_ns += time.perf_counter_ns() - start_ns
+                feature.calls += 1
+                feature.version += 1
+                feature.input_versions = input_versions
+            else:
+                feature.skips += 1
+
+            inputs[feature.name] = feature.value
+            versions[feature.name] = feature.version
+            values[feature.name] = feature.value
+
+        return values
+
+    def timings(self) -> Dict[str, Dict[str, float]]:
+        """Evaluations, memo hits and mean evaluation time per feature"""
+        return {
+            feature.name: {
+                "calls": feature.calls,
+                "skips": feature.skips,
+                "mean_us": feature.total_ns / feature.calls / 1e3 if feature.calls else 0.0,
+            }
+            for feature in self.order()
+        }
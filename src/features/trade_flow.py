@@ -0,0 +1,98 @@
+import math
+from typing import List
+
+
+class TradeFlow:
+    """
+    Streaming trade-flow features, updated once per trade in O(1).
+
+    Maintains:
+
+    - Exponentially decayed buy and sell volume, in log(1 + size) like `trades_imbalance`.
+      Every trade decays both sides by `decay` before its own volume is added, so the
+      most recent trade has weight 1, the one before it `decay`, and so on. This is the
+      same weighting `trades_imbalance` applies over its window, extended past it by
+      weights below `decay ** window` (~3e-13 for the defaults).
+
+    - The sum of absolute price changes over the last `lookback` trades, equal to
+      `trades_diffs(trades, lookback)`. Changes leaving the window are subtracted from
+      a running sum, which is recomputed from the window once per `lookback - 1` trades
+      so floating point error cannot accumulate.
+
+    - Trade counts, total and exponentially decayed per side.
+
+    Parameters
+    ----------
+    decay : float
+        Per-trade decay of the volume and count sums, the `r` of `geometric_weights`.
+
+    lookback : int
+        Number of recent trades in the absolute price change sum.
+    """
+    __slots__ = (
+        "decay", "lookback", "count", "buy_volume", "sell_volume", "buy_count", "sell_count",
+        "last_price", "_diffs", "_diff_pos", "_num_diffs", "_abs_diff_sum",
+    )
+
+    def __init__(self, decay: float = 0.75, lookback: int = 100):
+        assert 0.0 < decay < 1.0, "Decay must be strictly between 0 and 1."
+        assert lookback > 1, "Lookback must be at least 2 trades."
+        self.decay = decay
+        self.lookback = lookback
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.buy_volume = 0.0
+        self.sell_volume = 0.0
+        self.buy_count = 0.0
+        self.sell_count = 0.0
+        self.last_price = 0.0
+        self._diffs: List[float] = [0.0] * (self.lookback - 1)
+        self._diff_pos = 0
+        self._num_diffs = 0
+        self._abs_diff_sum = 0.0
+
+    def update(self, side: float, price: float, size: float) -> None:
+        """Add a trade, `side` > 0 for buys"""
+        decay = self.decay
+        qty = math.log1p(size)
+        if side > 0.0:
+            self.buy_volume = self.buy_volume * decay + qty
+            self.sell_volume *= decay
+            self.buy_count = self.buy_count * decay + 1.0
+            self.sell_count *= decay
+        else:
+            self.sell_volume = self.sell_volume * decay + qty
+            self.buy_volume *= decay
+            self.sell_count = self.sell_count * decay + 1.0
+            self.buy_count *= decay
+
+        if self.count:
+            diff = abs(price - self.last_price)
+            diffs = self._diffs
+            pos = self._diff_pos
+            if self._num_diffs == len(diffs):
+                self._abs_diff_sum -= diffs[pos]
+            else:
+                self._num_diffs += 1
+            diffs[pos] = diff
+            self._abs_diff_sum += diff
+
+            pos += 1
+            if pos == len(diffs):
+                pos = 0
+                self._abs_diff_sum = math.fsum(diffs)
+            self._diff_pos = pos
+
+        self.last_price = price
+        self.count += 1
+
+    def imbalance(self) -> float:
+        """Decayed buy/sell volume imbalance, from -1 (all sells) to 1 (all buys)"""
+        total = self.buy_volume + self.sell_volume
+        return (self.buy_volume - self.sell_volume) / total if total > 0.0 else 0.0
+
+    def abs_price_change(self) -> float:
+        """Sum of absolute price changes over the last `lookback` trades"""
+        return self._abs_diff_sum
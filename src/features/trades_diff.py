@@ -4,7 +4,7 @@ from numba.types import Array
 from utils.utils import nbdiff_1d
 
 
-@njit(["float64(float64[:, :], int64)"], error_model="numpy", fastmath=True)
+@njit(["float64(float64[:, :], int64)"], error_model="numpy", fastmath=True, cache=True)
 def trades_diffs(trades: Array, lookback: int = 100) -> float:
     """
     Computes the sum of the absolute differences of trade prices over a specified lookback period.
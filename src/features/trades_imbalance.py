@@ -6,7 +6,7 @@ from utils.utils import geometric_weights
 
 
 
-@njit(["float64(float64[:, :], int64)"], error_model="numpy", fastmath=True)
+@njit(["float64(float64[:, :], int64)"], error_model="numpy", fastmath=True, cache=True)
 def trades_imbalance(trades: Array, window: int) -> float:
     """
     Calculates the normalized imbalance between buy and sell trades within a specified window,
@@ -19,7 +19,7 @@ def trades_imbalance(trades: Array, window: int) -> float:
 
     2. Generate geometric weights for the effective window size, with recent trades given higher significance.
 
-    3. Iterate through the trades within the window, applying the weights to the log of (1 + trade quantity)
+    3. Iterate through the trades within the window, newest first, applying the weights to the log of (1 + trade quantity)
        to calculate weighted trade quantities. Separate cumulative totals are maintained for buys and sells based
        on the trade side.
 
@@ -41,18 +41,24 @@ def trades_imbalance(trades: Array, window: int) -> float:
 
 
     """
-    max_window = min(window, trades.shape[0])
+    num_trades = trades.shape[0]
+    max_window = min(window, num_trades)
+    if max_window < 2:
+        return 0.0
+
     weights = geometric_weights(max_window)
     delta_buys = 0.0
     delta_sells = 0.0
 
     for i in range(max_window):
-        trade_side = trades[i, 1]
-        weighted_qty = np.log(1.0 + trades[i, 3]) * weights[i]
+        idx = num_trades - 1 - i
+        trade_side = trades[idx, 1]
+        weighted_qty = np.log(1.0 + trades[idx, 3]) * weights[i]
 
-        if trade_side == 0.0:
+        if trade_side > 0.0:
             delta_buys += weighted_qty
         else:
             delta_sells += weighted_qty
 
-    return (delta_buys - delta_sells) / (delta_buys + delta_sells)
+    total = delta_buys + delta_sells
+    return (delta_buys - delta_sells) / total if total > 0.0 else 0.0
@@ -0,0 +1,122 @@
+import math
+import numpy as np
+from typing import Any, Dict, Optional
+
+
+# Scalar features in the fixed layout of `FeatureVector` and `FeatureHistory`
+FEATURE_FIELDS = (
+    "timestamp",
+    "spot_mid",
+    "microprice",
+    "l1_imbalance",
+    "book_imbalance",
+    "depth_weighted_mid",
+    "trade_imbalance",
+    "volatility",
+    "vol_parkinson",
+    "vol_garman_klass",
+    "vol_close_to_close",
+    "dex_price",
+    "basis",
+    "adjusted_mid",
+    "skew",
+)
+FEATURE_DTYPE = np.dtype([(name, np.float64) for name in FEATURE_FIELDS])
+
+
+class FeatureVector:
+    """
+    Features computed at `timestamp`, in a fixed layout.
+
+    Scalars missing from a computation (e.g. the candle volatilities before any candle
+    arrived) are NaN. `book_depth` and `trade_horizons` hold the vector features, and
+    `extra` any registered feature outside the fixed layout.
+    """
+    __slots__ = FEATURE_FIELDS + ("book_depth", "trade_horizons", "extra")
+
+    def __init__(self):
+        for name in FEATURE_FIELDS:
+            setattr(self, name, math.nan)
+        self.book_depth: Optional[np.ndarray] = None
+        self.trade_horizons: Optional[np.ndarray] = None
+        self.extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_values(cls, values: Dict[str, Any], timestamp: float) -> "FeatureVector":
+        """Build from `FeatureRegistry.compute` output"""
+        vector = cls()
+        for name, value in values.items():
+            if name in _VECTOR_SLOTS:
+                setattr(vector, name, value)
+            else:
+                if vector.extra is None:
+                    vector.extra = {}
+                vector.extra[name] = value
+        vector.timestamp = timestamp
+        return vector
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """The feature called `name`, or `default` if it is unknown or was not computed"""
+        value = getattr(self, name, None) if name in _VECTOR_SLOTS else (self.extra or {}).get(name)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return default
+        return value
+
+    def to_row(self) -> tuple:
+        """The scalar features, in the layout of FEATURE_DTYPE"""
+        return tuple(getattr(self, name) for name in FEATURE_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {name: getattr(self, name) for name in FEATURE_FIELDS}
+        if self.book_depth is not None:
+            out["book_depth"] = self.book_depth
+        if self.trade_horizons is not None:
+            out["trade_horizons"] = self.trade_horizons
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def __repr__(self):
+        return f"FeatureVector({', '.join(f'{name}={getattr(self, name):.6g}' for name in FEATURE_FIELDS)})"
+
+
+_VECTOR_SLOTS = frozenset(FeatureVector.__slots__) - {"extra"}
+
+
+class FeatureHistory:
+    """
+    The scalar features of the last `capacity` vectors, in a preallocated ring of
+    FEATURE_DTYPE records. Reads return copies, oldest first.
+    """
+
+    def __init__(self, capacity: int = 3600):
+        assert capacity > 0, "Capacity must be positive."
+        self.capacity = capacity
+        self._rows = np.full(capacity, np.nan, dtype=FEATURE_DTYPE)
+        self._pos = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, vector: FeatureVector) -> None:
+        self._rows[self._pos] = vector.to_row()
+        self._pos = (self._pos + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def latest(self, n: Optional[int] = None) -> np.ndarray:
+        """The last `n` records (all by default), oldest first"""
+        n = self._count if n is None else min(n, self._count)
+        start = self._pos - n
+        if start >= 0:
+            return self._rows[start:self._pos].copy()
+        return np.concatenate((self._rows[start:], self._rows[:self._pos]))
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        """The last `n` values of one feature, oldest first"""
+        return self.latest(n)[name]
+
+    def reset(self) -> None:
+        self._rows.fill(np.nan)
+        self._pos = 0
+        self._count = 0
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+
+def topic(symbol: str, name: str) -> str:
+    """Per-symbol topic name, e.g. `btcusdt.book`"""
+    return f"{symbol.lower()}.{name}"
+
+
+class EventBus:
+    """
+    In-process change notifications between the market data feeds, feature
+    computation and quoting.
+
+    Publishers bump a per-topic version counter; subscribers wait until any of
+    their topics has a version they have not seen yet. Notifications carry no
+    payload, consumers read the latest state from its owner, so any number of
+    publishes between two waits coalesce into a single wake-up.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._waiters: Dict[str, List[asyncio.Future]] = defaultdict(list)
+
+    def publish(self, topic: str) -> int:
+        """Mark `topic` as changed and wake its subscribers"""
+        self._versions[topic] += 1
+        waiters = self._waiters.pop(topic, None)
+        if waiters:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(topic)
+        return self._versions[topic]
+
+    def version(self, topic: str) -> int:
+        """Get the current version of a topic"""
+        return self._versions[topic]
+
+    def subscribe(self, topics: Iterable[str], min_interval: float = 0.0) -> "Subscription":
+        """Create a subscription to one or more topics"""
+        return Subscription(self, tuple(topics), min_interval)
+
+
+class Subscription:
+    """
+    A consumer's view of one or more `EventBus` topics.
+
+    `wait` returns as soon as any topic changes, but never sooner than
+    `min_interval` seconds after the previous return; updates published in the
+    meantime are coalesced into the next wake-up.
+    """
+
+    def __init__(self, bus: EventBus, topics: tuple, min_interval: float = 0.0):
+        self.bus = bus
+        self.topics = topics
+        self.min_interval = min_interval
+        self.seen: Dict[str, int] = {topic: bus.version(topic) for topic in topics}
+        self._last_wakeup = 0.0
+
+    def changed(self) -> Dict[str, int]:
+        """Get the topics whose version changed since the last wake-up"""
+        return {
+            topic: self.bus.version(topic)
+            for topic in self.topics
+            if self.bus.version(topic) != self.seen[topic]
+        }
+
+    async def wait(self) -> Dict[str, int]:
+        """Wait until at least one topic has changed and return their new versions"""
+        if self.min_interval > 0:
+            remaining = self._last_wakeup + self.min_interval - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+
+        changed = self.changed()
+        while not changed:
+            waiter = asyncio.get_running_loop().create_future()
+            for topic in self.topics:
+                self.bus._waiters[topic].append(waiter)
+            try:
+                await waiter
+            finally:
+                for topic in self.topics:
+                    waiters = self.bus._waiters.get(topic)
+                    if waiters and waiter in waiters:
+                        waiters.remove(waiter)
+            changed = self.changed()
+
+        self.seen.update(changed)
+        self._last_wakeup = time.monotonic()
+        return changed
@@ -1,10 +1,17 @@
 import asyncio
+import time
 from typing import Any, Optional, Dict
 import logging
+import numpy as np
 
 from exchanges.binance.feed import BinanceWebsocket
 from exchanges.rfx.handlers.public import DexDataHandler, DexMarketData
 from features.features import FeatureCalculator
+from features.vector import FeatureVector
+from features.multi_horizon import TradeHorizons
+from feed.events import topic
+from feed.recorder import MarketDataRecorder, RECORD_DEX_FUNDING, RECORD_DEX_PRICES
+from utils.latency import latency
 from pyrfx.get.funding_apr import FundingAPR
 from pyrfx.get.oracle_prices import OraclePrices
 
@@ -20,19 +27,40 @@ class PublicFeed:
                  config: Any,
                  token_address: str,
                  market_symbol: str,
-                 feature_compute_delay: float = 0.5): 
+                 feature_compute_delay: float = 0.5,
+                 binance_ws: Optional[BinanceWebsocket] = None,
+                 recorder: Optional[MarketDataRecorder] = None,
+                 trade_horizons: Optional[TradeHorizons] = None,
+                 feature_history_length: int = 3600,
+                 trades_length: int = 1000,
+                 orderbook_size: int = 1000): 
         
-        self.binance_ws = BinanceWebsocket(symbol=symbol)
+        # A shared BinanceWebsocket serving several markets is started and stopped by its owner
+        self._owns_binance_ws = binance_ws is None
+        if trade_horizons is not None:
+            # Buffer enough trades for the longest trade-count horizon
+            trades_length = max(trades_length, trade_horizons.max_trades)
+        self.binance_ws = binance_ws if binance_ws is not None else BinanceWebsocket(
+            symbols=symbol, recorder=recorder, trades_length=trades_length, orderbook_size=orderbook_size
+        )
+        self.recorder = recorder
+        self.events = self.binance_ws.events
         self.dex_handler = DexDataHandler(
             symbol=symbol,
             token_address=token_address,
             market_symbol=market_symbol
         )
         
-        self.feature_calculator = FeatureCalculator(compute_interval=0.1)
+        # Throttling is done by the feature subscription's min interval
+        self.feature_calculator = FeatureCalculator(
+            compute_interval=0.0,
+            trade_horizons=trade_horizons,
+            history_length=feature_history_length
+        )
         
         self.config = config
-        self.symbol = symbol
+        self.symbol = symbol.lower()
+        self.topics = {name: topic(self.symbol, name) for name in ("book", "bba", "trades", "dex", "features")}
         self.is_running = False
         self.feature_compute_delay = feature_compute_delay
         
@@ -52,7 +80,7 @@ class PublicFeed:
         
         try:
             await asyncio.gather(
-                self.binance_ws.start(),
+                *([self.binance_ws.start()] if self._owns_binance_ws else []),
                 self._poll_dex_data(),
                 self._coordinate_data(),
                 self._compute_features()
@@ -64,42 +92,57 @@ class PublicFeed:
             raise
 
     async def _compute_features(self):
-        """Compute features with delay to ensure data synchronization"""
+        """Compute features whenever book, top of book, trades or DEX data change, at most once per feature_compute_delay"""
+        updates = self.events.subscribe(
+            (self.topics["book"], self.topics["bba"], self.topics["trades"], self.topics["dex"]),
+            min_interval=self.feature_compute_delay
+        )
         while self.is_running:
             try:
-                await asyncio.sleep(self.feature_compute_delay)
+                await updates.wait()
                 
                 orderbook = self.get_orderbook()
                 trades = self.get_trades()
                 dex_data = self.get_dex_data()
                 
                 if all([orderbook, trades, dex_data]):
+                    start_ns = time.monotonic_ns()
                     features = self.feature_calculator.compute_features(
                         orderbook_handler=orderbook,
                         trade_handler=trades,
-                        dex_data=dex_data
+                        dex_data=dex_data,
+                        ohlcv_handler=self.get_candles(),
+                        bba_handler=self.get_bba()
                     )
                     
                     if features:
+                        end_ns = time.monotonic_ns()
+                        latency.record("features", start_ns, end_ns)
+                        frame_ns = self.binance_ws.last_frame_ns.get(self.symbol)
+                        if frame_ns:
+                            latency.record("frame_to_features", frame_ns, end_ns)
                         self.latest_data['features'] = features
+                        self.events.publish(self.topics["features"])
                         
                         logger.debug(f"""
                             Features Computed:
-                            Adjusted Mid: {features['adjusted_mid']:.2f}
-                            Basis: {features['basis']:.6f}
-                            Skew: {features['skew']:.6f}
+                            Adjusted Mid: {features.adjusted_mid:.2f}
+                            Basis: {features.basis:.6f}
+                            Skew: {features.skew:.6f}
                         """)
                 
-                await asyncio.sleep(0.1) 
-                
             except Exception as e:
                 logger.error(f"Error computing features: {e}")
                 await asyncio.sleep(1)
 
-    def get_latest_features(self) -> Optional[Dict]:
+    def get_latest_features(self) -> Optional[FeatureVector]:
         """Get latest computed features"""
         return self.latest_data.get('features')
 
+    def get_feature_history(self, n: Optional[int] = None) -> np.ndarray:
+        """Get the scalar features of the last `n` computations, oldest first"""
+        return self.feature_calculator.history.latest(n)
+
 
 
     async def _poll_dex_data(self):
@@ -118,6 +161,11 @@ class PublicFeed:
                     prices_task
                 )
                 
+                if self.recorder is not None:
+                    recv_ns = time.time_ns()
+                    self.recorder.record(RECORD_DEX_FUNDING, funding_data, recv_ns)
+                    self.recorder.record(RECORD_DEX_PRICES, prices_data, recv_ns)
+                
                 dex_data = self.dex_handler.process_data(
                     funding_data=funding_data,
                     price_data=prices_data
@@ -126,6 +174,7 @@ class PublicFeed:
                 if dex_data:
                     self.latest_data['dex'] = dex_data
                     self.latest_data['timestamp'] = dex_data.timestamp
+                    self.events.publish(self.topics["dex"])
                 
             except Exception as e:
                 logger.error(f"Error polling DEX data: {e}")
@@ -133,14 +182,22 @@ class PublicFeed:
             await asyncio.sleep(1)  
 
     async def _coordinate_data(self):
-        """Coordinate and update latest data from both sources"""
+        """
+        Track the Binance handlers' version counters, marking Binance data available once
+        any has arrived. Nothing is copied: consumers read the handlers, or take snapshots.
+        """
+        updates = self.events.subscribe((self.topics["book"], self.topics["trades"]), min_interval=0.1)
+        handlers = self.binance_ws.handlers[self.symbol]
         while self.is_running:
             try:
-                binance_data = self.binance_ws.get_latest_data()
-                if binance_data:
-                    self.latest_data['binance'] = binance_data
-                    
-                await asyncio.sleep(0.1) 
+                await updates.wait()
+                versions = {
+                    "orderbook": handlers["depthUpdate"].version,
+                    "trades": handlers["trade"].version,
+                    "ohlcv": handlers["kline"].version,
+                }
+                if any(versions.values()):
+                    self.latest_data['binance'] = versions
                 
             except Exception as e:
                 logger.error(f"Error coordinating data: {e}")
@@ -150,13 +207,29 @@ class PublicFeed:
         """Get latest orderbook"""
         if not self.latest_data['binance']:
             return None
-        return self.binance_ws.public_handler_map["depthUpdate"]
+        orderbook = self.binance_ws.handlers[self.symbol]["depthUpdate"]
+        if not orderbook.synced:
+            return None
+        return orderbook
 
     def get_trades(self) -> Optional[Dict]:
         """Get latest trades"""
         if not self.latest_data['binance']:
             return None
-        return self.binance_ws.public_handler_map["trade"]
+        return self.binance_ws.handlers[self.symbol]["trade"]
+
+    def get_candles(self):
+        """Get latest candles"""
+        if not self.latest_data['binance']:
+            return None
+        return self.binance_ws.handlers[self.symbol]["kline"]
+
+    def get_bba(self):
+        """Get latest top of book from the bookTicker stream"""
+        bba = self.binance_ws.handlers[self.symbol]["bookTicker"]
+        if not bba.valid:
+            return None
+        return bba
 
     def get_dex_data(self) -> Optional[DexMarketData]:
         """Get latest DEX data"""
@@ -165,3 +238,5 @@ class PublicFeed:
     async def stop(self):
         """Stop all data feeds"""
         self.is_running = False
+        if self._owns_binance_ws:
+            await self.binance_ws.stop()
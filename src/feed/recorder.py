@@ -0,0 +1,212 @@
+import asyncio
+import glob
+import mmap
+import os
+import struct
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+
+logger = logging.getLogger(__name__)
+
+
+# Record kinds
+RECORD_WS_FRAME = 1         # Raw Binance websocket frame, as received
+RECORD_DEPTH_SNAPSHOT = 2   # {"symbol": ..., "data": <REST /api/v3/depth response>}
+RECORD_DEX_FUNDING = 3      # pyrfx FundingAPR.get_data() output
+RECORD_DEX_PRICES = 4       # pyrfx OraclePrices.get_recent_prices() output
+
+# Every record is a fixed header followed by `length` payload bytes:
+# payload length (uint32), kind (uint8), local receive time in ns since epoch (int64)
+RECORD_HEADER = struct.Struct("<IBq")
+
+INDEX_DTYPE = np.dtype([
+    ("offset", np.int64),
+    ("length", np.uint32),
+    ("kind", np.uint8),
+    ("recv_ns", np.int64),
+])
+
+_NS_PER_DAY = 86_400 * 1_000_000_000
+
+
+def _day_of(recv_ns: int) -> str:
+    return datetime.fromtimestamp(recv_ns / 1e9, tz=timezone.utc).strftime("%Y%m%d")
+
+
+class MarketDataRecorder:
+    """
+    Append-only recorder for raw market data.
+
+    `record` only appends a reference to an in-memory batch, so it is safe to call from
+    the websocket read loop. A background task (`run`) periodically hands the batch to a
+    worker thread which serializes non-bytes payloads and appends length-prefixed records
+    to the current file. Files are rotated per UTC day and when they exceed `max_file_bytes`,
+    and are named `<prefix>-<YYYYMMDD>-<NNN>.bin`.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 prefix: str = "marketdata",
+                 flush_interval: float = 1.0,
+                 max_file_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+
+        self._pending: List[Tuple[int, int, Any]] = []
+        self._file = None
+        self._file_day: Optional[int] = None
+        self._file_index = 0
+        self._file_bytes = 0
+        self.is_running = False
+
+    def record(self, kind: int, payload: Any, recv_ns: Optional[int] = None) -> None:
+        """Queue a record; `payload` is bytes, str or any orjson-serializable object"""
+        self._pending.append((kind, recv_ns if recv_ns is not None else time.time_ns(), payload))
+
+    async def run(self) -> None:
+        """Flush queued records every `flush_interval` seconds"""
+        self.is_running = True
+        try:
+            while self.is_running:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.close()
+
+    async def flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if batch:
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"Error writing market data records: {e}")
+
+    async def close(self) -> None:
+        self.is_running = False
+        await self.flush()
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+    def _open_file(self, recv_ns: int) -> None:
+        if self._file is not None:
+            self._file.close()
+
+        os.makedirs(self.directory, exist_ok=True)
+        day = recv_ns // _NS_PER_DAY
+        if day != self._file_day:
+            # Continue after any files already written today, e.g. before a restart
+            self._file_index = len(day_files(self.directory, _day_of(recv_ns), self.prefix))
+        path = os.path.join(self.directory, f"{self.prefix}-{_day_of(recv_ns)}-{self._file_index:03d}.bin")
+
+        self._file = open(path, "ab")
+        self._file_day = day
+        self._file_index += 1
+        self._file_bytes = 0
+        logger.info(f"Recording market data to {path}")
+
+    def _write_batch(self, batch: List[Tuple[int, int, Any]]) -> None:
+        buffer = bytearray()
+        for kind, recv_ns, payload in batch:
+            if (self._file is None
+                    or recv_ns // _NS_PER_DAY != self._file_day
+                    or self._file_bytes + len(buffer) >= self.max_file_bytes):
+                if buffer:
+                    self._file.write(buffer)
+                    self._file_bytes += len(buffer)
+                    buffer = bytearray()
+                self._open_file(recv_ns)
+
+            if isinstance(payload, str):
+                payload = payload.encode("utf-8")
+            elif not isinstance(payload, (bytes, bytearray, memoryview)):
+                payload = orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+            buffer += RECORD_HEADER.pack(len(payload), kind, recv_ns)
+            buffer += payload
+
+        if buffer:
+            self._file.write(buffer)
+            self._file_bytes += len(buffer)
+        self._file.flush()
+
+
+class RecordReader:
+    """
+    Memory-mapped reader for files written by `MarketDataRecorder`.
+
+    Iterating yields `(kind, recv_ns, payload)` tuples, where `payload` is a zero-copy
+    memoryview into the mapped file that stays valid until the reader is closed.
+    `index()` returns the offsets, lengths, kinds and timestamps of every record as a
+    structured array for vectorised filtering.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        size = os.fstat(self._fh.fileno()).st_size
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mm) if self._mm is not None else memoryview(b"")
+
+    def __enter__(self) -> "RecordReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._view.release()
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # Payload views handed out by `__iter__` are still alive; the map is
+                # released once they are garbage collected
+                pass
+        self._fh.close()
+
+    def __iter__(self) -> Iterator[Tuple[int, int, memoryview]]:
+        view = self._view
+        size = len(view)
+        offset = 0
+        header_size = RECORD_HEADER.size
+        unpack_from = RECORD_HEADER.unpack_from
+        while offset + header_size <= size:
+            length, kind, recv_ns = unpack_from(view, offset)
+            start = offset + header_size
+            if start + length > size:
+                logger.warning(f"Truncated record at offset {offset} in {self.path}")
+                return
+            yield kind, recv_ns, view[start:start + length]
+            offset = start + length
+
+    def index(self) -> np.ndarray:
+        rows = []
+        offset = 0
+        for kind, recv_ns, payload in self:
+            rows.append((offset + RECORD_HEADER.size, len(payload), kind, recv_ns))
+            offset += RECORD_HEADER.size + len(payload)
+        return np.array(rows, dtype=INDEX_DTYPE)
+
+    def payload(self, offset: int, length: int) -> memoryview:
+        return self._view[offset:offset + length]
+
+
+def day_files(directory: str, day: str, prefix: str = "marketdata") -> List[str]:
+    """Files recorded on a UTC day (`YYYYMMDD`), in write order"""
+    return sorted(glob.glob(os.path.join(directory, f"{prefix}-{day}-*.bin")))
+
+
+def iter_day(directory: str, day: str, prefix: str = "marketdata") -> Iterator[Tuple[int, int, memoryview]]:
+    """Iterate every record of a UTC day across its rotated files"""
+    for path in day_files(directory, day, prefix):
+        with RecordReader(path) as reader:
+            yield from reader
@@ -0,0 +1,263 @@
+import argparse
+import time
+import logging
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import orjson
+import yaml
+
+from exchanges.binance.ws.decoders import BinanceStreamDecoder
+from exchanges.binance.ws.handlers.orderbook import BinanceOrderbookHandler
+from exchanges.binance.ws.handlers.trades import BinanceTradesHandler
+from exchanges.binance.ws.handlers.kline import BinanceOhlcvHandler
+from exchanges.binance.ws.handlers.bba import BinanceBbaHandler
+from exchanges.rfx.handlers.public import DexDataHandler
+from exchanges.rfx.inventory import DexInventoryManager
+from features.features import FeatureCalculator
+from features.vector import FeatureVector
+from features.multi_horizon import TradeHorizons
+from feed.recorder import (
+    RECORD_WS_FRAME, RECORD_DEPTH_SNAPSHOT, RECORD_DEX_FUNDING, RECORD_DEX_PRICES, iter_day
+)
+from oms.quote import QuoteGenerator, QuoteLadder
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayClock:
+    """Simulated wall clock, set to each record's receive time as it is replayed"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StaticPositionHandler:
+    """Stands in for `PositionHandler` during a replay, reporting a fixed position"""
+
+    def __init__(self, long_size: float = 0.0, short_size: float = 0.0):
+        self.long_size = long_size
+        self.short_size = short_size
+
+    def get_positions(self) -> Dict:
+        return {
+            'long': {'size': self.long_size, 'entry_price': 0.0, 'mark_price': 0.0, 'pnl_percent': 0.0},
+            'short': {'size': self.short_size, 'entry_price': 0.0, 'mark_price': 0.0, 'pnl_percent': 0.0},
+            'net_position': self.long_size - self.short_size,
+            'last_update': 0.0
+        }
+
+
+class ReplayStep:
+    """Features computed at `recv_ns` and the quotes generated from them"""
+    __slots__ = ("recv_ns", "features", "quotes")
+
+    def __init__(self, recv_ns: int, features: FeatureVector, quotes: QuoteLadder):
+        self.recv_ns = recv_ns
+        self.features = features
+        self.quotes = quotes
+
+    def to_dict(self) -> Dict:
+        return {"recv_ns": self.recv_ns, "features": self.features.to_dict(), "quotes": self.quotes.to_quotes()}
+
+
+class MarketReplay:
+    """
+    Replays recorded market data through the live feature and quoting stack.
+
+    Records from `feed.recorder` are applied in order to the same decoder, Binance
+    handlers, `DexDataHandler`, `FeatureCalculator` and `QuoteGenerator` the bot runs,
+    with no sockets or sleeps. Every component reads time from a `ReplayClock` that
+    is advanced to each record's receive time, so `compute_interval` throttling and
+    feature timestamps behave as they did live and a replay is deterministic.
+
+    Features are computed after each book, trade or DEX update, as `PublicFeed` does;
+    `run` yields a `ReplayStep` for every computation that produced features.
+    """
+
+    def __init__(self,
+                 symbol: str,
+                 token_address: str,
+                 market_symbol: str,
+                 compute_interval: float = 0.1,
+                 num_levels: int = 10,
+                 total_quote_size: float = 1000.0,
+                 min_spread: float = 0.001,
+                 vol_impact: float = 2.0,
+                 volatility_feature: str = "volatility",
+                 max_position: float = 50.0,
+                 max_imbalance: float = 10.0,
+                 position_handler: Optional[Any] = None,
+                 trade_horizons: Optional[TradeHorizons] = None,
+                 orderbook_size: int = 1000,
+                 trades_length: int = 1000):
+        self.symbol = symbol.lower()
+        self.clock = ReplayClock()
+        self.decoder = BinanceStreamDecoder()
+        if trade_horizons is not None:
+            trades_length = max(trades_length, trade_horizons.max_trades)
+        self.handlers = {
+            "depthUpdate": BinanceOrderbookHandler(size=orderbook_size),
+            "trade": BinanceTradesHandler(length=trades_length),
+            "kline": BinanceOhlcvHandler(length=1000),
+            "bookTicker": BinanceBbaHandler(),
+        }
+        self.dex_handler = DexDataHandler(
+            symbol=symbol,
+            token_address=token_address,
+            market_symbol=market_symbol,
+            clock=self.clock
+        )
+        self.feature_calculator = FeatureCalculator(
+            compute_interval=compute_interval,
+            clock=self.clock,
+            trade_horizons=trade_horizons
+        )
+        self.inventory_manager = DexInventoryManager(
+            position_handler=position_handler if position_handler is not None else StaticPositionHandler(),
+            max_position=max_position,
+            max_imbalance=max_imbalance
+        )
+        self.quote_generator = QuoteGenerator(
+            inventory_manager=self.inventory_manager,
+            num_levels=num_levels,
+            total_quote_size=total_quote_size,
+            min_spread=min_spread,
+            vol_impact=vol_impact,
+            volatility_feature=volatility_feature
+        )
+
+        self.dex_data = None
+        self._funding_data = None
+        self.records = 0
+
+    @classmethod
+    def from_parameters(cls, parameters: Dict, **kwargs) -> "MarketReplay":
+        """Build a replay with the same settings as the bot from a loaded `parameters.yaml`"""
+        kwargs.setdefault("orderbook_size", parameters["public_feed"].get("orderbook_size", 1000))
+        kwargs.setdefault("trades_length", parameters.get("features", {}).get("trades_length", 1000))
+        return cls(
+            symbol=parameters["public_feed"]["symbol"],
+            token_address=parameters["public_feed"]["token_address"],
+            market_symbol=parameters["public_feed"]["market_symbol"],
+            compute_interval=parameters["public_feed"]["feature_compute_delay"],
+            num_levels=parameters["quote"]["num_levels"],
+            total_quote_size=parameters["quote"]["total_quote_size"],
+            min_spread=parameters["quote"]["min_spread"],
+            vol_impact=parameters["quote"]["vol_impact"],
+            volatility_feature=parameters["quote"].get("volatility_feature", "volatility"),
+            max_position=parameters["inventory"]["max_position"],
+            max_imbalance=parameters["inventory"]["max_imbalance"],
+            trade_horizons=TradeHorizons.from_config(parameters.get("features", {}).get("trade_horizons", {})),
+            **kwargs
+        )
+
+    def _apply_frame(self, payload) -> bool:
+        msg = self.decoder.decode(payload)
+        if msg is None or msg.symbol.lower() != self.symbol:
+            return False
+        handler = self.handlers.get(msg.event)
+        if handler is None:
+            return False
+        handler.process(msg)
+        return msg.event in ("trade", "bookTicker") or (msg.event == "depthUpdate" and handler.synced)
+
+    def _apply_depth_snapshot(self, payload) -> bool:
+        snapshot = orjson.loads(payload)
+        if snapshot["symbol"].lower() != self.symbol:
+            return False
+        handler = self.handlers["depthUpdate"]
+        handler.refresh(snapshot["data"])
+        return handler.synced
+
+    def _apply_dex(self, kind: int, payload) -> bool:
+        data = orjson.loads(payload)
+        if kind == RECORD_DEX_FUNDING:
+            self._funding_data = data
+            return False
+        if self._funding_data is None:
+            return False
+        dex_data = self.dex_handler.process_data(funding_data=self._funding_data, price_data=data)
+        if dex_data is None:
+            return False
+        self.dex_data = dex_data
+        return True
+
+    def step(self, kind: int, recv_ns: int, payload) -> Optional[ReplayStep]:
+        """Apply one record and compute features and quotes if its data changed them"""
+        self.records += 1
+        self.clock.now = recv_ns / 1e9
+
+        try:
+            if kind == RECORD_WS_FRAME:
+                changed = self._apply_frame(payload)
+            elif kind == RECORD_DEPTH_SNAPSHOT:
+                changed = self._apply_depth_snapshot(payload)
+            elif kind in (RECORD_DEX_FUNDING, RECORD_DEX_PRICES):
+                changed = self._apply_dex(kind, payload)
+            else:
+                return None
+        except Exception as e:
+            logger.error(f"Error replaying record at {recv_ns}: {e}")
+            return None
+
+        orderbook = self.handlers["depthUpdate"]
+        trades = self.handlers["trade"]
+        if not changed or not orderbook.synced or not len(trades) or self.dex_data is None:
+            return None
+
+        features = self.feature_calculator.compute_features(
+            orderbook_handler=orderbook,
+            trade_handler=trades,
+            dex_data=self.dex_data,
+            ohlcv_handler=self.handlers["kline"],
+            bba_handler=self.handlers["bookTicker"]
+        )
+        if not features:
+            return None
+
+        return ReplayStep(recv_ns, features, self.quote_generator.generate_quotes(features))
+
+    def run(self, records: Iterable[Tuple[int, int, Any]]) -> Iterator[ReplayStep]:
+        """Replay `(kind, recv_ns, payload)` records, e.g. from `feed.recorder.iter_day`"""
+        for kind, recv_ns, payload in records:
+            step = self.step(kind, recv_ns, payload)
+            if step is not None:
+                yield step
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a day of recorded market data through features and quoting")
+    parser.add_argument("directory", help="recorder directory")
+    parser.add_argument("day", help="UTC day to replay, YYYYMMDD")
+    parser.add_argument("--parameters", default="parameters.yaml", help="bot parameters file")
+    parser.add_argument("--prefix", default="marketdata", help="recorder file prefix")
+    parser.add_argument("--output", default=None, help="write each step as a JSON line to this file")
+    args = parser.parse_args()
+
+    with open(args.parameters, "r") as file:
+        parameters = yaml.safe_load(file)
+
+    replay = MarketReplay.from_parameters(parameters)
+    output = open(args.output, "wb") if args.output else None
+    steps = 0
+    start = time.perf_counter()
+    try:
+        for step in replay.run(iter_day(args.directory, args.day, args.prefix)):
+            steps += 1
+            if output is not None:
+                output.write(orjson.dumps(step.to_dict(), option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE))
+    finally:
+        if output is not None:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {replay.records} records in {elapsed:.2f}s "
+          f"({replay.records / elapsed if elapsed > 0 else 0.0:,.0f} records/s), {steps} feature/quote steps")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+import time
+
+# Taken before any kernel module is imported, since importing them compiles (or loads
+# from the numba cache) their kernels; used for the time-to-first-quote report
+PROCESS_START = time.monotonic()
+
 import asyncio
 import logging
 from exchanges.rfx.inventory import DexInventoryManager
@@ -5,12 +11,16 @@ from exchanges.rfx.orders.client import OrderClient
 from exchanges.rfx.private import PositionHandler
 from exchanges.rfx.public import DexDataFeed
 from feed.market_data import PublicFeed
+from feed.recorder import MarketDataRecorder
+from features.multi_horizon import TradeHorizons
 from oms.oms import OrderManagementSystem
 from oms.quote import  QuoteGenerator
 import uvloop
 from pyrfx.config_manager import ConfigManager
 from typing import Any
 from utils.env import get_env_vars
+from utils.latency import latency
+from utils.warmup import warmup_kernels
 import yaml
 
 logger = logging.getLogger(__name__)
@@ -34,6 +44,8 @@ async def main():
     try:
         logger.info("Initializing market maker components...")
 
+        warmup_report = warmup_kernels()
+
         position_handler = PositionHandler(
             config=config, 
             symbol=parameters['public_feed']['market_symbol']
@@ -53,18 +65,37 @@ async def main():
             num_levels=parameters["quote"]["num_levels"],
             total_quote_size=parameters["quote"]["total_quote_size"],
             min_spread=parameters["quote"]["min_spread"],
-            vol_impact=parameters["quote"]["vol_impact"]
+            vol_impact=parameters["quote"]["vol_impact"],
+            volatility_feature=parameters["quote"].get("volatility_feature", "volatility")
         )
 
 
         logger.info("Quote generator initialized")
 
+        latency_params = parameters.get("latency", {})
+        latency.enabled = latency_params.get("enabled", True)
+
+        recorder_params = parameters.get("recorder", {})
+        recorder = None
+        if recorder_params.get("enabled", False):
+            recorder = MarketDataRecorder(
+                directory=recorder_params["directory"],
+                flush_interval=recorder_params.get("flush_interval", 1.0),
+                max_file_bytes=int(recorder_params.get("max_file_mb", 512) * 1024 * 1024)
+            )
+            logger.info(f"Market data recorder initialized, writing to {recorder.directory}")
+
         public_feed = PublicFeed(
             symbol=parameters['public_feed']['symbol'],
             config=config,
             token_address=parameters['public_feed']['token_address'],
             market_symbol=parameters['public_feed']['market_symbol'],
-            feature_compute_delay=parameters['public_feed']['feature_compute_delay']
+            feature_compute_delay=parameters['public_feed']['feature_compute_delay'],
+            recorder=recorder,
+            trade_horizons=TradeHorizons.from_config(parameters.get("features", {}).get("trade_horizons", {})),
+            feature_history_length=parameters.get("features", {}).get("history_length", 3600),
+            trades_length=parameters.get("features", {}).get("trades_length", 1000),
+            orderbook_size=parameters['public_feed'].get('orderbook_size', 1000)
         )
         logger.info("Public feed initialized")
 
@@ -73,7 +104,8 @@ async def main():
             market_symbol=parameters["order"]["market_symbol"],
             collateral_token=parameters["order"]["collateral_token"],
             initial_collateral=parameters["order"]["initial_collateral"],
-            debug_mode=parameters["order"]["debug_mode"]
+            debug_mode=parameters["order"]["debug_mode"],
+            max_in_flight=parameters["order"].get("max_in_flight", 4)
         )
         logger.info("Order client initialized")
 
@@ -81,31 +113,46 @@ async def main():
             order_client=order_client,
             max_active_orders=parameters["oms"]["max_active_orders"],
             order_timeout=parameters["oms"]["order_timeout"],
-            slippage_percent=parameters["oms"]["slippage_percent"]
+            slippage_percent=parameters["oms"]["slippage_percent"],
+            price_tolerance=parameters["oms"].get("price_tolerance", 0.001),
+            size_tolerance=parameters["oms"].get("size_tolerance", 0.001),
+            batch_orders=parameters["oms"].get("batch_orders", False)
         )
 
         logger.info("Order management system initialized")
 
         async def monitor_quotes():
             logger.info("Starting quote monitoring...")
+            feature_updates = public_feed.events.subscribe((public_feed.topics["features"],))
+            first_quote = True
             while True:
                 try:
+                    await feature_updates.wait()
                     inventory_manager.update_from_position_handler()
                     
                     features = public_feed.get_latest_features()
                     if features:
                         logger.debug(f"Features received: {features}")
                         
+                        start_ns = time.monotonic_ns()
                         quotes = quote_generator.generate_quotes(features)
+                        latency.record("quotes", start_ns)
                         if quotes:
+                            if first_quote:
+                                first_quote = False
+                                logger.info(
+                                    f"Time to first quote: {(time.monotonic() - PROCESS_START) * 1000:.0f}ms "
+                                    f"({'warm' if warmup_report.warm else 'cold'} numba cache, "
+                                    f"warm-up {warmup_report.seconds * 1000:.0f}ms)"
+                                )
                             await oms.process_quotes(quotes)
                             
                             logger.info(f"""
                                 Market State:
                                 {'-' * 40}
-                                Mid Price: ${features['adjusted_mid']:.2f}
-                                Market Skew: {features['skew']:.4f}
-                                Volatility: {features['volatility']:.4f}
+                                Mid Price: ${features.adjusted_mid:.2f}
+                                Market Skew: {features.skew:.4f}
+                                Volatility: {features.volatility:.4f}
                                 
                                 {oms.get_position_summary()}
                                 
@@ -119,8 +166,6 @@ async def main():
                                 )}
                             """)
                     
-                    await asyncio.sleep(0.1)
-                    
                 except Exception as e:
                     logger.error(f"Error in quote monitoring: {e}")
                     await asyncio.sleep(1)
@@ -132,12 +177,19 @@ async def main():
             await oms.cancel_all_orders()
             logger.info("All orders cancelled")
             
+            order_client.close()
+            logger.info("Order executor stopped")
+            
             await position_handler.stop()
             logger.info("Position handler stopped")
             
             await public_feed.stop()
             logger.info("Public feed stopped")
             
+            if recorder is not None:
+                await recorder.close()
+                logger.info("Market data recorder flushed")
+            
             logger.info("Shutdown complete")
 
         try:
@@ -145,7 +197,9 @@ async def main():
             await asyncio.gather(
                 position_handler.start(),
                 public_feed.start(),
-                monitor_quotes()
+                monitor_quotes(),
+                *([latency.report(latency_params.get("report_interval", 60.0))] if latency.enabled else []),
+                *([recorder.run()] if recorder is not None else [])
             )
         except KeyboardInterrupt:
             logger.info("Keyboard interrupt received")
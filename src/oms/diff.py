@@ -0,0 +1,117 @@
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from oms.quote import Quote
+
+
+class OrderDiff:
+    """
+    What it takes to turn the live orders into a new set of quotes: the positions of
+    orders to cancel, the quotes to place, and the `(position, quote)` pairs whose live
+    order already matches and is left untouched.
+    """
+    __slots__ = ("cancels", "places", "keeps")
+
+    def __init__(self, cancels: List[int], places: List[Quote], keeps: List[Tuple[int, Quote]]):
+        self.cancels = cancels
+        self.places = places
+        self.keeps = keeps
+
+    def __bool__(self) -> bool:
+        return bool(self.cancels or self.places)
+
+    def __repr__(self):
+        return f"OrderDiff(cancels={len(self.cancels)}, places={len(self.places)}, keeps={len(self.keeps)})"
+
+
+class OrderIndex:
+    """
+    Live orders indexed by side and log-price bucket.
+
+    An order matches a quote on the same side whose price and USD size are within
+    `price_tolerance` and `size_tolerance` of the order's, relative to the order. Buckets
+    are `-log(1 - price_tolerance)` wide in log price, at least the log distance between
+    any two matching prices, so every order that can match a quote is in the quote's
+    bucket or one of its two neighbours. Matching a ladder then touches a handful of
+    candidates per quote instead of every live order.
+    """
+
+    def __init__(self, price_tolerance: float = 0.001, size_tolerance: float = 0.001):
+        assert 0.0 < price_tolerance < 1.0, "Price tolerance must be between 0 and 1."
+        self.price_tolerance = price_tolerance
+        self.size_tolerance = size_tolerance
+        self._log_step = -math.log1p(-price_tolerance)
+        # (side, bucket) -> {position: (price, size_usd)}, in insertion order
+        self._buckets: Dict[Tuple[str, int], Dict[int, Tuple[float, float]]] = defaultdict(dict)
+        self._keys: Dict[int, Tuple[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, position: int) -> bool:
+        return position in self._keys
+
+    def _bucket(self, price: float) -> int:
+        return math.floor(math.log(price) / self._log_step) if price > 0.0 else 0
+
+    def add(self, position: int, side: str, price: float, size_usd: float) -> None:
+        self.remove(position)
+        key = (side, self._bucket(price))
+        self._buckets[key][position] = (price, size_usd)
+        self._keys[position] = key
+
+    def remove(self, position: int) -> None:
+        key = self._keys.pop(position, None)
+        if key is None:
+            return
+        bucket = self._buckets[key]
+        del bucket[position]
+        if not bucket:
+            del self._buckets[key]
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._keys.clear()
+
+    def diff(self, quotes: Iterable[Quote]) -> OrderDiff:
+        """
+        Matches each quote, in order, to the closest-priced unclaimed live order within
+        tolerance. Unmatched quotes are placed and unclaimed orders cancelled, so every
+        live order backs at most one quote.
+        """
+        price_tolerance = self.price_tolerance
+        size_tolerance = self.size_tolerance
+        buckets = self._buckets
+        claimed = set()
+        places: List[Quote] = []
+        keeps: List[Tuple[int, Quote]] = []
+
+        for quote in quotes:
+            price = quote.price
+            size_usd = quote.size_usd
+            bucket = self._bucket(price)
+            best = -1
+            best_distance = math.inf
+            for key in ((quote.side, bucket), (quote.side, bucket - 1), (quote.side, bucket + 1)):
+                orders = buckets.get(key)
+                if not orders:
+                    continue
+                for position, (order_price, order_size_usd) in orders.items():
+                    if position in claimed:
+                        continue
+                    distance = abs(order_price - price)
+                    if (distance < best_distance and
+                            distance < price_tolerance * order_price and
+                            abs(order_size_usd - size_usd) < size_tolerance * order_size_usd):
+                        best = position
+                        best_distance = distance
+
+            if best >= 0:
+                claimed.add(best)
+                keeps.append((best, quote))
+            else:
+                places.append(quote)
+
+        cancels = [position for position in self._keys if position not in claimed]
+        return OrderDiff(cancels, places, keeps)
@@ -1,11 +1,13 @@
 from dataclasses import dataclass
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import asyncio
 import logging
 
 from exchanges.rfx.orders.client import OrderClient, OrderRequest, OrderSide
-from oms.quote import Quote
+from oms.quote import Quote, QuoteLadder
+from oms.diff import OrderDiff, OrderIndex
+from utils.latency import latency
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,8 @@ class ActiveOrder:
     side: str
     timestamp: float
     initial_collateral: float
+    order_key: Optional[bytes] = None  # On-chain key from the creation receipt
+    tx_hash: Optional[bytes] = None  # Creating transaction, while its key is looked up
 
 class OrderManagementSystem:
     def __init__(self, 
@@ -27,25 +31,33 @@ class OrderManagementSystem:
                  max_active_orders: int = 20,
                  order_timeout: float = 60.0, 
                  initial_collateral: float = 10.0,  
-                 slippage_percent: float = 0.01):  
+                 slippage_percent: float = 0.01,
+                 price_tolerance: float = 0.001,  # Live orders within 0.1% of a quote's price
+                 size_tolerance: float = 0.001,  # and size are left in place
+                 batch_orders: bool = False):  # Send each diff as one multicall transaction
         
         self.order_client = order_client
         self.max_active_orders = max_active_orders
         self.order_timeout = order_timeout
         self.initial_collateral = initial_collateral
         self.slippage_percent = slippage_percent
+        self.batch_orders = batch_orders
         
         self.active_orders: Dict[int, ActiveOrder] = {}
+        self.order_index = OrderIndex(price_tolerance, size_tolerance)
         self.position_counter: int = 0
+        self._key_lookups: Dict[int, asyncio.Task] = {}  # Position -> pending order key lookup
 
-    async def process_quotes(self, quotes: List[Quote]) -> None:
+    async def process_quotes(self, quotes: Union[QuoteLadder, List[Quote]]) -> None:
         """Process new quotes and update orders"""
         try:
             await self._cancel_stale_orders()
             
-            await self._cancel_mismatched_orders(quotes)
+            start_ns = time.monotonic_ns()
+            diff = self.diff_quotes(quotes)
+            latency.record("oms_diff", start_ns)
             
-            await self._create_new_orders(quotes)
+            await self.apply_diff(diff)
             
         except Exception as e:
             logger.error(f"Error processing quotes: {e}")
@@ -62,102 +74,218 @@ class OrderManagementSystem:
         if positions_to_cancel:
             await self._cancel_orders_by_positions(positions_to_cancel)
 
-    async def _cancel_mismatched_orders(self, new_quotes: List[Quote]) -> None:
-        """Cancel orders that don't match new quotes"""
-        positions_to_cancel = []
-        
-        for position, order in self.active_orders.items():
-            matching_quote = next(
-                (q for q in new_quotes if (
-                    q.side == order.side and
-                    abs(q.price - order.price) / order.price < 0.001 and  # 0.1% price difference
-                    abs(q.size_usd - order.size_usd) / order.size_usd < 0.001  # 0.1% size difference
-                )), 
-                None
-            )
-            
-            if not matching_quote:
-                positions_to_cancel.append(position)
-        
-        if positions_to_cancel:
-            await self._cancel_orders_by_positions(positions_to_cancel)
+    def diff_quotes(self, quotes: Union[QuoteLadder, List[Quote]]) -> OrderDiff:
+        """Cancels, placements and untouched orders needed to move the live orders to `quotes`"""
+        if isinstance(quotes, QuoteLadder):
+            quotes = quotes.to_quotes()
+        return self.order_index.diff(quotes)
+
+    async def apply_diff(self, diff: OrderDiff) -> None:
+        """Cancel and place orders as `diff` says, leaving its kept orders alone"""
+        if self.batch_orders and diff and await self._apply_diff_batched(diff):
+            return
+        if diff.cancels:
+            await self._cancel_orders_by_positions(diff.cancels)
+        if diff.places:
+            await self._create_new_orders(diff.places)
+
+    async def _apply_diff_batched(self, diff: OrderDiff) -> bool:
+        """
+        Cancel and place orders as `diff` says in one multicall transaction. Returns False
+        if the batch could not be sent, e.g. a leg would revert, leaving it unapplied.
+        Orders whose key cannot be recovered yet stay tracked and are cancelled on a later diff.
+        """
+        await self._await_order_keys(diff.cancels)
+        await self._recover_order_keys([pos for pos in diff.cancels if pos in self.active_orders])
+        keyed = [pos for pos in diff.cancels if pos in self.active_orders and self.active_orders[pos].order_key]
+
+        quotes = self._within_order_limit(diff.places, freed=len(keyed))
+        if not keyed and not quotes:
+            return True
+
+        result = await self.order_client.submit_batch(
+            [self._order_request(quote) for quote in quotes],
+            cancel_keys=[self.active_orders[pos].order_key for pos in keyed]
+        )
+        if result is None:
+            logger.warning("Order batch not sent, falling back to individual transactions")
+            return False
+        if result.dry_run:
+            # Debug mode sends nothing: apply the diff locally, with no keys for the new orders
+            logger.info("Order batch not sent in debug mode, applying it locally")
+            self._forget_orders(keyed)
+            for quote in quotes:
+                self._record_order(quote)
+            return True
+        if result.status != 1:
+            logger.error("Order batch reverted")
+            return True
+
+        self._forget_orders([pos for pos, leg in zip(keyed, result.batch.cancels) if leg.ok])
+        for quote, leg in zip(quotes, result.batch.creates):
+            if leg.ok:
+                self._record_order(quote, leg.order_key)
+        return True
+
+    def _within_order_limit(self, quotes: List[Quote], freed: int = 0) -> List[Quote]:
+        """The leading quotes that fit under `max_active_orders` once `freed` orders are cancelled"""
+        available = self.max_active_orders - len(self.active_orders) + freed
+        if len(quotes) > available:
+            logger.warning("Maximum active orders reached")
+            return quotes[:max(available, 0)]
+        return quotes
+
+    def _order_request(self, quote: Union[Quote, ActiveOrder]) -> OrderRequest:
+        return OrderRequest(
+            side=OrderSide(quote.side),
+            price_usd=quote.price,
+            size_usd=quote.size_usd,
+            order_id=quote.order_id,
+            slippage_percent=self.slippage_percent
+        )
 
     async def _create_new_orders(self, quotes: List[Quote]) -> None:
-        """Create new orders from quotes"""
-        for quote in quotes:
-            if len(self.active_orders) >= self.max_active_orders:
-                logger.warning("Maximum active orders reached")
-                break
-            
-            if self._quote_matches_existing(quote):
+        """Create new orders from quotes with no matching live order, submitting them concurrently"""
+        quotes = self._within_order_limit(quotes)
+        if not quotes:
+            return
+
+        order_requests = [self._order_request(quote) for quote in quotes]
+        results = await asyncio.gather(*self.order_client.submit_orders(order_requests), return_exceptions=True)
+
+        for quote, tx_hashes in zip(quotes, results):
+            if isinstance(tx_hashes, Exception):
+                logger.error(f"Error creating order: {tx_hashes}")
                 continue
-            
-            try:
-                order_request = OrderRequest(
-                    side=OrderSide(quote.side),
-                    price_usd=quote.price,
-                    size_usd=quote.size_usd,
-                    order_id=quote.order_id,
-                    slippage_percent=self.slippage_percent
-                )
-                
-                tx_hashes = await self.order_client.submit_order(order_request)
-                
-                if tx_hashes:
-                    self.active_orders[self.position_counter] = ActiveOrder(
-                        order_id=quote.order_id,
-                        position=self.position_counter,
-                        price=quote.price,
-                        size_usd=quote.size_usd,
-                        side=quote.side,
-                        timestamp=time.time(),
-                        initial_collateral=self.initial_collateral
-                    )
-                    self.position_counter += 1
-                    
-                    logger.info(f"""
-                        New Order Created:
-                        Position: {self.position_counter-1}
-                        Side: {quote.side}
-                        Price: ${quote.price:.2f}
-                        Size: ${quote.size_usd:.2f}
-                        Initial Collateral: ${self.initial_collateral:.2f}
-                    """)
-                
-            except Exception as e:
-                logger.error(f"Error creating order: {e}")
+
+            if tx_hashes:
+                position = self._record_order(quote)
+                # Only limit increases rest on the book; market decreases execute and need no key
+                tx_hash = tx_hashes.get("tx_hash")
+                if tx_hash and quote.side.startswith("increase"):
+                    self.active_orders[position].tx_hash = tx_hash
+                    self._key_lookups[position] = asyncio.ensure_future(self._resolve_order_key(position, tx_hash))
+
+    async def _resolve_order_key(self, position: int, tx_hash: bytes) -> None:
+        """Set the on-chain key of the order at `position` once its transaction is mined"""
+        try:
+            order_key = await self.order_client.order_key(tx_hash)
+        except Exception as e:
+            logger.warning(f"Could not look up the order key for position {position}: {e}")
+            return
+        finally:
+            self._key_lookups.pop(position, None)
+
+        order = self.active_orders.get(position)
+        if order is None:
+            return
+        if order_key is None:
+            logger.warning(f"Order at position {position} was not created on chain")
+            self._forget_orders([position])
+            return
+        order.order_key = order_key
+        order.tx_hash = None
+
+    def _record_order(self, quote: Quote, order_key: Optional[bytes] = None) -> int:
+        """Track a newly created order for `quote`, returning its position"""
+        self.order_index.add(self.position_counter, quote.side, quote.price, quote.size_usd)
+        self.active_orders[self.position_counter] = ActiveOrder(
+            order_id=quote.order_id,
+            position=self.position_counter,
+            price=quote.price,
+            size_usd=quote.size_usd,
+            side=quote.side,
+            timestamp=time.time(),
+            initial_collateral=self.initial_collateral,
+            order_key=order_key
+        )
+        self.position_counter += 1
+        
+        logger.info(f"""
+            New Order Created:
+            Position: {self.position_counter-1}
+            Side: {quote.side}
+            Price: ${quote.price:.2f}
+            Size: ${quote.size_usd:.2f}
+            Initial Collateral: ${self.initial_collateral:.2f}
+        """)
+        return self.position_counter - 1
+
+    async def _await_order_keys(self, positions: List[int]) -> None:
+        """Wait for any pending order key lookups of `positions`"""
+        lookups = [self._key_lookups[pos] for pos in positions if pos in self._key_lookups]
+        if lookups:
+            await asyncio.gather(*lookups, return_exceptions=True)
 
     async def _cancel_orders_by_positions(self, positions: List[int]) -> None:
-        """Cancel orders by their positions"""
+        """Cancel orders by their positions, targeting each by its on-chain key"""
         try:
-            num_to_cancel = len(positions)
-            
-            if num_to_cancel > 0:
-                await self.order_client.cancel_orders(num_to_cancel)
-                
-                for pos in positions:
-                    if pos in self.active_orders:
-                        order = self.active_orders[pos]
-                        logger.info(f"""
-                            Order Cancelled:
-                            Position: {pos}
-                            Side: {order.side}
-                            Price: ${order.price:.2f}
-                            Size: ${order.size_usd:.2f}
-                        """)
-                        del self.active_orders[pos]
+            await self._await_order_keys(positions)
+            positions = [pos for pos in positions if pos in self.active_orders]
+            await self._recover_order_keys(positions)
+            keys = {pos: self.active_orders[pos].order_key for pos in positions
+                    if pos in self.active_orders and self.active_orders[pos].order_key}
+
+            if keys:
+                gone = {bytes(key) for key in await self.order_client.cancel_orders_by_keys(list(keys.values()))}
+                self._forget_orders([pos for pos, key in keys.items() if bytes(key) in gone])
                 
         except Exception as e:
             logger.error(f"Error cancelling orders: {e}")
 
-    def _quote_matches_existing(self, quote: Quote) -> bool:
-        """Check if quote matches any existing order"""
-        for order in self.active_orders.values():
-            if (order.side == quote.side and
-                abs(order.price - quote.price) / order.price < 0.001 and
-                abs(order.size_usd - quote.size_usd) / order.size_usd < 0.001):
-                return True
-        return False
+    async def _recover_order_keys(self, positions: List[int]) -> None:
+        """
+        Find keys for orders at `positions` that have none after their receipt lookup.
+
+        Market decreases and orders never sent (debug mode) are not on the book, so they
+        are forgotten. Resting limit increases are looked up in one listing of the account's
+        orders; an order that is not listed is forgotten only if its transaction is known
+        to be mined, otherwise it stays tracked and its receipt lookup is retried.
+        """
+        unkeyed = [pos for pos in positions if not self.active_orders[pos].order_key]
+        resting = [pos for pos in unkeyed
+                   if self.active_orders[pos].side.startswith("increase") and not self.order_client.debug_mode]
+        self._forget_orders([pos for pos in unkeyed if pos not in resting])
+        if not resting:
+            return
+
+        try:
+            order_keys = await self.order_client.recover_order_keys(
+                [self._order_request(self.active_orders[pos]) for pos in resting]
+            )
+        except Exception as e:
+            logger.warning(f"Could not list orders to recover keys for positions {resting}: {e}")
+            return
+
+        for pos, order_key in zip(resting, order_keys):
+            order = self.active_orders.get(pos)
+            if order is None:
+                continue
+            if order_key is not None:
+                order.order_key = order_key
+                order.tx_hash = None
+            elif order.tx_hash is not None:
+                # Possibly not mined yet: keep tracking it until its receipt says otherwise
+                logger.warning(f"Order at position {pos} not listed yet, retrying its key lookup")
+                if pos not in self._key_lookups:
+                    self._key_lookups[pos] = asyncio.ensure_future(self._resolve_order_key(pos, order.tx_hash))
+            else:
+                self._forget_orders([pos])
+
+    def _forget_orders(self, positions: List[int]) -> None:
+        """Stop tracking cancelled orders"""
+        for pos in positions:
+            if pos in self.active_orders:
+                order = self.active_orders[pos]
+                logger.info(f"""
+                    Order Cancelled:
+                    Position: {pos}
+                    Side: {order.side}
+                    Price: ${order.price:.2f}
+                    Size: ${order.size_usd:.2f}
+                """)
+                del self.active_orders[pos]
+                self.order_index.remove(pos)
 
     async def cancel_all_orders(self) -> None:
         """Cancel all active orders"""
@@ -175,6 +303,7 @@ class OrderManagementSystem:
                     """)
                 
                 self.active_orders.clear()
+                self.order_index.clear()
                 
         except Exception as e:
             logger.error(f"Error cancelling all orders: {e}")
@@ -1,10 +1,14 @@
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from exchanges.rfx.inventory import DexInventoryManager
+from features.vector import FeatureVector
 import numpy as np
+from numba import njit
+from numba.types import Array
 import logging
 
-from utils.utils import generate_geometric_weights, geomspace
+from utils.utils import generate_geometric_weights
 
 
 logger = logging.getLogger(__name__)
@@ -20,19 +24,132 @@ class Quote:
     order_id: str
 
 
+# Ladder sides, indexed by `QuoteLadder` side codes
+INCREASE_LONG = 0
+DECREASE_LONG = 1
+INCREASE_SHORT = 2
+DECREASE_SHORT = 3
+SIDES = ('increase_long', 'decrease_long', 'increase_short', 'decrease_short')
+ORDER_ID_PREFIXES = ('long_inc', 'long_dec', 'short_inc', 'short_dec')
+
+LADDER_DTYPE = np.dtype([
+    ('price', np.float64),
+    ('size', np.float64),      # Size in crypto
+    ('size_usd', np.float64),  # Size in USD
+    ('side', np.int8),         # Index into SIDES
+    ('level', np.int16),       # Level within the side, 0 nearest the mid
+])
+
+
+@lru_cache(maxsize=None)
+def _order_id(side: int, level: int) -> str:
+    return f'{ORDER_ID_PREFIXES[side]}_{level:02d}'
+
+
+@lru_cache(maxsize=None)
+def ladder_shape(num_levels: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Level-only terms of a ladder, cached per `num_levels`: the exponents placing the
+    levels geometrically between the first and last price, and the (r=0.5) size weights.
+    """
+    exponents = np.arange(num_levels, dtype=np.float64) / max(num_levels - 1, 1)
+    size_weights = generate_geometric_weights(num_levels, r=0.5)
+    return exponents, size_weights
+
+
+@njit(error_model="numpy", cache=True)
+def fill_ladder_side(ladder: Array, start: int, side: int, first_price: float, last_price: float,
+                     exponents: Array, size_weights: Array, total_size_usd: float, size_crypto: float,
+                     sized_in_usd: bool, long_size: float, short_size: float,
+                     max_position: float, max_imbalance: float) -> int:
+    """
+    Writes one side of a quote ladder into `ladder`, a LADDER_DTYPE array, from row `start`.
+
+    Steps
+    -----
+    1. Price level `i` at `first_price * (last_price / first_price) ** exponents[i]`,
+       i.e. geometrically spaced from `first_price` to `last_price`.
+
+    2. If `sized_in_usd`, size level `i` at `total_size_usd * size_weights[i]` USD and skip
+       it if adding its crypto size to the position alone would breach `max_position`
+       (gross) or `max_imbalance` (net). Otherwise size every level at `size_crypto`.
+
+    3. Round prices and USD sizes to cents and crypto sizes to 6 decimals.
+
+    Returns
+    -------
+    int
+        The row after the last one written.
+    """
+    ratio = last_price / first_price
+    increases_long = side == INCREASE_LONG
+    row = start
+    for i in range(exponents.size):
+        price = first_price * ratio ** exponents[i]
+        if sized_in_usd:
+            size_usd = total_size_usd * size_weights[i]
+            size = size_usd / price
+            new_long = long_size + size if increases_long else long_size
+            new_short = short_size if increases_long else short_size + size
+            if new_long + new_short > max_position or abs(new_long - new_short) > max_imbalance:
+                continue
+        else:
+            size = size_crypto
+            size_usd = size * price
+        ladder[row].price = np.round(price, 2)
+        ladder[row].size = np.round(size, 6)
+        ladder[row].size_usd = np.round(size_usd, 2)
+        ladder[row].side = side
+        ladder[row].level = i
+        row += 1
+    return row
+
+
+class QuoteLadder:
+    """
+    Quotes as rows of a LADDER_DTYPE structured array, in generation order.
+
+    `Quote` objects are only built by `to_quotes`, at the OMS boundary.
+    """
+    __slots__ = ("levels",)
+
+    def __init__(self, levels: np.ndarray):
+        self.levels = levels
+
+    def __len__(self) -> int:
+        return self.levels.shape[0]
+
+    def __iter__(self):
+        return iter(self.to_quotes())
+
+    def to_quotes(self) -> List[Quote]:
+        return [
+            Quote(price=price, size=size, size_usd=size_usd, side=SIDES[side], order_id=_order_id(side, level))
+            for price, size, size_usd, side, level in self.levels.tolist()
+        ]
+
+    def __repr__(self):
+        return f"QuoteLadder({self.to_quotes()})"
+
+
 class QuoteGenerator:
     def __init__(self,
                  inventory_manager: DexInventoryManager,
                  num_levels: int = 10,
                  total_quote_size: float = 1000.0,
                  min_spread: float = 0.001,  # 10 bps minimum spread
-                 vol_impact: float = 2.0):   # Volatility impact multiplier
+                 vol_impact: float = 2.0,    # Volatility impact multiplier
+                 volatility_feature: str = "volatility"):  # Feature scaling the spread, e.g. 'vol_garman_klass' (bps)
         
         self.inventory_manager = inventory_manager
         self.num_levels = num_levels
         self.total_quote_size = total_quote_size
         self.min_spread = min_spread
         self.vol_impact = vol_impact
+        self.volatility_feature = volatility_feature
+        # Up to three sides are quoted per ladder
+        self._ladder = np.zeros(3 * num_levels, dtype=LADDER_DTYPE)
+        self._num_quotes = 0
 
     def _calculate_spread(self, volatility: float) -> float:
         """Calculate spread adjusted for volatility"""
@@ -43,196 +160,125 @@ class QuoteGenerator:
         position_skew = self.inventory_manager.get_position_skew()
         return 0.3 * market_skew + 0.7 * (-position_skew)  # Negative position skew for mean reversion
 
+    def _add_side(self, side: int, first_price: float, last_price: float,
+                  total_size_usd: Optional[float] = None, size_crypto: float = 0.0) -> None:
+        """
+        Appends one side's levels, priced geometrically from `first_price` to `last_price`.
+        Sized either by splitting `total_size_usd` with the size weights, dropping levels
+        the inventory limits do not allow, or with `size_crypto` at every level.
+        """
+        exponents, size_weights = ladder_shape(self.num_levels)
+        position = self.inventory_manager.position
+        self._num_quotes = fill_ladder_side(
+            self._ladder, self._num_quotes, side, first_price, last_price, exponents, size_weights,
+            total_size_usd if total_size_usd is not None else 0.0, size_crypto, total_size_usd is not None,
+            position.long_size, position.short_size,
+            self.inventory_manager.max_position, self.inventory_manager.max_imbalance
+        )
 
-    def _generate_increase_long_quotes(self, mid_price: float, spread: float, larger_size: bool = True) -> List[Quote]:
-        """Generate quotes to increase long position"""
+    def _increase_long_quotes(self, mid_price: float, spread: float, larger_size: bool = True) -> None:
+        """Quotes to increase long position"""
         half_spread = spread / 2
         price_width = spread * 5
-        
-        prices = geomspace(
+        max_size_usd = self.inventory_manager.max_position - self.inventory_manager.get_gross_position()
+        size_multiplier = 1.5 if larger_size else 0.5
+        self._add_side(
+            INCREASE_LONG,
             mid_price * (1 - half_spread),
             mid_price * (1 - half_spread - price_width),
-            self.num_levels
+            total_size_usd=min(self.total_quote_size, max_size_usd) * size_multiplier
         )
-        
-        max_size_usd = self.inventory_manager.max_position - self.inventory_manager.get_gross_position()
-        size_multiplier = 1.5 if larger_size else 0.5
-        base_size_usd = min(self.total_quote_size, max_size_usd)
-        
-        size_weights = generate_geometric_weights(self.num_levels, r=0.5)
-        sizes_usd = base_size_usd * size_multiplier * size_weights
-        
-        quotes = []
-        for i, (price, size_usd) in enumerate(zip(prices, sizes_usd)):
-            size_crypto = size_usd / price 
-            if self.inventory_manager.can_increase_long(size_crypto):
-                quotes.append(Quote(
-                    price=round(float(price), 2),
-                    size=round(float(size_crypto), 6),
-                    size_usd=round(float(size_usd), 2),
-                    side='increase_long',
-                    order_id=f'long_inc_{i:02d}'
-                ))
-        
-        return quotes
 
-    def _generate_increase_short_quotes(self, mid_price: float, spread: float, larger_size: bool = True) -> List[Quote]:
-        """Generate quotes to increase short position"""
+    def _increase_short_quotes(self, mid_price: float, spread: float, larger_size: bool = True) -> None:
+        """Quotes to increase short position"""
         half_spread = spread / 2
         price_width = spread * 5
-        
-        prices = geomspace(
+        max_size_usd = self.inventory_manager.max_position - self.inventory_manager.get_gross_position()
+        size_multiplier = 1.5 if larger_size else 0.5
+        self._add_side(
+            INCREASE_SHORT,
             mid_price * (1 + half_spread),
             mid_price * (1 + half_spread + price_width),
-            self.num_levels
+            total_size_usd=min(self.total_quote_size, max_size_usd) * size_multiplier
         )
-        
-        max_size_usd = self.inventory_manager.max_position - self.inventory_manager.get_gross_position()
-        size_multiplier = 1.5 if larger_size else 0.5
-        base_size_usd = min(self.total_quote_size, max_size_usd)
-        
-        size_weights = generate_geometric_weights(self.num_levels, r=0.5)
-        sizes_usd = base_size_usd * size_multiplier * size_weights
-        
-        quotes = []
-        for i, (price, size_usd) in enumerate(zip(prices, sizes_usd)):
-            size_crypto = size_usd / price  
-            if self.inventory_manager.can_increase_short(size_crypto):
-                quotes.append(Quote(
-                    price=round(float(price), 2),
-                    size=round(float(size_crypto), 6),
-                    size_usd=round(float(size_usd), 2),
-                    side='increase_short',
-                    order_id=f'short_inc_{i:02d}'
-                ))
-        
-        return quotes
 
-    def _generate_decrease_long_quotes(self, mid_price: float, spread: float) -> List[Quote]:
-        """Generate quotes to decrease long position"""
+    def _decrease_long_quotes(self, mid_price: float, spread: float) -> None:
+        """Quotes to decrease long position"""
         current_long = self.inventory_manager.position.long_size
         if current_long <= 0:
-            return []
-            
+            return
         half_spread = spread / 2
         price_width = spread * 3
-        
-        prices = geomspace(
+        self._add_side(
+            DECREASE_LONG,
             mid_price * (1 + half_spread),
             mid_price * (1 + half_spread + price_width),
-            self.num_levels
+            size_crypto=current_long / self.num_levels
         )
-        
-        size_per_level_crypto = current_long / self.num_levels
-        
-        quotes = []
-        for i, price in enumerate(prices):
-            size_usd = size_per_level_crypto * price
-            quotes.append(Quote(
-                price=round(float(price), 2),
-                size=round(float(size_per_level_crypto), 6),
-                size_usd=round(float(size_usd), 2),
-                side='decrease_long',
-                order_id=f'long_dec_{i:02d}'
-            ))
-        
-        return quotes
 
-    def _generate_decrease_short_quotes(self, mid_price: float, spread: float) -> List[Quote]:
-        """Generate quotes to decrease short position"""
+    def _decrease_short_quotes(self, mid_price: float, spread: float) -> None:
+        """Quotes to decrease short position"""
         current_short = self.inventory_manager.position.short_size
         if current_short <= 0:
-            return []
-            
+            return
         half_spread = spread / 2
         price_width = spread * 3
-        
-        prices = geomspace(
+        self._add_side(
+            DECREASE_SHORT,
             mid_price * (1 - half_spread),
             mid_price * (1 - half_spread - price_width),
-            self.num_levels
+            size_crypto=current_short / self.num_levels
         )
-        
-        size_per_level_crypto = current_short / self.num_levels
-        
-        quotes = []
-        for i, price in enumerate(prices):
-            size_usd = size_per_level_crypto * price
-            quotes.append(Quote(
-                price=round(float(price), 2),
-                size=round(float(size_per_level_crypto), 6),
-                size_usd=round(float(size_usd), 2),
-                side='decrease_short',
-                order_id=f'short_dec_{i:02d}'
-            ))
-        
-        return quotes
 
 
 
-    def generate_quotes(self, features: Dict) -> List[Quote]:
+    def generate_quotes(self, features: FeatureVector) -> QuoteLadder:
         """Generate quotes based on market features and inventory"""
         try:
             if not features:
-                return []
+                return QuoteLadder(self._ladder[:0].copy())
 
-            adjusted_mid = features['adjusted_mid']
-            market_skew = features['skew']
-            volatility = features['volatility']
+            adjusted_mid = features.adjusted_mid
+            market_skew = features.skew
+            volatility = features.get(self.volatility_feature, features.volatility)
             
             spread = self._calculate_spread(volatility)
             
             total_skew = self._adjust_skew(market_skew)
             
-            quotes = []
+            self._num_quotes = 0
             
             # If negative skew (selling pressure)
             if total_skew < 0:
                 # Add more short exposure
-                quotes.extend(self._generate_increase_short_quotes(
-                    adjusted_mid, spread, larger_size=True
-                ))
+                self._increase_short_quotes(adjusted_mid, spread, larger_size=True)
                 
                 # Reduce long exposure if exists
-                quotes.extend(self._generate_decrease_long_quotes(
-                    adjusted_mid, spread
-                ))
+                self._decrease_long_quotes(adjusted_mid, spread)
                 
                 # Add minimal long exposure
-                quotes.extend(self._generate_increase_long_quotes(
-                    adjusted_mid, spread, larger_size=False
-                ))
+                self._increase_long_quotes(adjusted_mid, spread, larger_size=False)
                 
             # If positive skew (buying pressure)
             elif total_skew > 0:
                 # Add more long exposure
-                quotes.extend(self._generate_increase_long_quotes(
-                    adjusted_mid, spread, larger_size=True
-                ))
+                self._increase_long_quotes(adjusted_mid, spread, larger_size=True)
                 
                 # Reduce short exposure if exists
-                quotes.extend(self._generate_decrease_short_quotes(
-                    adjusted_mid, spread
-                ))
+                self._decrease_short_quotes(adjusted_mid, spread)
                 
                 # Add minimal short exposure
-                quotes.extend(self._generate_increase_short_quotes(
-                    adjusted_mid, spread, larger_size=False
-                ))
+                self._increase_short_quotes(adjusted_mid, spread, larger_size=False)
                 
             # If neutral skew
             else:
-                quotes.extend(self._generate_increase_long_quotes(
-                    adjusted_mid, spread, larger_size=True
-                ))
-                quotes.extend(self._generate_increase_short_quotes(
-                    adjusted_mid, spread, larger_size=True
-                ))
+                self._increase_long_quotes(adjusted_mid, spread, larger_size=True)
+                self._increase_short_quotes(adjusted_mid, spread, larger_size=True)
             
-            return quotes
+            return QuoteLadder(self._ladder[:self._num_quotes].copy())
             
         except Exception as e:
             logger.error(f"Error generating quotes: {e}")
-            return []
+            return QuoteLadder(self._ladder[:0].copy())
         
 
@@ -0,0 +1,161 @@
+import asyncio
+import time
+import logging
+from typing import Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# Each power of two is split into 2**SUB_BUCKET_BITS linear buckets, bounding the
+# relative error of a reported quantile to 1 / 2**SUB_BUCKET_BITS (12.5%)
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+NUM_BUCKETS = 64 * SUB_BUCKETS
+
+
+def bucket_index(value: int) -> int:
+    """Bucket of a non-negative integer duration"""
+    if value < SUB_BUCKETS:
+        return value
+    exponent = value.bit_length() - 1
+    return (exponent << SUB_BUCKET_BITS) | ((value >> (exponent - SUB_BUCKET_BITS)) & (SUB_BUCKETS - 1))
+
+
+def bucket_value(index: int) -> float:
+    """Midpoint of a bucket"""
+    if index < SUB_BUCKETS:
+        return float(index)
+    exponent = index >> SUB_BUCKET_BITS
+    width = 1 << (exponent - SUB_BUCKET_BITS)
+    lower = (SUB_BUCKETS | (index & (SUB_BUCKETS - 1))) * width
+    return lower + width / 2
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket, log-linear histogram of durations in nanoseconds.
+
+    Recording is a bit_length and a list increment, with no allocation, so it is
+    cheap enough to run on every frame.
+    """
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        if value < SUB_BUCKETS:
+            index = value if value > 0 else 0
+            value = index
+        else:
+            # bucket_index, inlined
+            exponent = value.bit_length() - 1
+            index = (exponent << SUB_BUCKET_BITS) | ((value >> (exponent - SUB_BUCKET_BITS)) & (SUB_BUCKETS - 1))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if count and cumulative >= rank:
+                return min(bucket_value(index), float(self.max))
+        return float(self.max)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self) -> None:
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+class LatencyMonitor:
+    """
+    Per-stage latency histograms between a Binance frame and an RFX transaction.
+
+    Stages record durations from `time.monotonic_ns()` timestamps, except the
+    `exchange_lag.*` stages, which compare Binance event time with the local wall clock.
+    `summary()` reports count, mean, p50, p99, p999 and max per stage in microseconds,
+    and `report()` logs it periodically.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        return histogram
+
+    def record(self, stage: str, start_ns: int, end_ns: Optional[int] = None) -> None:
+        """Record the time between `start_ns` and `end_ns` (default: now) for a stage"""
+        if not self.enabled:
+            return
+        if end_ns is None:
+            end_ns = time.monotonic_ns()
+        histogram = self.histograms.get(stage) or self.histogram(stage)
+        histogram.record(end_ns - start_ns)
+
+    def record_duration(self, stage: str, duration_ns: int) -> None:
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(stage) or self.histogram(stage)
+        histogram.record(duration_ns)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "count": histogram.count,
+                "mean_us": histogram.mean() / 1e3,
+                "p50_us": histogram.quantile(0.5) / 1e3,
+                "p99_us": histogram.quantile(0.99) / 1e3,
+                "p999_us": histogram.quantile(0.999) / 1e3,
+                "max_us": histogram.max / 1e3,
+            }
+            for stage, histogram in sorted(self.histograms.items())
+            if histogram.count
+        }
+
+    def format_summary(self) -> str:
+        lines = [f"{'Stage':<28} | {'Count':>9} | {'p50 us':>10} | {'p99 us':>10} | {'p999 us':>10} | {'Max us':>10}"]
+        for stage, stats in self.summary().items():
+            lines.append(
+                f"{stage:<28} | {stats['count']:>9d} | {stats['p50_us']:>10.1f} | "
+                f"{stats['p99_us']:>10.1f} | {stats['p999_us']:>10.1f} | {stats['max_us']:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    async def report(self, interval: float = 60.0, reset: bool = True) -> None:
+        """Log the summary every `interval` seconds, starting a fresh window each time if `reset`"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.enabled and self.histograms:
+                    logger.info(f"Latency summary (last {interval:.0f}s):\n{self.format_summary()}")
+                    if reset:
+                        self.reset()
+            except Exception as e:
+                logger.error(f"Error reporting latency: {e}")
+
+
+# Process-wide monitor shared by the feed, feature, quoting and order stages
+latency = LatencyMonitor()
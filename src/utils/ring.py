@@ -0,0 +1,118 @@
+import numpy as np
+from numba import njit
+from numba.types import Array
+from typing import Optional
+
+
+@njit(["void(float64[:, :], int64, int64, float64[:])"], error_model="numpy", fastmath=True, cache=True)
+def ring_push(data: Array, pos: int, capacity: int, row: Array) -> None:
+    """
+    Writes one row into a mirrored columnar ring.
+
+    Parameters
+    ----------
+    data : Array
+        A (num_columns, 2 * capacity) array, one contiguous row per column.
+
+    pos : int
+        The slot to write, in [0, capacity).
+
+    capacity : int
+        Number of slots; every slot is written at `pos` and at its mirror `pos + capacity`.
+
+    row : Array
+        One value per column.
+    """
+    for k in range(data.shape[0]):
+        data[k, pos] = row[k]
+        data[k, pos + capacity] = row[k]
+
+
+@njit(["void(float64[:, :], int64, int64, float64[:, :])"], error_model="numpy", fastmath=True, cache=True)
+def ring_extend(data: Array, pos: int, capacity: int, rows: Array) -> None:
+    """
+    Writes a batch of rows into a mirrored columnar ring, starting at slot `pos`.
+
+    Only the last `capacity` rows of a larger batch are written, since older ones
+    would be overwritten within the same batch.
+
+    Parameters
+    ----------
+    data : Array
+        A (num_columns, 2 * capacity) array, one contiguous row per column.
+
+    pos : int
+        The slot of the first row, in [0, capacity).
+
+    capacity : int
+        Number of slots.
+
+    rows : Array
+        A (num_rows, num_columns) array of rows, oldest first.
+    """
+    num_rows = rows.shape[0]
+    skip = max(num_rows - capacity, 0)
+    pos = (pos + skip) % capacity
+    for i in range(skip, num_rows):
+        for k in range(data.shape[0]):
+            data[k, pos] = rows[i, k]
+            data[k, pos + capacity] = rows[i, k]
+        pos += 1
+        if pos == capacity:
+            pos = 0
+
+
+class MirroredRing:
+    """
+    Fixed-capacity ring of float64 rows, stored by column with every slot mirrored.
+
+    Each column is a contiguous array of `2 * capacity` values in which slot `i` is
+    written at both `i` and `i + capacity`. The latest `n` rows, for any `n` up to the
+    count, therefore always occupy one contiguous range of every column, so `view`
+    and `column` return them without copying, oldest first, at the cost of writing
+    every value twice. Views share memory with the ring and are only stable until the
+    next append.
+    """
+
+    def __init__(self, capacity: int, num_columns: int):
+        assert capacity > 0, "Capacity must be positive."
+        self.capacity = capacity
+        self.num_columns = num_columns
+        self._data = np.zeros((num_columns, 2 * capacity), dtype=np.float64)
+        self._pos = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def reset(self) -> None:
+        self._pos = 0
+        self._count = 0
+
+    def append(self, row: np.ndarray) -> None:
+        """Append one row of `num_columns` float64 values"""
+        ring_push(self._data, self._pos, self.capacity, row)
+        self._pos = self._pos + 1 if self._pos + 1 < self.capacity else 0
+        if self._count < self.capacity:
+            self._count += 1
+
+    def extend(self, rows: np.ndarray) -> None:
+        """Append a (num_rows, num_columns) float64 batch, oldest first"""
+        num_rows = rows.shape[0]
+        if num_rows == 0:
+            return
+        ring_extend(self._data, self._pos, self.capacity, rows)
+        self._pos = (self._pos + num_rows) % self.capacity
+        self._count = min(self._count + num_rows, self.capacity)
+
+    def view(self, n: Optional[int] = None) -> np.ndarray:
+        """The last `n` rows (all by default) as a (n, num_columns) view, oldest first"""
+        n = self._count if n is None else min(n, self._count)
+        end = self._pos + self.capacity
+        return self._data[:, end - n:end].T
+
+    def column(self, k: int, n: Optional[int] = None) -> np.ndarray:
+        """The last `n` values of column `k` as a contiguous view, oldest first"""
+        n = self._count if n is None else min(n, self._count)
+        end = self._pos + self.capacity
+        return self._data[k, end - n:end]
@@ -5,7 +5,7 @@ from numba.types import float64
 from typing import Optional
 
 
-@njit(error_model="numpy", fastmath=True)
+@njit(error_model="numpy", fastmath=True, cache=True)
 def geometric_weights(num: int, r: Optional[float] = None) -> np.ndarray[float]:
     """
     Generates a list of `num` weights that follow a geometric distribution and sum to 1.
@@ -31,7 +31,7 @@ def geometric_weights(num: int, r: Optional[float] = None) -> np.ndarray[float]:
 
 
 
-@njit(["float64[:](float64[:])"], error_model="numpy", fastmath=True)
+@njit(["float64[:](float64[:])"], error_model="numpy", fastmath=True, cache=True)
 def nbdiff_1d(arr: Array) -> Array:
     """
     Compute the differences between consecutive elements of a 1D array.
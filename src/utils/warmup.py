@@ -0,0 +1,126 @@
+"""
+Ahead-of-time compilation of every numba kernel on the quoting path.
+
+Kernels are declared with `cache=True`, so compiled machine code is written to
+`NUMBA_CACHE_DIR` (or `__pycache__` next to the source) and loaded on later starts
+instead of being recompiled. `warmup_kernels` imports the kernel modules, which
+compiles or loads the eagerly typed kernels, then runs each kernel once on small
+inputs of the exact types used live so lazily typed ones are compiled too, and
+reports whether everything came from the cache.
+
+Run from `src` to populate the cache, e.g. while building the Docker image:
+    python -m utils.warmup
+"""
+import importlib
+import time
+import logging
+from typing import Dict, List
+
+import numpy as np
+from numba.core.registry import CPUDispatcher
+
+
+logger = logging.getLogger(__name__)
+
+
+KERNEL_MODULES = (
+    "exchanges.binance.ws.handlers.orderbook",
+    "features.book_depth",
+    "features.multi_horizon",
+    "features.orderbook_imbalance",
+    "features.trades_imbalance",
+    "features.trades_diff",
+    "oms.quote",
+    "utils.ring",
+    "utils.utils",
+)
+
+
+class WarmupReport:
+    """Outcome of `warmup_kernels`"""
+    __slots__ = ("seconds", "kernels", "cache_hits", "cache_misses")
+
+    def __init__(self, seconds: float, kernels: List[str], cache_hits: int, cache_misses: int):
+        self.seconds = seconds
+        self.kernels = kernels
+        self.cache_hits = cache_hits
+        self.cache_misses = cache_misses
+
+    @property
+    def warm(self) -> bool:
+        """True if every kernel was loaded from the on-disk cache"""
+        return self.cache_misses == 0 and self.cache_hits > 0
+
+    def __repr__(self):
+        return (f"WarmupReport({len(self.kernels)} kernels in {self.seconds * 1000:.1f}ms, "
+                f"{self.cache_hits} cache hits, {self.cache_misses} misses)")
+
+
+def _exercise_kernels() -> None:
+    """Runs each kernel once with the argument types used live"""
+    from exchanges.binance.ws.handlers.orderbook import Orderbook
+    from features.book_depth import depth_profile, depth_imbalance, NUM_DEPTH_FEATURES
+    from features.multi_horizon import TradeHorizons
+    from features.orderbook_imbalance import orderbook_imbalance
+    from features.trades_imbalance import trades_imbalance
+    from features.trades_diff import trades_diffs
+    from oms.quote import fill_ladder_side, ladder_shape, LADDER_DTYPE, INCREASE_LONG
+    from utils.ring import MirroredRing
+    from utils.utils import geometric_weights, nbdiff_1d
+
+    asks = np.array([[101.0, 1.0], [102.0, 2.0], [103.0, 3.0]])
+    bids = np.array([[100.0, 1.0], [99.0, 2.0], [98.0, 3.0]])
+    book = Orderbook(size=10)
+    book.refresh(asks, bids, 1)
+    book.update_full(np.array([[101.5, 1.0]]), np.array([[99.5, 1.0]]), 2)
+
+    depths = np.array([10.0, 25.0, 50.0, 100.0, 250.0])
+    weights = geometric_weights(depths.size)
+    profile = np.zeros((depths.size, NUM_DEPTH_FEATURES), dtype=np.float64)
+    depth_profile(book.bids, book.cum_bids, book.asks, book.cum_asks, depths, profile)
+    depth_imbalance(profile, weights)
+    orderbook_imbalance(book.bids, book.asks, depths)
+
+    trades = np.array([[1.0, 1.0, 100.0, 0.1], [2.0, -1.0, 100.5, 0.2], [3.0, 1.0, 100.2, 0.3]])
+    ring = MirroredRing(2, 4)
+    ring.append(trades[0])
+    ring.extend(trades)
+    trades_imbalance(trades, 100)
+    trades_diffs(trades, 100)
+    nbdiff_1d(trades[:, 2].copy())
+    TradeHorizons(trades=[2], seconds=[1.0], volumes=[0.5]).compute(trades, 3.0)
+
+    exponents, size_weights = ladder_shape(2)
+    ladder = np.zeros(2, dtype=LADDER_DTYPE)
+    fill_ladder_side(ladder, 0, INCREASE_LONG, 100.0, 99.0, exponents, size_weights,
+                     10.0, 0.0, True, 0.0, 0.0, 50.0, 10.0)
+
+
+def kernels() -> Dict[str, CPUDispatcher]:
+    """Every numba kernel defined in KERNEL_MODULES, by qualified name"""
+    found = {}
+    for module_name in KERNEL_MODULES:
+        module = importlib.import_module(module_name)
+        for name, obj in vars(module).items():
+            if isinstance(obj, CPUDispatcher) and obj.py_func.__module__ == module_name:
+                found[f"{module_name}.{name}"] = obj
+    return found
+
+
+def warmup_kernels() -> WarmupReport:
+    """Compile, or load from the cache, every kernel before the first tick needs it"""
+    start = time.perf_counter()
+    found = kernels()
+    _exercise_kernels()
+    seconds = time.perf_counter() - start
+
+    cache_hits = sum(sum(kernel.stats.cache_hits.values()) for kernel in found.values())
+    cache_misses = sum(sum(kernel.stats.cache_misses.values()) for kernel in found.values())
+    report = WarmupReport(seconds, sorted(found), cache_hits, cache_misses)
+    logger.info(f"Numba warm-up ({'warm' if report.warm else 'cold'} cache): {report}")
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(warmup_kernels())